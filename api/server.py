@@ -0,0 +1,354 @@
+"""
+Headless JSON API over QueryEngine and the chat router, for incident tooling and CI.
+
+    PYTHONPATH=. python api/server.py --port 8080
+
+    GET  /health                               connection and ingestion status
+    GET  /stats                                query and response cache statistics
+    GET  /query/<method>?param=value...        one QueryEngine method (see METHODS); HEAD works too
+    POST /batch   {"requests": [{"method": ..., "params": {...}}, ...]}
+    POST /route   {"query": "what breaks if orders-db fails?"}
+
+GET /query responses carry an ETag derived from the graph version, so a
+client that sends it back in If-None-Match gets 304 until the graph changes.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from chat.router import ChatRouter
+from chat.templates import format_answer
+from graph.cache import QueryCache, graph_version
+from telemetry.tracing import span
+from ui.backend import GraphBackend
+
+# Threads handling requests; each one runs its queries on its own pooled driver session
+API_WORKERS = int(os.getenv("API_WORKERS", "16"))
+# Threads answering the lookups of /batch requests concurrently
+API_BATCH_WORKERS = int(os.getenv("API_BATCH_WORKERS", "8"))
+# Most lookups accepted in one /batch request
+API_MAX_BATCH = int(os.getenv("API_MAX_BATCH", "200"))
+# Encoded /query responses kept until the graph version changes; 0 disables
+API_CACHE_SIZE = int(os.getenv("API_CACHE_SIZE", "1024"))
+# Seconds a connection may sit idle (e.g. kept alive between requests) before
+# it is closed, so idle clients can't hold every worker
+API_IDLE_TIMEOUT = float(os.getenv("API_IDLE_TIMEOUT", "5"))
+# Largest request body accepted, in bytes
+API_MAX_BODY = int(os.getenv("API_MAX_BODY", str(1024 * 1024)))
+# Nodes per direction when /route answers a blast radius question
+ROUTE_PAGE_SIZE = 50
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+def node_ids(value: Any) -> Tuple[str, ...]:
+    """A list of ids, or a comma-separated string of them (query strings)."""
+    if isinstance(value, str):
+        value = [v for v in value.split(",") if v]
+    if not isinstance(value, (list, tuple)):
+        raise ValueError("expected a list of node ids")
+    return tuple(str(v) for v in value)
+
+# QueryEngine methods served, with their parameters and converters. Parameters
+# without a default in the method signature are required.
+METHODS: Dict[str, Dict[str, Callable[[Any], Any]]] = {
+    "get_node": {"node_id": str},
+    "get_nodes": {"node_type": str, "limit": int},
+    "get_owner": {"node_id": str},
+    "pager": {"node_id": str},
+    "blast_radius": {"node_id": str, "max_depth": int, "limit": int, "cursor": str},
+    "impact_subgraph": {"node_ids": node_ids},
+    "shortest_path": {"from_id": str, "to_id": str},
+    "criticality": {"node_type": str, "limit": int},
+}
+REQUIRED = {"node_id", "node_ids", "from_id", "to_id"}
+
+# Router intents -> (method, intent parameter -> method parameter)
+INTENTS = {
+    "get_owner": ("get_owner", {"node_id": "node_id"}),
+    "pager": ("pager", {"node_id": "node_id"}),
+    "blast_radius": ("blast_radius", {"node_id": "node_id", "max_depth": "max_depth"}),
+    "upstream": ("blast_radius", {"node_id": "node_id"}),
+    "shortest_path": ("shortest_path", {"from_id": "from_id", "to_id": "to_id"}),
+    "get_node": ("get_node", {"node_id": "node_id"}),
+    "get_nodes": ("get_nodes", {"type": "node_type"}),
+    "criticality": ("criticality", {"type": "node_type"}),
+}
+
+def parse_params(method: str, raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Validated keyword arguments for a METHODS entry; raises ApiError."""
+    if method not in METHODS:
+        raise ApiError(404, f"Unknown method: {method}")
+    spec = METHODS[method]
+    unknown = set(raw) - set(spec)
+    if unknown:
+        raise ApiError(400, f"Unknown parameters for {method}: {', '.join(sorted(unknown))}")
+    params = {}
+    for name, convert in spec.items():
+        if raw.get(name) in (None, ""):
+            if name in REQUIRED:
+                raise ApiError(400, f"{method} requires {name}")
+            continue
+        try:
+            params[name] = convert(raw[name])
+        except (TypeError, ValueError):
+            raise ApiError(400, f"Invalid {name} for {method}: {raw[name]!r}")
+    return params
+
+def encode(payload: Any) -> bytes:
+    # Neo4j temporal values and other driver types go out as strings
+    return json.dumps(payload, default=str).encode('utf-8')
+
+class QueryAPI:
+    """
+    State shared by every request: one graph connection (and its driver pool),
+    one QueryEngine and its cache, the chat router, encoded responses, and
+    the pool answering batch lookups.
+    """
+
+    def __init__(self, backend: GraphBackend = None, batch_workers: int = None, cache_size: int = None):
+        self.backend = backend or GraphBackend()
+        self.router = ChatRouter()
+        self.responses = QueryCache(API_CACHE_SIZE if cache_size is None else cache_size)
+        self.batch_pool = ThreadPoolExecutor(batch_workers or API_BATCH_WORKERS, thread_name_prefix="api-batch")
+        self._lock = threading.Lock()
+        self._entities_version = None
+        # Graph versions restart with the process; ETags from an earlier one must not match
+        self.instance = uuid.uuid4().hex[:8]
+
+    def engine(self):
+        """The QueryEngine, once the graph can answer; raises ApiError(503) before."""
+        if not self.backend.queryable():
+            raise ApiError(503, f"Graph not ready ({self.backend.status}"
+                                f"{', ingesting' if self.backend.ingesting else ''})")
+        return self.backend.query_engine
+
+    def etag(self, method: str, params: Dict[str, Any]) -> str:
+        request = json.dumps([method, sorted(params.items())], default=str)
+        return f'"{self.instance}-{graph_version()}-{hashlib.sha1(request.encode("utf-8")).hexdigest()[:16]}"'
+
+    def call(self, method: str, params: Dict[str, Any]) -> Any:
+        return getattr(self.engine(), method)(**params)
+
+    def query(self, method: str, raw: Dict[str, Any], if_none_match: Optional[str] = None) -> Tuple[int, bytes, str]:
+        """(status, body, etag) of one GET /query call; 304 with an empty body when the ETag matches."""
+        params = parse_params(method, raw)
+        self.engine()
+        etag = self.etag(method, params)
+        if if_none_match and etag in (tag.strip() for tag in if_none_match.split(",")):
+            return 304, b"", etag
+        key = (method, tuple(sorted(params.items())))
+        version = graph_version()
+        found, body = self.responses.get(key)
+        if not found:
+            body = encode({"method": method, "params": params, "graph_version": version,
+                           "result": self.call(method, params)})
+            self.responses.put(key, body, version)
+        return 200, body, etag
+
+    def _batch_item(self, item: Any) -> Dict[str, Any]:
+        try:
+            if not isinstance(item, dict) or not isinstance(item.get("params", {}), dict):
+                raise ApiError(400, 'Each request needs "method" and optional "params" object')
+            method = item.get("method")
+            return {"result": self.call(method, parse_params(method, item.get("params", {})))}
+        except ApiError as e:
+            return {"error": str(e), "status": e.status}
+        except Exception as e:
+            return {"error": f"{type(e).__name__}: {e}", "status": 500}
+
+    def batch(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Answers many lookups concurrently; each result (or error) keeps its request's position."""
+        requests = body.get("requests")
+        if not isinstance(requests, list):
+            raise ApiError(400, 'Expected {"requests": [...]}')
+        if len(requests) > API_MAX_BATCH:
+            raise ApiError(413, f"At most {API_MAX_BATCH} requests per batch")
+        self.engine()
+        with span("api.batch", size=len(requests)):
+            return {"graph_version": graph_version(), "results": list(self.batch_pool.map(self._batch_item, requests))}
+
+    def route(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Routes a question with the chat router and runs the query it maps to.
+        No summary is generated: callers get the structured result.
+        """
+        question = body.get("query")
+        if not isinstance(question, str) or not question.strip():
+            raise ApiError(400, 'Expected {"query": "..."}')
+        engine = self.engine()
+        with self._lock:
+            # The router's local rules and resolver match against the current node names
+            if self._entities_version != graph_version():
+                self.router.set_entities(engine.get_nodes(limit=100000))
+                self._entities_version = graph_version()
+        routed = self.router.route(question, history=body.get("history"))
+        response = {"routing": routed, "result": None, "answer": None}
+        intent = routed.get("intent")
+        if "error" in routed or routed.get("candidates") or intent not in INTENTS:
+            return response
+        method, names = INTENTS[intent]
+        raw = {names[k]: v for k, v in (routed.get("parameters") or {}).items() if k in names}
+        if method == "blast_radius":
+            raw["limit"] = ROUTE_PAGE_SIZE
+        response["result"] = self.call(method, parse_params(method, raw))
+        # Templated like the chat's answers; free-form results get no answer rather than an LLM call
+        response["answer"] = format_answer(intent, routed.get("parameters") or {}, response["result"])
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        engine = self.backend.query_engine
+        return {
+            "graph_version": graph_version(),
+            "query_cache": engine.cache.stats() if engine else None,
+            "response_cache": self.responses.stats(),
+            **self.router.counters(),
+        }
+
+    def health(self) -> Dict[str, Any]:
+        job = self.backend.job
+        return {
+            "status": self.backend.status,
+            "queryable": self.backend.queryable(),
+            "backend": getattr(self.backend.storage, "name", None),
+            "ingest": {"status": job.status, "stage": job.stage, "fraction": job.fraction} if job else None,
+            "graph_version": graph_version(),
+        }
+
+    def close(self):
+        self.batch_pool.shutdown(wait=True)
+        if self.backend.storage is not None:
+            self.backend.storage.close()
+
+class APIHandler(BaseHTTPRequestHandler):
+    server_version = "EKG-API/1.0"
+    protocol_version = "HTTP/1.1"
+    # Keep-alive connections occupy a pool worker while they wait for the next request
+    timeout = API_IDLE_TIMEOUT
+    _status = None
+
+    @property
+    def api(self) -> QueryAPI:
+        return self.server.api
+
+    def _send(self, status: int, body: bytes = b"", headers: Dict[str, str] = None):
+        self.send_response(status)
+        if status != 304:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if body and self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _json_body(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > API_MAX_BODY:
+            raise ApiError(413, "Request body too large")
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            raise ApiError(400, "Request body is not valid JSON")
+        if not isinstance(body, dict):
+            raise ApiError(400, "Request body must be a JSON object")
+        return body
+
+    def _handle(self, handler: Callable[[str], None]):
+        path = urlsplit(self.path).path.rstrip("/") or "/"
+        with span("api.request", http_method=self.command, path=path) as s:
+            try:
+                handler(path)
+            except ApiError as e:
+                headers = {"Retry-After": "1"} if e.status == 503 else None
+                self._send(e.status, encode({"error": str(e)}), headers)
+            except Exception as e:
+                print(f"API error on {self.command} {self.path}: {e}")
+                self._send(500, encode({"error": f"{type(e).__name__}: {e}"}))
+            s.set(status=self._status)
+
+    def send_response(self, code, message=None):
+        self._status = code
+        super().send_response(code, message)
+
+    def do_GET(self):
+        self._handle(self._get)
+
+    def do_HEAD(self):
+        # Same status and headers as GET (e.g. to revalidate an ETag), without the body
+        self._handle(self._get)
+
+    def do_POST(self):
+        self._handle(self._post)
+
+    def _get(self, path: str):
+        if path == "/health":
+            self._send(200, encode(self.api.health()))
+        elif path == "/stats":
+            self._send(200, encode(self.api.stats()))
+        elif path.startswith("/query/"):
+            raw = dict(parse_qsl(urlsplit(self.path).query))
+            status, body, etag = self.api.query(path[len("/query/"):], raw, self.headers.get("If-None-Match"))
+            # Clients may reuse a response only after revalidating its ETag
+            self._send(status, body, {"ETag": etag, "Cache-Control": "no-cache"})
+        else:
+            raise ApiError(404, f"No such endpoint: {path}")
+
+    def _post(self, path: str):
+        if path == "/batch":
+            self._send(200, encode(self.api.batch(self._json_body())))
+        elif path == "/route":
+            self._send(200, encode(self.api.route(self._json_body())))
+        else:
+            raise ApiError(404, f"No such endpoint: {path}")
+
+class PooledHTTPServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer that handles connections on a fixed pool of worker threads."""
+
+    def __init__(self, address, handler, api: QueryAPI, workers: int = None):
+        self.api = api
+        self.pool = ThreadPoolExecutor(workers or API_WORKERS, thread_name_prefix="api")
+        super().__init__(address, handler)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self.process_request_thread, request, client_address)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=True)
+
+def serve(host: str = "127.0.0.1", port: int = 8080, workers: int = None):
+    api = QueryAPI()
+    server = PooledHTTPServer((host, port), APIHandler, api, workers)
+    print(f"EKG API listening on http://{host}:{server.server_port} ({workers or API_WORKERS} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        api.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve QueryEngine and the chat router as a JSON API.")
+    parser.add_argument("--host", default=os.getenv("API_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("API_PORT", "8080")))
+    parser.add_argument("--workers", type=int, help=f"Request worker threads (default: API_WORKERS, {API_WORKERS}).")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers)
+
+if __name__ == "__main__":
+    main()
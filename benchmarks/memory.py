@@ -0,0 +1,87 @@
+"""
+Memory held by connector output on synthetic topologies.
+
+    PYTHONPATH=. python benchmarks/memory.py --scales 1000 10000
+
+For each connector, measures with tracemalloc the bytes still allocated once
+load() has returned (slotted NodeRecord / EdgeRecord), and the bytes kept
+when the same records are held as the plain per-row dicts connectors used to return.
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.topology import generate_topology
+from connectors.runner import default_connectors
+
+def retained(build):
+    """Returns build()'s result, the bytes it keeps allocated, and the peak while building."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        data = build()
+        gc.collect()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return data, current - start, peak - start
+
+def load_as_dicts(connector):
+    """load() with the records in the old format: one dict per row, every string a separate object."""
+    nodes, edges = connector.load()
+    return json.loads(json.dumps([record.to_dict() for record in nodes + edges]))
+
+def run_scale(services: int, seed: int):
+    out_dir = tempfile.mkdtemp(prefix=f"ekg-memory-{services}-")
+    paths = generate_topology(out_dir, services=services, seed=seed)
+    results = []
+    print(f"Scale: {services} services")
+    for connector in default_connectors(paths["compose"], paths["teams"], paths["k8s"]):
+        (nodes, edges), slotted, peak = retained(connector.load)
+        records = nodes + edges
+        if not records:
+            continue
+        _, plain, _ = retained(lambda: load_as_dicts(connector))
+        entry = {
+            "connector": connector.__class__.__name__,
+            "scale": services,
+            "records": len(records),
+            "slotted_bytes": slotted,
+            "dict_bytes": plain,
+            "load_peak_bytes": peak,
+        }
+        results.append(entry)
+        saving = 1 - slotted / plain if plain else 0.0
+        print(f"  {entry['connector']:<24} {len(records):>8} records  "
+              f"{slotted / len(records):7.1f} B/record slotted  {plain / len(records):7.1f} B/record as dicts  "
+              f"({saving:.0%} less)")
+        del nodes, edges, records
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure memory held by connector records.")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1000, 10000],
+                        help="Numbers of services to generate.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Where to write the JSON results.")
+    args = parser.parse_args()
+
+    results = []
+    for scale in args.scales:
+        results.extend(run_scale(scale, args.seed))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"seed": args.seed, "results": results}, f, indent=2)
+        print(f"\nWrote {len(results)} results to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Query-plan regression checks for QueryEngine against Neo4j.
+
+    PYTHONPATH=. python benchmarks/plans.py --output plans.json            # record a baseline
+    PYTHONPATH=. python benchmarks/plans.py --baseline plans.json          # fail on regressions
+
+Ingests a synthetic topology into the database at NEO4J_URI (clearing it),
+runs every QueryEngine method with the reachability index and the cache off,
+so each call executes its Cypher, under PROFILE. Exits 1 when a method's plan
+scans all nodes, or its db hits per call grow past --max-regression times the baseline.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+from collections import Counter
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Keep ingest state and the reachability index away from the real ones
+_WORK_DIR = tempfile.mkdtemp(prefix="ekg-plans-")
+os.environ["INGEST_STATE_PATH"] = os.path.join(_WORK_DIR, "ingest_state.json")
+os.environ["REACHABILITY_INDEX_PATH"] = os.path.join(_WORK_DIR, "reachability.json")
+
+from benchmarks.run import _quiet
+from benchmarks.topology import generate_topology
+from connectors.runner import default_connectors
+from graph.profile import format_report
+from graph.query import QueryEngine
+from graph.storage import GraphStorage
+from scripts.ingest_data import ingest
+
+def profile_methods(storage: GraphStorage, services: int, samples: int, seed: int):
+    """Runs each QueryEngine method `samples` times; returns the profiler report with per-call db hits."""
+    engine = QueryEngine(storage, cache_size=0, use_reachability=False)
+    rng = random.Random(seed)
+    ids = [n['id'] for n in engine.get_nodes(limit=services * 10)]
+    service_ids = [i for i in ids if i.startswith("service:")]
+    storage.profiler.reset()
+
+    calls = Counter()
+    for _ in range(samples):
+        node_id = rng.choice(service_ids)
+        engine.get_node(node_id)
+        engine.get_nodes("service", limit=100)
+        engine.get_owner(node_id)
+        engine.blast_radius(node_id)
+        page = engine.blast_radius(node_id, limit=50)
+        engine.impact_subgraph(tuple([node_id] + [n['id'] for n in page["downstream_impact"] + page["upstream_dependencies"]]))
+        engine.shortest_path(node_id, rng.choice(service_ids))
+        calls.update(["get_node", "get_nodes", "get_owner", "blast_radius", "blast_radius",
+                      "impact_subgraph", "shortest_path"])
+    engine.criticality(limit=20)
+    calls["criticality"] += 1
+    return storage.profiler.report(calls)
+
+def check(report, baseline_path: str = None, max_regression: float = 1.5) -> bool:
+    ok = True
+    for method, row in report.items():
+        if row["full_scans"]:
+            ok = False
+            print(f"FAIL {method}: full scan in {'; '.join(row['full_scan_statements'])}")
+    if not baseline_path:
+        return ok
+
+    with open(baseline_path, 'r') as f:
+        baseline = json.load(f)["methods"]
+    print(f"\nComparison with {baseline_path} (db hits per call, limit {max_regression:.2f}x):")
+    for method, row in report.items():
+        previous = baseline.get(method, {}).get("db_hits_per_call")
+        current = row.get("db_hits_per_call")
+        if not previous or current is None:
+            continue
+        ratio = current / previous
+        flag = "REGRESSION" if ratio > max_regression else ""
+        if flag:
+            ok = False
+        print(f"  {method:<18} {previous:10.1f} -> {current:10.1f}  {ratio:5.2f}x {flag}")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Check QueryEngine query plans on a synthetic topology.")
+    parser.add_argument("--scale", type=int, default=500, help="Number of services to generate.")
+    parser.add_argument("--samples", type=int, default=20, help="Calls per method.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Where to write the report (usable as a later --baseline).")
+    parser.add_argument("--baseline", help="Previous report to compare db hits against.")
+    parser.add_argument("--max-regression", type=float, default=1.5,
+                        help="Fail when db hits per call are this many times the baseline.")
+    args = parser.parse_args()
+
+    paths = generate_topology(os.path.join(_WORK_DIR, "topology"), services=args.scale, seed=args.seed)
+    storage = GraphStorage(profile=True)
+    try:
+        connectors = default_connectors(paths["compose"], paths["teams"], paths["k8s"])
+        _quiet(lambda: ingest(storage, connectors=connectors, workers=1))()
+        report = profile_methods(storage, args.scale, args.samples, args.seed)
+    finally:
+        storage.close()
+
+    print("\n".join(format_report(report)))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"scale": args.scale, "samples": args.samples, "seed": args.seed, "methods": report}, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+    if not check(report, args.baseline, args.max_regression):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
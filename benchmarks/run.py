@@ -0,0 +1,174 @@
+"""
+Benchmarks for connectors, ingestion and QueryEngine on synthetic topologies.
+
+    PYTHONPATH=. python benchmarks/run.py --scales 100 1000 5000 --output bench.json
+    PYTHONPATH=. python benchmarks/run.py --baseline bench.json   # fail on regressions
+
+Runs against the in-memory backend by default; --backend neo4j uses NEO4J_URI.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Keep ingest state and the reachability index away from the real ones.
+# Must happen before graph modules read their defaults.
+_WORK_DIR = tempfile.mkdtemp(prefix="ekg-bench-")
+os.environ["INGEST_STATE_PATH"] = os.path.join(_WORK_DIR, "ingest_state.json")
+os.environ["REACHABILITY_INDEX_PATH"] = os.path.join(_WORK_DIR, "reachability.json")
+
+from benchmarks.topology import generate_topology
+from connectors.runner import default_connectors
+from graph.memory import MemoryGraphStorage
+from graph.query import QueryEngine
+from scripts.ingest_data import ingest
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       cwd=os.path.dirname(__file__), stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def measure(fn, iterations: int):
+    """Runs fn `iterations` times and returns timing stats in milliseconds."""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "iterations": iterations,
+        "min_ms": samples[0],
+        "median_ms": statistics.median(samples),
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "mean_ms": statistics.fmean(samples),
+    }
+
+def _quiet(fn):
+    """Connectors and ingest() print progress; keep benchmark output readable."""
+    def wrapper():
+        stdout = sys.stdout
+        sys.stdout = open(os.devnull, 'w')
+        try:
+            return fn()
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+    return wrapper
+
+def make_storage(backend: str):
+    if backend == "memory":
+        return MemoryGraphStorage()
+    from graph.storage import GraphStorage
+    return GraphStorage()
+
+def run_scale(services: int, backend: str, iterations: int, seed: int):
+    out_dir = os.path.join(_WORK_DIR, f"topology-{services}")
+    paths = generate_topology(out_dir, services=services, seed=seed)
+    connectors = default_connectors(paths["compose"], paths["teams"], paths["k8s"])
+    results = []
+
+    def record(name, stats, **extra):
+        entry = {"name": name, "scale": services, **stats}
+        if extra:
+            entry["extra"] = extra
+        results.append(entry)
+        print(f"  {name:<40} median {stats['median_ms']:10.3f} ms  p95 {stats['p95_ms']:10.3f} ms")
+
+    print(f"Scale: {services} services")
+
+    # Connectors
+    for connector in connectors:
+        record(f"connector.{connector.__class__.__name__}.load",
+               measure(_quiet(connector.load), max(1, iterations // 10)))
+
+    # End-to-end ingestion (full rebuild, then a no-op incremental run)
+    storage = make_storage(backend)
+    ingest_iterations = max(1, iterations // 20)
+    record("ingest.full", measure(_quiet(lambda: ingest(storage, connectors=connectors, workers=1)), ingest_iterations))
+    record("ingest.incremental_noop",
+           measure(_quiet(lambda: ingest(storage, connectors=connectors, workers=1, incremental=True)), ingest_iterations))
+
+    # Queries, uncached so every call does the real work
+    engine = QueryEngine(storage, cache_size=0)
+    live_engine = QueryEngine(storage, cache_size=0, use_reachability=False)
+    rng = random.Random(seed)
+    ids = [n['id'] for n in engine.get_nodes(limit=services * 10)]
+    service_ids = [i for i in ids if i.startswith("service:")]
+    sample = lambda: rng.choice(service_ids)
+
+    record("query.get_node", measure(lambda: engine.get_node(sample()), iterations))
+    record("query.get_nodes", measure(lambda: engine.get_nodes("service", limit=100), iterations))
+    record("query.get_owner", measure(lambda: engine.get_owner(sample()), iterations))
+    record("query.blast_radius", measure(lambda: engine.blast_radius(sample()), iterations))
+    record("query.blast_radius_live", measure(lambda: live_engine.blast_radius(sample()), iterations))
+    record("query.blast_radius_first_page",
+           measure(lambda: live_engine.blast_radius(sample(), limit=50), iterations))
+    record("query.shortest_path", measure(lambda: engine.shortest_path(sample(), sample()), iterations))
+    record("query.criticality", measure(lambda: engine.criticality(limit=20), max(1, iterations // 20)))
+
+    storage.close()
+    return results
+
+def compare(results, baseline_path: str, max_regression: float) -> bool:
+    """Prints the ratio to a previous run and returns False if anything regressed past max_regression."""
+    with open(baseline_path, 'r') as f:
+        baseline = {(r["name"], r["scale"]): r for r in json.load(f)["results"]}
+    ok = True
+    print(f"\nComparison with {baseline_path} (median, limit {max_regression:.2f}x):")
+    for r in results:
+        previous = baseline.get((r["name"], r["scale"]))
+        if not previous or previous["median_ms"] <= 0:
+            continue
+        ratio = r["median_ms"] / previous["median_ms"]
+        flag = "REGRESSION" if ratio > max_regression else ""
+        if flag:
+            ok = False
+        print(f"  {r['name']:<40} @{r['scale']:<6} {ratio:6.2f}x {flag}")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Run EKG benchmarks on synthetic topologies.")
+    parser.add_argument("--scales", type=int, nargs="+", default=[100, 1000],
+                        help="Numbers of services to generate.")
+    parser.add_argument("--iterations", type=int, default=200, help="Iterations per query benchmark.")
+    parser.add_argument("--backend", choices=["memory", "neo4j"], default="memory")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_results.json", help="Where to write the JSON results.")
+    parser.add_argument("--baseline", help="Previous results JSON to compare against.")
+    parser.add_argument("--max-regression", type=float, default=1.5,
+                        help="Fail when a median is this many times slower than the baseline.")
+    args = parser.parse_args()
+
+    results = []
+    for scale in args.scales:
+        results.extend(run_scale(scale, args.backend, args.iterations, args.seed))
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "backend": args.backend,
+        "seed": args.seed,
+        "results": results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {len(results)} results to {args.output}")
+
+    if args.baseline and not compare(results, args.baseline, args.max_regression):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
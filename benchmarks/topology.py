@@ -0,0 +1,136 @@
+"""
+Seeded generator of synthetic infrastructure topologies.
+
+Writes docker-compose.yml, k8s-deployments.yaml and teams.yaml in the same
+formats as the sample files under data/, so the real connectors parse them.
+"""
+import argparse
+import os
+import random
+from typing import Dict
+
+import yaml
+
+def generate_topology(out_dir: str, services: int = 100, fan_out: int = 3, cycle_ratio: float = 0.05,
+                      databases: int = None, caches: int = None, teams: int = None, seed: int = 42) -> Dict[str, str]:
+    """
+    Generates a topology and returns the paths of the files written.
+
+    services:    number of application services
+    fan_out:     services each service calls (plus its database/cache)
+    cycle_ratio: share of services that also call back into an earlier layer,
+                 creating dependency cycles
+    databases, caches, teams default to services/5, services/20 and services/10.
+    """
+    rng = random.Random(seed)
+    databases = databases if databases is not None else max(1, services // 5)
+    caches = caches if caches is not None else max(1, services // 20)
+    teams = teams if teams is not None else max(2, services // 10)
+
+    service_names = [f"svc-{i:05d}" for i in range(services)]
+    # TeamsConnector infers Database from the "-db" suffix and Cache only for "redis-main"
+    database_names = [f"store-{i:04d}-db" for i in range(databases)]
+    cache_names = ["redis-main"] + [f"redis-{i:03d}" for i in range(1, caches)]
+    team_names = [f"team-{i:03d}" for i in range(teams)]
+
+    compose_services = {}
+    for name in database_names:
+        compose_services[name] = {"image": "postgres:15", "labels": {"type": "database"}}
+    for name in cache_names:
+        compose_services[name] = {"image": "redis:7"}
+
+    owners = {name: rng.choice(team_names) for name in service_names + database_names}
+    owners["redis-main"] = rng.choice(team_names)
+
+    for i, name in enumerate(service_names):
+        # Services mostly call "deeper" ones (higher index), which keeps the
+        # graph layered; cycle_ratio of them also call back up.
+        downstream = service_names[i + 1:]
+        calls = rng.sample(downstream, min(fan_out, len(downstream)))
+        if i > 0 and rng.random() < cycle_ratio:
+            calls.append(rng.choice(service_names[:i]))
+
+        environment = [f"{callee.upper().replace('-', '_')}_SERVICE_URL=http://{callee}:8080" for callee in calls]
+        depends_on = list(calls)
+
+        if database_names and rng.random() < 0.6:
+            db = rng.choice(database_names)
+            environment.append(f"DATABASE_URL=postgresql://app:secret@{db}:5432/app")
+            depends_on.append(db)
+        if rng.random() < 0.3:
+            cache = rng.choice(cache_names)
+            environment.append(f"REDIS_URL=redis://{cache}:6379")
+            depends_on.append(cache)
+
+        compose_services[name] = {
+            "build": f"./services/{name}",
+            "environment": environment,
+            "depends_on": depends_on,
+            "labels": {"team": owners[name], "oncall": f"@oncall-{owners[name]}"},
+        }
+
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {
+        "compose": os.path.join(out_dir, "docker-compose.yml"),
+        "k8s": os.path.join(out_dir, "k8s-deployments.yaml"),
+        "teams": os.path.join(out_dir, "teams.yaml"),
+    }
+
+    with open(paths["compose"], 'w') as f:
+        yaml.safe_dump({"version": "3.8", "services": compose_services}, f, sort_keys=False)
+
+    with open(paths["k8s"], 'w') as f:
+        documents = []
+        for name in service_names:
+            documents.append({
+                "apiVersion": "apps/v1",
+                "kind": "Deployment",
+                "metadata": {"name": name, "namespace": "bench", "labels": {"app": name}},
+                "spec": {
+                    "replicas": rng.randint(1, 5),
+                    "selector": {"matchLabels": {"app": name}},
+                    "template": {
+                        "metadata": {"labels": {"app": name}},
+                        "spec": {"containers": [{
+                            "name": name,
+                            "image": f"bench/{name}:v1",
+                            "resources": {"requests": {"memory": "256Mi", "cpu": "250m"}},
+                        }]},
+                    },
+                },
+            })
+            # Non-Deployment kinds exercise the connector's skip path
+            documents.append({
+                "apiVersion": "v1",
+                "kind": "Service",
+                "metadata": {"name": name, "namespace": "bench"},
+                "spec": {"selector": {"app": name}, "ports": [{"port": 8080}]},
+            })
+        yaml.safe_dump_all(documents, f, sort_keys=False)
+
+    owned = {team: [] for team in team_names}
+    for item, team in owners.items():
+        owned[team].append(item)
+    with open(paths["teams"], 'w') as f:
+        yaml.safe_dump({"teams": [{
+            "name": team,
+            "lead": f"@lead-{team}",
+            "slack_channel": f"#{team}",
+            "pagerduty_schedule": f"{team}-oncall",
+            "owns": sorted(owned[team]),
+        } for team in team_names]}, f, sort_keys=False)
+
+    return paths
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic topology.")
+    parser.add_argument("out_dir")
+    parser.add_argument("--services", type=int, default=100)
+    parser.add_argument("--fan-out", type=int, default=3)
+    parser.add_argument("--cycle-ratio", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    written = generate_topology(args.out_dir, args.services, args.fan_out, args.cycle_ratio, seed=args.seed)
+    for kind, path in written.items():
+        print(f"{kind}: {path}")
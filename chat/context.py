@@ -12,3 +12,31 @@ class ChatContext:
 
     def get_messages(self) -> List[Dict]:
         return self.history
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token), good enough for budgeting prompts."""
+    return (len(text) + 3) // 4
+
+def fit_text(text: str, budget: int) -> str:
+    """text cut down to about `budget` tokens, marking what was dropped."""
+    if estimate_tokens(text) <= budget:
+        return text
+    keep = max(budget * 4, 0)
+    return text[:keep] + f" ... [{len(text) - keep} characters truncated]"
+
+def trim_history(history: List[Dict], budget: int, max_messages: int = 6) -> List[Dict]:
+    """
+    The most recent messages (role and content only) that fit in `budget`
+    tokens, oldest first. A long answer is cut rather than dropping the
+    newer turns around it.
+    """
+    trimmed: List[Dict] = []
+    remaining = budget
+    for message in reversed(history[-max_messages:]):
+        content = str(message.get("content") or "")
+        if remaining <= 0:
+            break
+        content = fit_text(content, remaining)
+        remaining -= estimate_tokens(content)
+        trimmed.append({"role": message.get("role"), "content": content})
+    return list(reversed(trimmed))
@@ -0,0 +1,205 @@
+import bisect
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
+# Parameters of routed intents that must name a node in the graph
+ENTITY_PARAMETERS = ("node_id", "from_id", "to_id")
+
+# Trigram candidates (most shared trigrams first) checked with the exact edit distance
+RERANK_CANDIDATES = 10
+
+def _normalize(text: str) -> str:
+    """Same normalization as the rules: lowercase, -, _ and : act as spaces."""
+    return re.sub(r"[\s\-_:]+", " ", text.lower()).strip()
+
+def _trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _max_typos(text: str) -> int:
+    """Edits tolerated for a query of this length: none below 4 characters, two from 12."""
+    if len(text) < 4:
+        return 0
+    return 1 if len(text) < 12 else 2
+
+def edit_distance(a: str, b: str, bound: int) -> int:
+    """Damerau-Levenshtein (optimal string alignment) distance, or bound + 1 once it is exceeded."""
+    if abs(len(a) - len(b)) > bound:
+        return bound + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if previous2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > bound:
+            return bound + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+class EntityResolver:
+    """
+    Maps the node ids the router produces (LLM guesses like "order service" or
+    "service:order-servce") onto real node ids.
+
+    Lookups go exact match -> closest key within a small edit distance ->
+    unique prefix. Keys are a node's id, its id without the type prefix and its
+    name. Trigram postings are bucketed by key length, so only keys of a
+    length that could be within the edit budget are looked at; and since one
+    edit (a transposition included) changes at most four trigrams, a key
+    within k edits must share a trigram from the query's 4k + 1 rarest, which
+    keeps common fragments like "ser" from "service" from turning every
+    lookup into a scan.
+    """
+
+    def __init__(self):
+        self.exact: Dict[str, Set[str]] = {}
+        self.keys: List[str] = []
+        self.key_trigrams: List[Set[str]] = []
+        # (trigram, key length) -> key indexes
+        self.postings: Dict[Tuple[str, int], List[int]] = {}
+        self.types: Set[str] = set()
+
+    def __len__(self):
+        return len(self.exact)
+
+    def build(self, nodes: List[Dict]):
+        """(Re)builds the index from node dicts with `id` and optional `name`."""
+        exact: Dict[str, Set[str]] = {}
+        # The full "type:name" ids only go in the exact map; the type is matched separately
+        fuzzy_keys = set()
+        types = set()
+        for node in nodes:
+            node_id = node.get('id')
+            if not node_id:
+                continue
+            node_type, _, bare = node_id.partition(':')
+            if bare:
+                types.add(node_type.lower())
+            exact.setdefault(_normalize(node_id), set()).add(node_id)
+            for key in (bare, node.get('name')):
+                if key:
+                    key = _normalize(key)
+                    exact.setdefault(key, set()).add(node_id)
+                    fuzzy_keys.add(key)
+
+        keys = sorted(fuzzy_keys)
+        postings: Dict[Tuple[str, int], List[int]] = {}
+        key_trigrams = []
+        for index, key in enumerate(keys):
+            grams = _trigrams(key)
+            key_trigrams.append(grams)
+            for gram in grams:
+                postings.setdefault((gram, len(key)), []).append(index)
+
+        self.exact = exact
+        self.keys = keys
+        self.key_trigrams = key_trigrams
+        self.postings = postings
+        self.types = types
+
+    def _type_filter(self, text: str) -> Tuple[Optional[str], str]:
+        """Splits a leading node type ("service order servce", "servce ...") off the query."""
+        head, _, rest = text.partition(' ')
+        if rest:
+            if head in self.types:
+                return head, rest
+            close = [t for t in self.types if edit_distance(head, t, 1) <= 1]
+            if len(close) == 1:
+                return close[0], rest
+        return None, text
+
+    def _ids(self, key: str, node_type: Optional[str]) -> Set[str]:
+        ids = self.exact.get(key, set())
+        if node_type:
+            ids = {i for i in ids if i.lower().startswith(node_type + ':')}
+        return ids
+
+    def _prefix_ids(self, text: str, node_type: Optional[str], limit: int) -> Set[str]:
+        """Ids of keys starting with text; stops after limit + 1 so a short prefix stays cheap."""
+        ids = set()
+        position = bisect.bisect_left(self.keys, text)
+        while position < len(self.keys) and self.keys[position].startswith(text) and len(ids) <= limit:
+            ids |= self._ids(self.keys[position], node_type)
+            position += 1
+        return ids
+
+    def _fuzzy(self, text: str, node_type: Optional[str]) -> List[Tuple[int, str]]:
+        """(edit distance, id) of the closest keys within the typo budget, best first."""
+        bound = _max_typos(text)
+        if not bound:
+            return []
+        grams = _trigrams(text)
+        lengths = range(len(text) - bound, len(text) + bound + 1)
+        sizes = {g: sum(len(self.postings.get((g, n), ())) for n in lengths) for g in grams}
+        candidates = set()
+        for gram in sorted(grams, key=sizes.get)[:4 * bound + 1]:
+            for n in lengths:
+                candidates.update(self.postings.get((gram, n), ()))
+
+        needed = len(grams) - 4 * bound
+        scored = []
+        for index in candidates:
+            shared = len(grams & self.key_trigrams[index])
+            if shared >= needed:
+                scored.append((-shared, self.keys[index]))
+        scored.sort()
+
+        best: Dict[str, int] = {}
+        for _, key in scored[:RERANK_CANDIDATES]:
+            distance = edit_distance(text, key, bound)
+            if distance > bound:
+                continue
+            for node_id in self._ids(key, node_type):
+                best[node_id] = min(distance, best.get(node_id, distance))
+        return sorted(((distance, node_id) for node_id, distance in best.items()))
+
+    def resolve(self, text: str, limit: int = 5) -> Tuple[Optional[str], List[str]]:
+        """
+        Returns (node_id, candidates). node_id is set when the text names exactly
+        one node, otherwise candidates lists the closest ids, best first.
+        """
+        if not text or not self.exact:
+            return None, []
+        normalized = _normalize(text)
+        node_type, bare = self._type_filter(normalized)
+
+        for key in (normalized, bare):
+            ids = self._ids(key, node_type)
+            if len(ids) == 1:
+                return next(iter(ids)), []
+            if ids:
+                return None, sorted(ids)[:limit]
+
+        ranked = self._fuzzy(bare, node_type)
+        # A single closest match within the typo budget wins
+        if ranked and (len(ranked) == 1 or ranked[0][0] < ranked[1][0]):
+            return ranked[0][1], []
+
+        prefixed = self._prefix_ids(bare, node_type, limit)
+        if len(prefixed) == 1 and not ranked:
+            return next(iter(prefixed)), []
+
+        candidates = [node_id for _, node_id in ranked]
+        candidates += sorted(prefixed - set(candidates))
+        return None, candidates[:limit]
+
+    def normalize_parameters(self, parameters: Dict) -> Dict[str, List[str]]:
+        """
+        Replaces every entity parameter with the node id it resolves to, in place.
+        Returns the candidates for parameters that could not be resolved.
+        """
+        ambiguous = {}
+        for name in ENTITY_PARAMETERS:
+            value = parameters.get(name)
+            if not isinstance(value, str) or not value:
+                continue
+            node_id, candidates = self.resolve(value)
+            if node_id:
+                parameters[name] = node_id
+            elif candidates:
+                ambiguous[name] = candidates
+        return ambiguous
@@ -1,71 +1,152 @@
 import os
 import json
-from openai import OpenAI
-from typing import Dict, Any
+import threading
+from typing import Dict, Any, List, Iterator
+from .rules import RuleRouter
+from .resolver import EntityResolver
+from .context import estimate_tokens, fit_text, trim_history
+from .templates import format_answer
+from telemetry.tracing import span
+
+# "templates" formats structured results locally and only asks the LLM to
+# summarize free-form ones; "llm" summarizes every answer
+ANSWER_MODE = os.getenv("ANSWER_MODE", "templates").lower()
+# Token budgets (estimated) for the chat history sent with the routing
+# prompt, and the graph result embedded in a summary prompt
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "300"))
+RESULT_TOKEN_BUDGET = int(os.getenv("RESULT_TOKEN_BUDGET", "1500"))
+# Tokens of few-shot examples allowed on top of the routing prompt's instructions
+PROMPT_EXAMPLE_TOKENS = int(os.getenv("PROMPT_EXAMPLE_TOKENS", "120"))
+
+ROUTING_PROMPT = """
+Translate the user's question about an Engineering Knowledge Graph into query intent JSON.
+Do not answer the question; only output the JSON.
+
+Intents:
+1. `get_owner(node_id)`: "Who owns X?", "Team for X".
+2. `blast_radius(node_id, max_depth?)`: "What breaks if X goes down?", "Impact of X", "Dependencies of X". Set `max_depth` only when the user bounds it ("within 2 hops" -> 2, "direct dependents" -> 1).
+3. `upstream(node_id)`: "What depends on X?", "Root cause for X".
+4. `shortest_path(from_id, to_id)`: "How does A connect to B?", "Path between A and B".
+5. `get_node(node_id)`: "Details about X", "Show me X".
+6. `get_nodes(type)`: "List all services", "Show databases". `type` is 'service', 'database' or 'team'.
+7. `pager(node_id)`: "Who should I page?", "Is X down?", "X failed", "Oncall for X".
+8. `criticality(type?)`: "Most critical services?", "Riskiest components", "Single points of failure". `type` is optional.
+
+Node ids are prefixed by type: `service:`, `database:`, `cache:`, `team:` ("order service" -> "service:order-service"). Close guesses are resolved to the nearest real node.
+
+Output: {"intent": "...", "parameters": {"arg_name": "value"}, "explanation": "brief reason"}
+"""
+
+# The first always goes in the routing prompt; the rest in order while PROMPT_EXAMPLE_TOKENS allows
+ROUTING_EXAMPLES = [
+    """
+User: "Who should I page if orders-db is down?"
+Output: {"intent": "pager", "parameters": {"node_id": "database:orders-db"}, "explanation": "On-call for a failing node."}
+""",
+    """
+User: "Who owns the payment service?"
+Output: {"intent": "get_owner", "parameters": {"node_id": "service:payment-service"}, "explanation": "Ownership."}
+""",
+]
+
+def routing_prompt(example_tokens: int = None) -> str:
+    """
+    The routing system prompt: the instructions, then as many examples as fit
+    in `example_tokens` (default PROMPT_EXAMPLE_TOKENS). The first example is
+    kept even when it doesn't fit, so the LLM always sees the output format.
+    """
+    budget = estimate_tokens(ROUTING_PROMPT) + (PROMPT_EXAMPLE_TOKENS if example_tokens is None else example_tokens)
+    prompt = ROUTING_PROMPT + ROUTING_EXAMPLES[0]
+    for example in ROUTING_EXAMPLES[1:]:
+        if estimate_tokens(prompt + example) > budget:
+            break
+        prompt += example
+    return prompt
 
 class ChatRouter:
     def __init__(self):
-        api_key = os.getenv("GROQ_API_KEY")
-        if not api_key:
+        # Local rules answer common questions without an LLM round trip
+        self.rules = RuleRouter()
+        # Snaps node ids in routed parameters onto real nodes
+        self.resolver = EntityResolver()
+        self.stats = {"rules": 0, "llm": 0}
+        # How answers were written: local templates or an LLM summary
+        self.answer_stats = {"templates": 0, "llm": 0}
+        # The API server routes from several threads
+        self._stats_lock = threading.Lock()
+
+        self.api_key = os.getenv("GROQ_API_KEY")
+        if not self.api_key:
             # Fallback or error
             print("Warning: GROQ_API_KEY not set.")
-            self.client = None
-        else:
-            self.client = OpenAI(
-                api_key=api_key,
+        # Created on first use: importing openai is slow and rule-routed questions never need it
+        self._client = None
+
+        self.system_prompt = routing_prompt()
+
+    @property
+    def client(self):
+        """The LLM client, or None without an API key."""
+        if self._client is None and self.api_key:
+            from openai import OpenAI
+            self._client = OpenAI(
+                api_key=self.api_key,
                 base_url="https://api.groq.com/openai/v1"
             )
+        return self._client
 
-        self.system_prompt = """
-You are an expert Engineering Knowledge Graph Assistant.
-Your job is to translate user natural language queries into specific Graph Query Intent JSON.
-You DO NOT answer the question. You only output the JSON to query the graph.
-
-AVAILABLE INTENTS (Tools):
-1. `get_owner(node_id)`: For "Who owns X?", "Team for X".
-2. `blast_radius(node_id)`: For "What breaks if X goes down?", "Impact of X", "Dependencies of X".
-3. `upstream(node_id)`: For "What depends on X?", "Root cause for X".
-4. `shortest_path(from_id, to_id)`: For "How does A connect to B?", "Path between A and B".
-5. `get_node(node_id)`: For "Details about X", "Show me X".
-6. `get_nodes(type)`: For "List all services", "Show databases". `type` can be 'service', 'database', 'team'.
-7. `pager(node_id)`: For "Who should I page?", "Is X down?", "X failed", "Oncall for X".
-
-ENTITY RESOLUTION:
-- Users might say "order service" -> You must map to ID "service:order-service" or "order-service" (fuzzy matches handled by backend if needed, but try to guess standard IDs).
-- Teams start with `team:`.
-- Services start with `service:`.
-- Databases start with `database:`.
-- Caches start with `cache:`.
-
-OUTPUT FORMAT:
-{
-  "intent": "function_name",
-  "parameters": {
-    "arg_name": "value"
-  },
-  "explanation": "Brief reason for this query"
-}
-
-EXAMPLE:
-User: "Who owns the payment service?"
-Output:
-{
-  "intent": "get_owner",
-  "parameters": { "node_id": "service:payment-service" },
-  "explanation": "User is asking for ownership."
-}
-
-EXAMPLE:
-User: "Who should I page if orders-db is down?"
-Output:
-{
-  "intent": "pager",
-  "parameters": { "node_id": "database:orders-db" },
-  "explanation": "User is asking for on-call/paging info."
-}
-"""
+    def set_entities(self, nodes: List[Dict]):
+        """
+        Node names/ids the local rules and the resolver match against. Call after
+        (re-)ingestion. Safe while other threads route: each index is built aside
+        and swapped in whole.
+        """
+        self.rules.set_entities(nodes)
+        resolver = EntityResolver()
+        resolver.build(nodes)
+        self.resolver = resolver
+
+    def _count(self, counts: Dict[str, int], key: str):
+        with self._stats_lock:
+            counts[key] += 1
+
+    def counters(self) -> Dict[str, Dict[str, int]]:
+        """Consistent copies of `stats` and `answer_stats`."""
+        with self._stats_lock:
+            return {"router": dict(self.stats), "answers": dict(self.answer_stats)}
+
+    def hit_rate(self) -> float:
+        """Share of routed questions answered by the local rules."""
+        with self._stats_lock:
+            total = self.stats["rules"] + self.stats["llm"]
+            return self.stats["rules"] / total if total else 0.0
 
     def route(self, user_query: str, history: list = None) -> Dict[str, Any]:
+        """
+        Returns intent JSON. The result's `source` is "rules" when a local rule
+        matched confidently, otherwise "llm". Node ids in the parameters are
+        resolved to real nodes; ids that match several nodes are listed under
+        `candidates` (parameter name -> ids) instead.
+        """
+        with span("chat.route") as s:
+            matched = self.rules.match(user_query)
+            if matched:
+                self._count(self.stats, "rules")
+                matched["source"] = "rules"
+                s.set(source="rules", intent=matched.get("intent"))
+                return matched
+
+            routed = self._route_llm(user_query, history)
+            parameters = routed.get("parameters")
+            if isinstance(parameters, dict):
+                candidates = self.resolver.normalize_parameters(parameters)
+                if candidates:
+                    routed["candidates"] = candidates
+            s.set(source=routed.get("source"), intent=routed.get("intent"))
+            return routed
+
+    def _route_llm(self, user_query: str, history: list = None) -> Dict[str, Any]:
+
         if not self.client:
             return {"error": "No LLM Client configured."}
 
@@ -73,33 +154,43 @@ Output:
             {"role": "system", "content": self.system_prompt}
         ]
         if history:
-            # Add a few recent messages for context resolution (e.g. "What about THAT service?")
-            # limit to last 2 turns
-            # Sanitize history to strip 'data' or other UI-specific fields not supported by OpenAI API
-            sanitized_history = []
-            for msg in history[-4:]:
-                clean_msg = {
-                    "role": msg.get("role"),
-                    "content": msg.get("content")
-                }
-                sanitized_history.append(clean_msg)
-            
-            messages.extend(sanitized_history)
-        
+            # Recent messages resolve follow-ups ("What about THAT service?"). The UI
+            # has already appended this question, which is sent below anyway.
+            if history[-1].get("role") == "user" and history[-1].get("content") == user_query:
+                history = history[:-1]
+            # Only role and content: 'data' and other UI fields aren't accepted by the API
+            messages.extend(trim_history(history, HISTORY_TOKEN_BUDGET))
+
         messages.append({"role": "user", "content": user_query})
 
         try:
-            response = self.client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=messages,
-                response_format={ "type": "json_object" },
-                temperature=0.0
-            )
+            with span("llm.completion", purpose="route") as s:
+                response = self.client.chat.completions.create(
+                    model="llama-3.3-70b-versatile",
+                    messages=messages,
+                    response_format={ "type": "json_object" },
+                    temperature=0.0
+                )
+                _record_usage(s, response.usage)
             content = response.choices[0].message.content
-            return json.loads(content)
+            self._count(self.stats, "llm")
+            routed = json.loads(content)
+            routed["source"] = "llm"
+            return routed
         except Exception as e:
             return {"error": str(e)}
 
+    def _summary_prompt(self, user_query: str, query_result: Any) -> str:
+        result = fit_text(json.dumps(query_result, default=str), RESULT_TOKEN_BUDGET)
+        return f"""
+        User asked: "{user_query}"
+        Graph Database returned: {result}
+        
+        Please provide a concise, friendly, engineer-to-engineer answer parsing the graph data.
+        If the data is empty, say so politely.
+        Do not hallucinate edges that aren't there.
+        """
+
     def summarize_response(self, user_query: str, query_result: Any) -> str:
         """
         Optional: Convert structured graph data back to natural language.
@@ -107,21 +198,79 @@ Output:
         if not self.client:
             return str(query_result)
             
-        summary_prompt = f"""
-        User asked: "{user_query}"
-        Graph Database returned: {json.dumps(query_result, default=str)}
+        summary_prompt = self._summary_prompt(user_query, query_result)
         
-        Please provide a concise, friendly, engineer-to-engineer answer parsing the graph data.
-        If the data is empty, say so politely.
-        Do not hallucinate edges that aren't there.
+        try:
+            with span("chat.summarize") as s:
+                response = self.client.chat.completions.create(
+                    model="llama-3.3-70b-versatile",
+                    messages=[{"role": "user", "content": summary_prompt}],
+                    temperature=0.3
+                )
+                _record_usage(s, response.usage)
+            return response.choices[0].message.content
+        except Exception as e:
+            return f"Error summarizing: {e}. Raw Data: {query_result}"
+
+    def answer(self, user_query: str, intent: str, parameters: Dict, query_result: Any) -> Iterator[str]:
         """
-        
+        Yields the answer to a routed question. In the "templates" answer mode,
+        structured intents (ownership, paging, listings, blast radius counts,
+        paths, rankings) are formatted locally, so the question costs at most
+        one LLM call (routing); anything else is streamed from the LLM summary.
+        """
+        if ANSWER_MODE == "templates":
+            with span("chat.template", intent=intent) as s:
+                text = format_answer(intent, parameters, query_result)
+                s.set(hit=text is not None)
+            if text is not None:
+                self._count(self.answer_stats, "templates")
+                yield text
+                return
+        self._count(self.answer_stats, "llm")
+        yield from self.stream_summary(user_query, query_result)
+
+    def stream_summary(self, user_query: str, query_result: Any) -> Iterator[str]:
+        """
+        Streaming variant of summarize_response: yields text chunks as the LLM
+        produces them, so the UI can render the answer progressively.
+        """
+        if not self.client:
+            yield str(query_result)
+            return
+
+        summary_prompt = self._summary_prompt(user_query, query_result)
+
+        # Not made current: the caller's code runs between chunks
+        s = span("chat.summarize", stream=True).start(activate=False)
+        error = None
         try:
-            response = self.client.chat.completions.create(
+            stream = self.client.chat.completions.create(
                 model="llama-3.3-70b-versatile",
                 messages=[{"role": "user", "content": summary_prompt}],
-                temperature=0.3
+                temperature=0.3,
+                stream=True,
+                stream_options={"include_usage": True}
             )
-            return response.choices[0].message.content
+            for chunk in stream:
+                if getattr(chunk, "usage", None):
+                    _record_usage(s, chunk.usage)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    if "first_token_ms" not in s.attributes:
+                        s.set(first_token_ms=s.elapsed_ms())
+                    yield delta
         except Exception as e:
-            return f"Error summarizing: {e}. Raw Data: {query_result}"
+            error = e
+            yield f"Error summarizing: {e}. Raw Data: {query_result}"
+        finally:
+            s.end(error)
+
+def _record_usage(s, usage):
+    """Copies an OpenAI-style usage block onto a span."""
+    if usage is None:
+        return
+    s.set(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens,
+          tokens=usage.total_tokens)
@@ -0,0 +1,142 @@
+import re
+from typing import List, Dict, Optional, Tuple
+
+# Plural nouns accepted by get_nodes, mapped to the `type` parameter
+NODE_TYPES = {
+    "services": "service",
+    "databases": "database",
+    "dbs": "database",
+    "teams": "team",
+    "caches": "cache",
+}
+
+# Checked in order; the first pattern that matches with the right number of
+# entities wins. Explicit paging words beat ownership ("what team should I page"),
+# and blast radius beats the weaker outage words so "what breaks if X goes down"
+# isn't read as "is X down".
+INTENT_PATTERNS = [
+    ("shortest_path", 2, re.compile(r"\b(path|connect(s|ed)?|route|link(ed)?)\b")),
+    ("pager", 1, re.compile(r"\b(page|pager|on ?call)\b")),
+    ("get_owner", 1, re.compile(r"\b(who owns|owner|owned by|which team|what team|team (for|of|behind))\b")),
+    ("blast_radius", 1, re.compile(r"\b(breaks?|blast radius|impact(ed)?|affected|depends? on|dependen(ts|cies)|downstream|upstream)\b")),
+    ("pager", 1, re.compile(r"\b(down|fail(ed|ing|s)?|outage|incident|alert(ing)?)\b")),
+    ("get_node", 1, re.compile(r"\b(details?|show( me)?|tell me about|what is|describe|info(rmation)?)\b")),
+]
+
+LIST_PATTERN = re.compile(r"\b(list|show|all|which|what)\b")
+
+# Whole-graph ranking questions: "what are our most critical services?"
+CRITICALITY_PATTERN = re.compile(r"\b(most critical|criticality|riskiest|most risky|single points? of failure|spofs?)\b")
+
+# Bounds a blast radius: "within 2 hops", "3 levels deep", "direct dependents"
+DEPTH_PATTERN = re.compile(r"\b(\d+) (hops?|levels?)\b")
+DIRECT_PATTERN = re.compile(r"\b(direct(ly)?|immediate(ly)?)\b")
+
+# Intents about a resource's team; a team entity ("services owned by platform team")
+# asks the reverse question, which these rules can't answer
+RESOURCE_INTENTS = {"get_owner", "pager"}
+TEAM_PREFIX = "team:"
+
+def _normalize(text: str) -> str:
+    """Lowercase and treat -, _ and : as word separators ("payment-service" == "payment service")."""
+    return re.sub(r"[\s\-_:]+", " ", text.lower()).strip()
+
+class RuleRouter:
+    """
+    Deterministic intent classifier used before falling back to the LLM.
+    Entities are resolved against the node names/ids currently in the graph;
+    a rule only answers when every entity it needs is found unambiguously.
+    """
+
+    def __init__(self):
+        # (normalized name or id -> set of node ids, pattern matching any of them),
+        # swapped as one so a concurrent find_entities never sees a mismatched pair
+        self._entities: Tuple[Dict[str, set], Optional[re.Pattern]] = ({}, None)
+
+    @property
+    def entities(self) -> Dict[str, set]:
+        return self._entities[0]
+
+    def set_entities(self, nodes: List[Dict]):
+        entities: Dict[str, set] = {}
+        for node in nodes:
+            node_id = node.get('id')
+            if not node_id:
+                continue
+            for key in (node_id, node.get('name')):
+                if key:
+                    entities.setdefault(_normalize(key), set()).add(node_id)
+        # Longest names first so "orders db" wins over a shorter overlapping name
+        names = sorted(entities, key=len, reverse=True)
+        pattern = re.compile(r"\b(" + "|".join(map(re.escape, names)) + r")\b") if names else None
+        self._entities = (entities, pattern)
+
+    def find_entities(self, text: str) -> Optional[List[str]]:
+        """Node ids mentioned in the text, in order. None if a mention is ambiguous."""
+        entities, pattern = self._entities
+        if not pattern:
+            return []
+        found = []
+        for match in pattern.finditer(text):
+            ids = entities[match.group(1)]
+            if len(ids) != 1:
+                return None
+            node_id = next(iter(ids))
+            if node_id not in found:
+                found.append(node_id)
+        return found
+
+    def match(self, user_query: str) -> Optional[Dict]:
+        """Returns an intent dict in the same shape as the LLM output, or None."""
+        text = _normalize(user_query)
+        entities = self.find_entities(text)
+        if entities is None:
+            return None
+
+        if not entities:
+            return self._match_criticality(text) or self._match_list(text)
+
+        for intent, arity, pattern in INTENT_PATTERNS:
+            if len(entities) != arity or not pattern.search(text):
+                continue
+            if intent in RESOURCE_INTENTS and entities[0].startswith(TEAM_PREFIX):
+                continue
+            if arity == 2:
+                parameters = {"from_id": entities[0], "to_id": entities[1]}
+            else:
+                parameters = {"node_id": entities[0]}
+            if intent == "blast_radius":
+                depth = DEPTH_PATTERN.search(text)
+                if depth:
+                    parameters["max_depth"] = int(depth.group(1))
+                elif DIRECT_PATTERN.search(text):
+                    parameters["max_depth"] = 1
+            return {
+                "intent": intent,
+                "parameters": parameters,
+                "explanation": f"Matched local rule for {intent}.",
+            }
+        return None
+
+    def _match_criticality(self, text: str) -> Optional[Dict]:
+        if not CRITICALITY_PATTERN.search(text):
+            return None
+        types = {t for word, t in NODE_TYPES.items() if re.search(rf"\b{word}\b", text)}
+        parameters = {"type": types.pop()} if len(types) == 1 else {}
+        return {
+            "intent": "criticality",
+            "parameters": parameters,
+            "explanation": "Matched local rule for criticality.",
+        }
+
+    def _match_list(self, text: str) -> Optional[Dict]:
+        if not LIST_PATTERN.search(text):
+            return None
+        types = {t for word, t in NODE_TYPES.items() if re.search(rf"\b{word}\b", text)}
+        if len(types) != 1:
+            return None
+        return {
+            "intent": "get_nodes",
+            "parameters": {"type": types.pop()},
+            "explanation": "Matched local rule for get_nodes.",
+        }
@@ -0,0 +1,111 @@
+from typing import Any, Callable, Dict, List, Optional
+
+# Node ids named in a templated answer before the rest are only counted
+LIST_LIMIT = 15
+
+def _plural(count: int, word: str) -> str:
+    return f"{count} {word}{'' if count == 1 else 's'}"
+
+def _name(node: Dict) -> str:
+    return f"`{node.get('id', node.get('name', 'unknown'))}`"
+
+def _names(nodes: List[Dict], limit: int = LIST_LIMIT) -> str:
+    shown = ", ".join(_name(n) for n in nodes[:limit])
+    return shown + (f" and {len(nodes) - limit} more" if len(nodes) > limit else "")
+
+def _owner(params: Dict, result: Any) -> Optional[str]:
+    if not isinstance(result, list):
+        return None
+    node = params.get("node_id")
+    if not result:
+        return f"No team owns `{node}` in the graph."
+    lines = [f"`{node}` is owned by " + " and ".join(f"**{t.get('name', t.get('id'))}**" for t in result) + "."]
+    for team in result:
+        contacts = [f"{label}: {team[key]}" for key, label in (("lead", "Lead"), ("slack", "Slack"),
+                                                               ("pagerduty", "PagerDuty")) if team.get(key)]
+        if contacts:
+            lines.append(f"- {team.get('name', team.get('id'))}: " + ", ".join(contacts))
+    return "\n".join(lines)
+
+def _pager(params: Dict, result: Any) -> Optional[str]:
+    """Service-level on-call first, then the owning team's lead."""
+    if not isinstance(result, dict) or "owners" not in result:
+        return None
+    node_id = params.get("node_id")
+    node, owners = result.get("node"), result.get("owners") or []
+    if not node and not owners:
+        return f"Could not find resource or owners for {node_id}."
+    team = owners[0] if owners else {}
+    oncall = (node or {}).get("oncall") or team.get("lead", "N/A")
+    return (f"{node_id} is owned by the {team.get('name', 'Unknown Team')}. Primary on-call: {oncall} "
+            f"(PagerDuty: {team.get('pagerduty', 'N/A')}).")
+
+def _nodes(params: Dict, result: Any) -> Optional[str]:
+    if not isinstance(result, list):
+        return None
+    kind = params.get("type") or "node"
+    if not result:
+        return f"No {kind} nodes found."
+    return f"Found {_plural(len(result), kind + ' node')}: {_names(result)}."
+
+def _blast_radius(params: Dict, result: Any) -> Optional[str]:
+    if not isinstance(result, dict) or "downstream_impact" not in result:
+        return None
+    node = result.get("node")
+    downstream, upstream = result["downstream_impact"], result.get("upstream_dependencies", [])
+    total = result.get("count_affected")
+    count = f"{total}" if total is not None else f"{len(downstream)}+"
+    within = f" within {_plural(result['max_depth'], 'hop')}" if result.get("max_depth") else ""
+    if not downstream:
+        lines = [f"Nothing depends on `{node}`{within}, so its failure affects no other node."]
+    else:
+        lines = [f"If `{node}` fails, **{count}** {'node breaks' if count == '1' else 'nodes break'}{within}."]
+    for group in result.get("downstream_by_hop", []):
+        lines.append(f"- Hop {group['hop']} ({len(group['nodes'])}): {_names(group['nodes'])}")
+    if downstream and not result.get("downstream_by_hop"):
+        lines.append(f"- Affected: {_names(downstream)}")
+    if upstream:
+        lines.append(f"It depends on {_plural(len(upstream), 'node')}: {_names(upstream)}.")
+    return "\n".join(lines)
+
+def _criticality(params: Dict, result: Any) -> Optional[str]:
+    if not isinstance(result, list):
+        return None
+    if not result:
+        return "No dependencies found to rank."
+    lines = ["Most critical nodes by what breaks if they fail:"]
+    lines += [f"{r['rank']}. `{r['id']}`: {_plural(r['downstream_count'], 'dependent')}, "
+              f"{_plural(r['team_count'], 'team')} affected"
+              for r in result]
+    return "\n".join(lines)
+
+def _path(params: Dict, result: Any) -> Optional[str]:
+    if not isinstance(result, list):
+        return None
+    if not result:
+        return f"No path found between `{params.get('from_id')}` and `{params.get('to_id')}`."
+    steps = [_name(item) if isinstance(item, dict) else f"-[{item}]-" for item in result]
+    hops = sum(1 for item in result if not isinstance(item, dict))
+    return f"`{params.get('from_id')}` reaches `{params.get('to_id')}` in {_plural(hops, 'hop')}: " + " ".join(steps)
+
+# Intent -> formatter(parameters, result); None from a formatter means "let the LLM summarize"
+TEMPLATES: Dict[str, Callable[[Dict, Any], Optional[str]]] = {
+    "get_owner": _owner,
+    "pager": _pager,
+    "get_nodes": _nodes,
+    "blast_radius": _blast_radius,
+    "upstream": _blast_radius,
+    "criticality": _criticality,
+    "shortest_path": _path,
+}
+
+def format_answer(intent: str, params: Dict, result: Any) -> Optional[str]:
+    """The answer to a structured intent, formatted locally, or None for free-form cases."""
+    template = TEMPLATES.get(intent)
+    if template is None or isinstance(result, str):
+        return None
+    try:
+        return template(params or {}, result)
+    except (KeyError, TypeError, AttributeError):
+        # An unexpected result shape is the LLM's to describe
+        return None
@@ -1,19 +1,122 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Tuple
+from typing import List, Tuple, Union, Iterator
+import fnmatch
+import glob
+import os
+
+from .records import NodeRecord, EdgeRecord, Record
+from telemetry.tracing import span
+
+# Extensions picked up when a connector is pointed at a directory
+YAML_EXTENSIONS = ('.yml', '.yaml')
 
 class BaseConnector(ABC):
     """
     Abstract base class for all connectors.
-    Connectors are responsible for parsing a specific source file
-    and returning a list of nodes and edges in a standardized dictionary format.
+    Connectors are responsible for parsing a specific kind of source file
+    and returning a list of nodes and edges as NodeRecord / EdgeRecord
+    (connectors.records), which read like the standardized dictionary format below.
+
+    `file_path` may be a single file, a directory (all YAML files below it),
+    a glob pattern, or a list of any of these.
     """
 
+    def __init__(self, file_path: Union[str, List[str]]):
+        self.file_path = file_path
+
+    def patterns(self) -> List[str]:
+        if isinstance(self.file_path, (list, tuple)):
+            return list(self.file_path)
+        return [self.file_path]
+
+    def source_files(self) -> List[str]:
+        """Expands file_path into the concrete files this connector reads."""
+        files = []
+        for pattern in self.patterns():
+            if os.path.isdir(pattern):
+                for root, _, names in os.walk(pattern):
+                    files.extend(os.path.join(root, n) for n in names if n.endswith(YAML_EXTENSIONS))
+            elif glob.has_magic(pattern):
+                matches = glob.glob(pattern, recursive=True)
+                if not matches:
+                    print(f"Warning: Pattern {pattern} matched no files.")
+                files.extend(matches)
+            else:
+                # Missing files are reported by load_file
+                files.append(pattern)
+        # Stable order and no duplicates when patterns overlap
+        return sorted(set(files))
+
+    def owns(self, path: str) -> bool:
+        """Whether a file at `path` is, or once created would be, one of source_files()."""
+        path = os.path.abspath(path)
+        for pattern in self.patterns():
+            target = os.path.abspath(pattern)
+            if glob.has_magic(pattern):
+                # fnmatch's * crosses directories; "**/" may also match none
+                if fnmatch.fnmatch(path, target) or fnmatch.fnmatch(path, target.replace(f"**{os.sep}", "")):
+                    return True
+            elif path == target:
+                return True
+            elif os.path.isdir(target) and path.startswith(target + os.sep) and path.endswith(YAML_EXTENSIONS):
+                return True
+        return False
+
+    def watch_roots(self) -> List[Tuple[str, bool]]:
+        """(directory, recursive) pairs that see every change to source_files(), see connectors.watcher."""
+        roots = []
+        for pattern in self.patterns():
+            target = os.path.abspath(pattern)
+            if glob.has_magic(pattern):
+                # Deepest directory above the first wildcard
+                parts = []
+                for part in target.split(os.sep):
+                    if glob.has_magic(part):
+                        break
+                    parts.append(part)
+                roots.append((os.sep.join(parts) or os.sep, True))
+            elif os.path.isdir(target):
+                roots.append((target, True))
+            else:
+                roots.append((os.path.dirname(target), False))
+        return roots
+
+    def load(self) -> Tuple[List[NodeRecord], List[EdgeRecord]]:
+        """
+        Parses every source file and returns a tuple of (nodes, edges).
+        See connectors.runner for loading files in parallel.
+        """
+        nodes, edges = [], []
+        with span("connector.load", connector=self.__class__.__name__) as s:
+            for path in self.source_files():
+                file_nodes, file_edges = self.load_file(path)
+                nodes.extend(file_nodes)
+                edges.extend(file_edges)
+            s.set(rows=len(nodes) + len(edges), nodes=len(nodes), edges=len(edges))
+        return nodes, edges
+
+    def stream(self) -> Iterator[Tuple[str, Record]]:
+        """
+        Yields ("node", node) and ("edge", edge) records one at a time across all
+        source files. Connectors that can parse incrementally override stream_file
+        so callers never hold a whole file's worth of parsed YAML.
+        """
+        for path in self.source_files():
+            yield from self.stream_file(path)
+
+    def stream_file(self, file_path: str) -> Iterator[Tuple[str, Record]]:
+        nodes, edges = self.load_file(file_path)
+        for node in nodes:
+            yield "node", node
+        for edge in edges:
+            yield "edge", edge
+
     @abstractmethod
-    def load(self) -> Tuple[List[Dict], List[Dict]]:
+    def load_file(self, file_path: str) -> Tuple[List[NodeRecord], List[EdgeRecord]]:
         """
-        Parses the source and returns a tuple of (nodes, edges).
-        
-        Node format:
+        Parses a single source file and returns a tuple of (nodes, edges).
+
+        Node format (NodeRecord):
         {
             "id": "type:name",
             "type": "service|database|team|etc",
@@ -21,7 +124,7 @@ class BaseConnector(ABC):
             "properties": { "key": "value" }
         }
 
-        Edge format:
+        Edge format (EdgeRecord; the id is derived from source, type and target):
         {
             "id": "edge:source-type-target",
             "type": "calls|depends_on|owns",
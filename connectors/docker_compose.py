@@ -1,24 +1,26 @@
 import yaml
 import os
-from typing import List, Dict, Tuple
+from typing import List, Tuple
 from .base import BaseConnector
+from .records import NodeRecord, EdgeRecord
 
 class DockerComposeConnector(BaseConnector):
-    def __init__(self, file_path: str):
-        self.file_path = file_path
-
-    def load(self) -> Tuple[List[Dict], List[Dict]]:
-        if not os.path.exists(self.file_path):
-            print(f"Warning: File {self.file_path} not found.")
+    def load_file(self, file_path: str) -> Tuple[List[NodeRecord], List[EdgeRecord]]:
+        if not os.path.exists(file_path):
+            print(f"Warning: File {file_path} not found.")
             return [], []
 
-        with open(self.file_path, 'r') as f:
+        with open(file_path, 'r') as f:
             try:
                 data = yaml.safe_load(f)
             except yaml.YAMLError as exc:
                 print(f"Error parsing YAML: {exc}")
                 return [], []
 
+        # Directories and globs can pick up empty or unrelated YAML files
+        if not isinstance(data, dict):
+            return [], []
+
         nodes = []
         edges = []
         services = data.get('services', {})
@@ -40,18 +42,13 @@ class DockerComposeConnector(BaseConnector):
             node_id = f"{node_label.lower()}:{service_name}"
             
             # Construct Node
-            node = {
-                "id": node_id,
-                "type": node_label,
-                "name": service_name,
-                "properties": {
-                    "image": image,
-                    "build": config.get('build', ''),
-                }
-            }
+            node = NodeRecord(node_id, node_label, service_name, {
+                "image": image,
+                "build": config.get('build', ''),
+            })
             # Add labels to properties
             for k, v in labels.items():
-                node['properties'][k] = v
+                node.properties[k] = v
             
             nodes.append(node)
 
@@ -76,13 +73,7 @@ class DockerComposeConnector(BaseConnector):
                     target_type = service_type_map.get(dep)
                     if target_type:
                         target_id = f"{target_type.lower()}:{dep}"
-                        edges.append({
-                            "id": f"edge:{service_name}-depends_on-{dep}",
-                            "type": "depends_on",
-                            "source": source_id,
-                            "target": target_id,
-                            "properties": {}
-                        })
+                        edges.append(EdgeRecord("depends_on", source_id, target_id))
 
             # 2. Parse Environment Variables for Semantic Edges
             env = config.get('environment', [])
@@ -134,12 +125,6 @@ class DockerComposeConnector(BaseConnector):
                     elif "_SERVICE_URL" in k:
                         edge_type = "calls"
 
-                    edges.append({
-                        "id": f"edge:{service_name}-{edge_type}-{target_service}",
-                        "type": edge_type,
-                        "source": source_id,
-                        "target": target_id,
-                        "properties": {"env_var": k}
-                    })
+                    edges.append(EdgeRecord(edge_type, source_id, target_id, {"env_var": k}))
                         
         return nodes, edges
@@ -1,69 +1,155 @@
 import yaml
 import os
-from typing import List, Dict, Tuple
+from collections import deque
+from typing import List, Dict, Optional, Tuple, Iterator
 from .base import BaseConnector
+from .records import NodeRecord, EdgeRecord, Record
 
-class KubernetesConnector(BaseConnector):
-    def __init__(self, file_path: str):
-        self.file_path = file_path
+# libyaml bindings are an order of magnitude faster when PyYAML was built with them
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
 
-    def load(self) -> Tuple[List[Dict], List[Dict]]:
-        if not os.path.exists(self.file_path):
-            print(f"Warning: File {self.file_path} not found.")
-            return [], []
+# Only these kinds produce graph records; everything else is skipped unconstructed
+RELEVANT_KINDS = {"Deployment"}
 
-        with open(self.file_path, 'r') as f:
-            try:
-                # multiple documents
-                documents = list(yaml.safe_load_all(f))
-            except yaml.YAMLError as exc:
-                print(f"Error parsing YAML: {exc}")
-                return [], []
+class _EventComposer(yaml.composer.Composer, yaml.constructor.SafeConstructor, yaml.resolver.Resolver):
+    """Composes and constructs one document from events that were already parsed."""
+
+    def __init__(self, events: List[yaml.Event]):
+        self._events = deque(events)
+        yaml.composer.Composer.__init__(self)
+        yaml.constructor.SafeConstructor.__init__(self)
+        yaml.resolver.Resolver.__init__(self)
+
+    def check_event(self, *choices) -> bool:
+        return bool(self._events) and (not choices or isinstance(self._events[0], choices))
+
+    def peek_event(self) -> yaml.Event:
+        return self._events[0]
 
+    def get_event(self) -> yaml.Event:
+        return self._events.popleft()
+
+def _relevant_document(loader) -> Optional[List[yaml.Event]]:
+    """
+    Reads the parser's next document as events. Returns them if the top-level
+    `kind` is relevant, else None. Events are kept only until `kind` is seen,
+    so skipping a document costs the keys in front of its kind (apiVersion,
+    usually), not the document.
+    """
+    events = [loader.get_event()]  # DocumentStartEvent
+    relevant = None
+    depth = 0
+    root_mapping = False
+    expect_key = True
+    key = None
+    while True:
+        event = loader.get_event()
+        if events is not None:
+            events.append(event)
+        if isinstance(event, yaml.DocumentEndEvent):
+            return events if relevant else None
+        if isinstance(event, yaml.CollectionStartEvent):
+            if depth == 0:
+                root_mapping = isinstance(event, yaml.MappingStartEvent)
+            depth += 1
+            continue
+        if isinstance(event, yaml.CollectionEndEvent):
+            depth -= 1
+        # Only keys and values of the root mapping matter, each once it's complete
+        if not root_mapping or depth != 1:
+            continue
+        scalar = event.value if isinstance(event, yaml.ScalarEvent) else None
+        if expect_key:
+            key = scalar
+        elif key == 'kind':
+            relevant = scalar in RELEVANT_KINDS
+            if not relevant:
+                events = None
+        expect_key = not expect_key
+
+class KubernetesConnector(BaseConnector):
+    def load_file(self, file_path: str) -> Tuple[List[NodeRecord], List[EdgeRecord]]:
         nodes = []
         edges = []
-
-        for doc in documents:
-            if not doc: 
-                continue
-            kind = doc.get('kind')
-            metadata = doc.get('metadata', {})
-            name = metadata.get('name')
-            
-            if kind == 'Deployment' and name:
-                # This corresponds to a Service in our graph
-                # node_id should match DockerComposeConnector: "service:name" (lowercase prefix)
-                node_id = f"service:{name}"
-                
-                spec = doc.get('spec', {})
-                template_spec = spec.get('template', {}).get('spec', {})
-                containers = template_spec.get('containers', [])
-                
-                # Extract image and resources from first container
-                image = ""
-                resources = {}
-                if containers:
-                    c = containers[0]
-                    image = c.get('image', '')
-                    resources = c.get('resources', {})
-
-                # We can create a node. 
-                # If we use UPSERT logic in Neo4j, this will merge with existing nodes 
-                # or create new ones if they didn't exist in docker-compose.
-                node = {
-                    "id": node_id,
-                    "type": "Service",
-                    "name": name,
-                    "properties": {
-                        "k8s_image": image,
-                        "k8s_replicas": spec.get('replicas', 1),
-                        "k8s_namespace": metadata.get('namespace', 'default'),
-                        "k8s_resources": str(resources)
-                    }
-                }
-                nodes.append(node)
-                
-                # We could infer env vars from K8s too, similar to Docker Compose
-                # But let's stick to the bonus requirement: Metadata enrichment.
-                
+        try:
+            for record_type, record in self._stream(file_path):
+                if record_type == "node":
+                    nodes.append(record)
+                else:
+                    edges.append(record)
+        except yaml.YAMLError as exc:
+            print(f"Error parsing YAML: {exc}")
+            return [], []
         return nodes, edges
+
+    def stream_file(self, file_path: str) -> Iterator[Tuple[str, Record]]:
+        """
+        Parses a multi-document manifest one document at a time, so memory
+        stays bounded by the largest relevant document. Documents whose kind
+        we don't use are read as parser events and dropped without building a
+        YAML node tree or Python objects.
+        On a YAML error the records of earlier documents have already been
+        yielded; load_file returns nothing for such a file instead.
+        """
+        try:
+            yield from self._stream(file_path)
+        except yaml.YAMLError as exc:
+            print(f"Error parsing YAML: {exc}")
+
+    def _stream(self, file_path: str) -> Iterator[Tuple[str, Record]]:
+        if not os.path.exists(file_path):
+            print(f"Warning: File {file_path} not found.")
+            return
+
+        with open(file_path, 'r') as f:
+            loader = SafeLoader(f)
+            try:
+                loader.get_event()  # StreamStartEvent
+                while not loader.check_event(yaml.StreamEndEvent):
+                    events = _relevant_document(loader)
+                    if events is None:
+                        continue
+                    composer = _EventComposer(events)
+                    doc = composer.construct_document(composer.compose_document())
+                    yield from self._records_from_document(doc)
+            finally:
+                loader.dispose()
+
+    def _records_from_document(self, doc: Dict) -> Iterator[Tuple[str, Record]]:
+        kind = doc.get('kind')
+        metadata = doc.get('metadata', {})
+        name = metadata.get('name')
+
+        if kind == 'Deployment' and name:
+            # This corresponds to a Service in our graph
+            # node_id should match DockerComposeConnector: "service:name" (lowercase prefix)
+            node_id = f"service:{name}"
+
+            spec = doc.get('spec', {})
+            template_spec = spec.get('template', {}).get('spec', {})
+            containers = template_spec.get('containers', [])
+
+            # Extract image and resources from first container
+            image = ""
+            resources = {}
+            if containers:
+                c = containers[0]
+                image = c.get('image', '')
+                resources = c.get('resources', {})
+
+            # We can create a node.
+            # If we use UPSERT logic in Neo4j, this will merge with existing nodes
+            # or create new ones if they didn't exist in docker-compose.
+            node = NodeRecord(node_id, "Service", name, {
+                "k8s_image": image,
+                "k8s_replicas": spec.get('replicas', 1),
+                "k8s_namespace": metadata.get('namespace', 'default'),
+                "k8s_resources": str(resources)
+            })
+            yield "node", node
+
+            # We could infer env vars from K8s too, similar to Docker Compose
+            # But let's stick to the bonus requirement: Metadata enrichment.
@@ -0,0 +1,102 @@
+import sys
+from collections.abc import Mapping
+from typing import Any, Dict, Optional, Union
+
+def _intern(value):
+    """Ids and types repeat across every edge and file; keep one copy of each string."""
+    return sys.intern(value) if type(value) is str else value
+
+class NodeRecord(Mapping):
+    """
+    A node as returned by the connectors. Slotted, so a record costs a few
+    pointers instead of a dict; ids, types and names are interned, so the
+    same id referenced by many edges is stored once.
+
+    Reads like the dict format it replaces (record['id'], .get, .items, dict(record),
+    == against a dict), which is what merge_records, the storages and the
+    ingest state rely on. That view is read-only, but the attributes are
+    not: connectors fill in `properties` after creating a record.
+    """
+    __slots__ = ("id", "type", "name", "properties")
+    _FIELDS = frozenset(__slots__)
+
+    def __init__(self, id: str, type: str, name: Any, properties: Optional[Dict] = None):
+        self.id = _intern(id)
+        self.type = _intern(type)
+        self.name = _intern(name)
+        self.properties = properties if properties is not None else {}
+
+    def __getitem__(self, key):
+        if key not in self._FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(self.__slots__)
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def __reduce__(self):
+        # Through __init__, so strings are interned again in the receiving process
+        return NodeRecord, (self.id, self.type, self.name, self.properties)
+
+    def __repr__(self):
+        return f"NodeRecord({self.to_dict()!r})"
+
+    def to_dict(self) -> Dict:
+        return {"id": self.id, "type": self.type, "name": self.name, "properties": self.properties}
+
+class EdgeRecord(Mapping):
+    """
+    An edge as returned by the connectors; see NodeRecord.
+    The id is derived from the full endpoint ids unless one is given, e.g.
+    edge:service:order-service-depends_on-database:orders-db (the dict
+    connectors used bare names: edge:order-service-depends_on-orders-db).
+    The graph doesn't store edge ids; the ingest state does, so the first
+    incremental ingest after that change rewrites every edge once.
+    Edges without properties share no per-edge dict until one is asked for.
+    """
+    __slots__ = ("type", "source", "target", "_properties", "_id")
+    _KEYS = ("id", "type", "source", "target", "properties")
+    _FIELDS = frozenset(_KEYS)
+
+    def __init__(self, type: str, source: str, target: str, properties: Optional[Dict] = None, id: str = None):
+        self.type = _intern(type)
+        self.source = _intern(source)
+        self.target = _intern(target)
+        self._properties = properties or None
+        self._id = id
+
+    @property
+    def id(self) -> str:
+        if self._id is not None:
+            return self._id
+        return f"edge:{self.source}-{self.type.lower()}-{self.target}"
+
+    @property
+    def properties(self) -> Dict:
+        return self._properties if self._properties is not None else {}
+
+    def __getitem__(self, key):
+        if key not in self._FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(self._KEYS)
+
+    def __len__(self):
+        return len(self._KEYS)
+
+    def __reduce__(self):
+        return EdgeRecord, (self.type, self.source, self.target, self._properties, self._id)
+
+    def __repr__(self):
+        return f"EdgeRecord({self.to_dict()!r})"
+
+    def to_dict(self) -> Dict:
+        return {"id": self.id, "type": self.type, "source": self.source, "target": self.target,
+                "properties": self.properties}
+
+Record = Union[NodeRecord, EdgeRecord]
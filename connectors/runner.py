@@ -0,0 +1,156 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, List, Tuple
+
+from .base import BaseConnector
+from .records import NodeRecord, EdgeRecord
+from telemetry.tracing import span, record_span
+from .docker_compose import DockerComposeConnector
+from .teams import TeamsConnector
+from .kubernetes import KubernetesConnector
+
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data'))
+
+# Default worker count for parsing; 1 disables the process pool
+DEFAULT_WORKERS = int(os.getenv("INGEST_WORKERS", "0")) or os.cpu_count() or 1
+# Sources smaller than this (bytes, all files together) parse faster in-process than a pool starts
+PARALLEL_MIN_BYTES = int(os.getenv("INGEST_PARALLEL_MIN_BYTES", str(4 * 1024 * 1024)))
+
+def default_connectors(compose=None, teams=None, k8s=None) -> List[BaseConnector]:
+    """
+    The connectors used by ingestion and validation.
+    Each argument may be a file, directory, glob or list of those; unset
+    arguments fall back to the bundled sample files under data/.
+    """
+    return [
+        DockerComposeConnector(compose or os.path.join(DATA_DIR, 'docker-compose.yml')),
+        TeamsConnector(teams or os.path.join(DATA_DIR, 'teams.yaml')),
+        KubernetesConnector(k8s or os.path.join(DATA_DIR, 'k8s-deployments.yaml'))
+    ]
+
+class ConnectorResult:
+    """Output of one connector across all of its files, plus per-file timings."""
+
+    def __init__(self, connector: BaseConnector):
+        self.connector = connector
+        self.nodes: List[NodeRecord] = []
+        self.edges: List[EdgeRecord] = []
+        # (path, node count, edge count, seconds)
+        self.files: List[Tuple[str, int, int, float]] = []
+
+    @property
+    def name(self) -> str:
+        return self.connector.__class__.__name__
+
+def _load_file(connector: BaseConnector, path: str):
+    """Worker entry point. Module-level so it can be pickled."""
+    start = time.perf_counter()
+    nodes, edges = connector.load_file(path)
+    return nodes, edges, time.perf_counter() - start
+
+def _source_bytes(tasks) -> int:
+    total = 0
+    for _, path in tasks:
+        try:
+            total += os.path.getsize(path)
+        except OSError:
+            pass
+    return total
+
+def _use_pool(tasks, workers: int) -> bool:
+    return workers > 1 and len(tasks) > 1 and _source_bytes(tasks) >= PARALLEL_MIN_BYTES
+
+def use_pool(connectors: List[BaseConnector], workers: int = None) -> bool:
+    """Whether run_connectors would parse these connectors' files in a process pool."""
+    tasks = [(c, path) for c in connectors for path in c.source_files()]
+    return _use_pool(tasks, workers or DEFAULT_WORKERS)
+
+def run_connectors(connectors: List[BaseConnector], workers: int = None) -> List[ConnectorResult]:
+    """
+    Parses every source file of every connector, in parallel across a process
+    pool (YAML parsing is CPU-bound, so threads wouldn't help) once the
+    sources add up to PARALLEL_MIN_BYTES. Workers are spawned rather than
+    forked: ingest also runs on background threads (UI, watch mode), and
+    forking a process with threads can deadlock on locks they hold.
+    Results keep connector order and file order, so merging them yields the
+    same graph as loading sequentially.
+    """
+    workers = workers or DEFAULT_WORKERS
+    results = [ConnectorResult(c) for c in connectors]
+    tasks = [(result, path) for result in results for path in result.connector.source_files()]
+
+    with span("connector.run", files=len(tasks)) as run_span:
+        if not _use_pool(tasks, workers):
+            outputs = [_load_file(result.connector, path) for result, path in tasks]
+        else:
+            run_span.set(workers=min(workers, len(tasks)))
+            with ProcessPoolExecutor(max_workers=min(workers, len(tasks)),
+                                     mp_context=multiprocessing.get_context("spawn")) as pool:
+                futures = [pool.submit(_load_file, result.connector, path) for result, path in tasks]
+                outputs = [f.result() for f in futures]
+
+        for (result, path), (nodes, edges, seconds) in zip(tasks, outputs):
+            result.nodes.extend(nodes)
+            result.edges.extend(edges)
+            result.files.append((path, len(nodes), len(edges), seconds))
+            # Timed where the file was parsed, possibly in a worker process
+            record_span("connector.load_file", seconds * 1000, connector=result.name, path=path,
+                        rows=len(nodes) + len(edges))
+        run_span.set(rows=sum(len(r.nodes) + len(r.edges) for r in results))
+    return results
+
+def stream_connectors(connectors: List[BaseConnector], write_nodes: Callable[[List[NodeRecord]], Any],
+                      chunk_size: int) -> List[ConnectorResult]:
+    """
+    Parses every source file in this process through BaseConnector.stream_file,
+    handing nodes to `write_nodes` every `chunk_size` records as they are
+    parsed. Edges are only collected: they can reference nodes of any
+    connector, so they are written once every node is in. Every record is
+    also kept on the results, which the ingest state saves.
+    """
+    results = [ConnectorResult(c) for c in connectors]
+    pending: List[NodeRecord] = []
+    with span("connector.stream") as run_span:
+        for result in results:
+            for path in result.connector.source_files():
+                start = time.perf_counter()
+                node_count, edge_count = len(result.nodes), len(result.edges)
+                for kind, record in result.connector.stream_file(path):
+                    if kind == "node":
+                        result.nodes.append(record)
+                        pending.append(record)
+                        if len(pending) >= chunk_size:
+                            write_nodes(pending)
+                            pending = []
+                    else:
+                        result.edges.append(record)
+                # Includes the writes made while the file was parsed
+                seconds = time.perf_counter() - start
+                result.files.append((path, len(result.nodes) - node_count, len(result.edges) - edge_count, seconds))
+                record_span("connector.load_file", seconds * 1000, connector=result.name, path=path,
+                            rows=len(result.nodes) - node_count + len(result.edges) - edge_count)
+        if pending:
+            write_nodes(pending)
+        run_span.set(files=sum(len(r.files) for r in results),
+                     rows=sum(len(r.nodes) + len(r.edges) for r in results))
+    return results
+
+def merge_results(results: List[ConnectorResult]) -> Tuple[List[NodeRecord], List[EdgeRecord]]:
+    """Flattens connector results into a single node stream and edge stream."""
+    nodes, edges = [], []
+    for result in results:
+        nodes.extend(result.nodes)
+        edges.extend(result.edges)
+    return nodes, edges
+
+def print_timings(results: List[ConnectorResult]):
+    for result in results:
+        seconds = sum(f[3] for f in result.files)
+        rows = len(result.nodes) + len(result.edges)
+        rate = f"{rows / seconds:,.0f} rows/s" if seconds > 0 else "n/a"
+        print(f"{result.name}: {len(result.nodes)} nodes, {len(result.edges)} edges "
+              f"from {len(result.files)} file(s) ({rate})")
+        for path, node_count, edge_count, seconds in result.files:
+            print(f"  {path}: {node_count} nodes, {edge_count} edges in {seconds * 1000:.1f}ms")
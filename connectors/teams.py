@@ -1,24 +1,26 @@
 import yaml
 import os
-from typing import List, Dict, Tuple
+from typing import List, Tuple
 from .base import BaseConnector
+from .records import NodeRecord, EdgeRecord
 
 class TeamsConnector(BaseConnector):
-    def __init__(self, file_path: str):
-        self.file_path = file_path
-
-    def load(self) -> Tuple[List[Dict], List[Dict]]:
-        if not os.path.exists(self.file_path):
-            print(f"Warning: File {self.file_path} not found.")
+    def load_file(self, file_path: str) -> Tuple[List[NodeRecord], List[EdgeRecord]]:
+        if not os.path.exists(file_path):
+            print(f"Warning: File {file_path} not found.")
             return [], []
 
-        with open(self.file_path, 'r') as f:
+        with open(file_path, 'r') as f:
             try:
                 data = yaml.safe_load(f)
             except yaml.YAMLError as exc:
                 print(f"Error parsing YAML: {exc}")
                 return [], []
 
+        # Directories and globs can pick up empty or unrelated YAML files
+        if not isinstance(data, dict):
+            return [], []
+
         nodes = []
         edges = []
         teams = data.get('teams', [])
@@ -30,16 +32,11 @@ class TeamsConnector(BaseConnector):
 
             # Create Team Node
             node_id = f"team:{team_name}" # ID stays lower case by convention if desired, but label below is Team
-            node = {
-                "id": node_id,
-                "type": "Team",
-                "name": team_name,
-                "properties": {
-                    "lead": team.get('lead'),
-                    "slack": team.get('slack_channel'),
-                    "pagerduty": team.get('pagerduty_schedule')
-                }
-            }
+            node = NodeRecord(node_id, "Team", team_name, {
+                "lead": team.get('lead'),
+                "slack": team.get('slack_channel'),
+                "pagerduty": team.get('pagerduty_schedule')
+            })
             nodes.append(node)
 
             # Create Ownership Edges
@@ -59,13 +56,7 @@ class TeamsConnector(BaseConnector):
                 target_id = f"{target_label.lower()}:{item}"
                 
                 # Direction: Service OWNED_BY Team
-                edges.append({
-                    "id": f"edge:{item}-owned_by-{team_name}",
-                    "type": "OWNED_BY",
-                    # REVERSED: Source is the Resource, Target is the Team
-                    "source": target_id,
-                    "target": node_id, 
-                    "properties": {}
-                })
+                # REVERSED: Source is the Resource, Target is the Team
+                edges.append(EdgeRecord("OWNED_BY", target_id, node_id))
 
         return nodes, edges
@@ -0,0 +1,116 @@
+import os
+import threading
+import time
+from typing import Callable, Dict, List
+
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+
+from .base import BaseConnector
+
+# Quiet period after the last change before re-ingesting
+DEFAULT_DEBOUNCE = float(os.getenv("WATCH_DEBOUNCE_SECONDS", "1.0"))
+
+# Reads (including our own parsing and fingerprinting) produce opened/closed events
+CHANGE_EVENTS = {"created", "modified", "deleted", "moved"}
+
+class SourceWatcher(FileSystemEventHandler):
+    """
+    Watches the connectors' source files and directories and calls
+    on_change(connectors) with the connectors whose files changed, once no
+    change has been seen for `debounce` seconds, so an editor save or a
+    `git checkout` touching many files triggers a single run.
+
+    Callbacks run one at a time on a background thread; changes that arrive
+    while one is running are collected into the next call.
+
+        with SourceWatcher(connectors, on_change):
+            ...
+    """
+
+    def __init__(self, connectors: List[BaseConnector], on_change: Callable[[List[BaseConnector]], None],
+                 debounce: float = None):
+        self.connectors = list(connectors)
+        self.on_change = on_change
+        self.debounce = DEFAULT_DEBOUNCE if debounce is None else debounce
+        # connector position -> connector, so callbacks keep connector order
+        self._pending: Dict[int, BaseConnector] = {}
+        self._last_change = 0.0
+        self._stopped = False
+        self._cond = threading.Condition()
+        self._observer = None
+        self._thread = None
+
+    def roots(self) -> Dict[str, bool]:
+        """Directories to watch -> recursive. Missing directories are watched through an existing parent."""
+        roots: Dict[str, bool] = {}
+        for connector in self.connectors:
+            for directory, recursive in connector.watch_roots():
+                while not os.path.isdir(directory) and os.path.dirname(directory) != directory:
+                    directory, recursive = os.path.dirname(directory), True
+                roots[directory] = roots.get(directory, False) or recursive
+        return roots
+
+    def start(self) -> "SourceWatcher":
+        self._stopped = False
+        self._observer = Observer()
+        for directory, recursive in self.roots().items():
+            self._observer.schedule(self, directory, recursive=recursive)
+        self._observer.start()
+        self._thread = threading.Thread(target=self._run, name="source-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def on_any_event(self, event):
+        if event.event_type not in CHANGE_EVENTS or event.is_directory:
+            return
+        paths = [os.fsdecode(event.src_path)]
+        if getattr(event, "dest_path", None):
+            # Editors often save by renaming a temp file over the original
+            paths.append(os.fsdecode(event.dest_path))
+        owners = [i for i, connector in enumerate(self.connectors) if any(connector.owns(p) for p in paths)]
+        if not owners:
+            return
+        with self._cond:
+            for i in owners:
+                self._pending[i] = self.connectors[i]
+            self._last_change = time.monotonic()
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopped:
+                    self._cond.wait()
+                # Let the burst settle: every new change restarts the quiet period
+                while not self._stopped:
+                    remaining = self._last_change + self.debounce - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._stopped:
+                    return
+                changed = [self._pending[i] for i in sorted(self._pending)]
+                self._pending.clear()
+            try:
+                self.on_change(changed)
+            except Exception as e:
+                print(f"Error: Re-ingestion after a source change failed: {e}")
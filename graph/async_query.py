@@ -0,0 +1,145 @@
+import asyncio
+import os
+from typing import List, Dict, Optional, Tuple
+
+from .cache import QueryCache, cached_async_query
+from .reachability import ReachabilityIndex, ReachabilityIndexLoader
+from .query import (decode_cursor, walk_hops, walked_total, hop_page, blast_radius_page, with_names,
+                    impact_rows, edge_rows)
+from .criticality import rank_criticality
+from .memory import AsyncMemoryStorage, MemoryGraphStorage
+from telemetry.tracing import traced
+
+class AsyncQueryEngine:
+    """
+    Async counterpart of QueryEngine with the same methods and return shapes.
+    Independent sub-queries (both directions of a blast radius, a node and
+    its owners) are issued concurrently with asyncio.gather.
+    Works on AsyncGraphStorage or AsyncMemoryStorage; a MemoryGraphStorage is wrapped in the latter.
+    """
+
+    def __init__(self, storage, cache_size: int = None, use_reachability: bool = None):
+        self.storage = AsyncMemoryStorage(storage) if isinstance(storage, MemoryGraphStorage) else storage
+        self.cache = QueryCache(cache_size)
+        if use_reachability is None:
+            use_reachability = os.getenv("BLAST_RADIUS_MODE", "index").lower() != "live"
+        self.use_reachability = use_reachability
+        self._reachability = ReachabilityIndexLoader(self.storage)
+
+    def reachability(self) -> Optional[ReachabilityIndex]:
+        if not self.use_reachability:
+            return None
+        return self._reachability.get()
+
+    @traced("graph.get_node")
+    @cached_async_query
+    async def get_node(self, node_id: str) -> Optional[Dict]:
+        """Retrieve a single node by ID."""
+        return await self.storage.get_node(node_id)
+
+    @traced("graph.get_nodes")
+    @cached_async_query
+    async def get_nodes(self, node_type: str = None, limit: int = 100) -> List[Dict]:
+        """List nodes, optionally filtered by type."""
+        return await self.storage.get_nodes(node_type, limit)
+
+    @traced("graph.get_owner")
+    @cached_async_query
+    async def get_owner(self, node_id: str) -> List[Dict]:
+        """Find the team that owns this node."""
+        return await self.storage.get_owner(node_id)
+
+    @traced("graph.blast_radius", rows=impact_rows)
+    @cached_async_query
+    async def blast_radius(self, node_id: str, max_depth: int = None, limit: int = None,
+                           cursor: str = None) -> Dict[str, List[Dict]]:
+        """Same result as QueryEngine.blast_radius; both directions are fetched concurrently."""
+        if max_depth is not None or limit is not None or cursor is not None:
+            return await self._blast_radius_page(node_id, max_depth, limit, cursor)
+
+        index = self.reachability()
+        if index is not None:
+            downstream, upstream = await asyncio.gather(
+                self.storage.get_nodes_by_ids(index.downstream_ids(node_id)),
+                self.storage.get_nodes_by_ids(index.upstream_ids(node_id)),
+            )
+        else:
+            downstream, upstream = await asyncio.gather(
+                self.storage.impact_reach(node_id, "down"),
+                self.storage.impact_reach(node_id, "up"),
+            )
+
+        return {
+            "node": node_id,
+            "downstream_impact": downstream,
+            "upstream_dependencies": upstream,
+            "count_affected": len(downstream)
+        }
+
+    async def _walk(self, node_id: str, direction: str, max_depth: Optional[int], offset: int,
+                    limit: Optional[int]) -> Tuple[List[Tuple[int, str]], bool, Optional[int]]:
+        """See QueryEngine._walk."""
+        index = self.reachability()
+        if index is not None:
+            ordered = walk_hops(node_id, index.neighbours, direction, max_depth)
+            return (*hop_page(ordered, offset, limit), len(ordered))
+        wanted = None if limit is None else offset + limit + 1
+        ordered: List[Tuple[int, str]] = []
+        seen = set()
+        frontier = [node_id]
+        hop = 0
+        while frontier and (max_depth is None or hop < max_depth):
+            if wanted is not None and len(ordered) >= wanted:
+                break
+            hop += 1
+            frontier = sorted(set(await self.storage.impact_neighbours(frontier, direction)) - seen)
+            seen.update(frontier)
+            ordered.extend((hop, i) for i in frontier)
+        return (*hop_page(ordered, offset, limit), walked_total(ordered, wanted))
+
+    async def _blast_radius_page(self, node_id: str, max_depth: Optional[int], limit: Optional[int],
+                                 cursor: Optional[str]) -> Dict:
+        """See QueryEngine._blast_radius_page; the two directions are walked concurrently."""
+        offsets = decode_cursor(cursor)
+        (down_page, down_more, total), (up_page, up_more, _) = await asyncio.gather(
+            self._walk(node_id, "down", max_depth, offsets["down"], limit),
+            self._walk(node_id, "up", max_depth, offsets["up"], limit),
+        )
+        nodes = {n['id']: n for n in await self.storage.get_nodes_by_ids([i for _, i in down_page + up_page])}
+        return blast_radius_page(node_id, max_depth, offsets, down_page, down_more,
+                                 up_page, up_more, nodes, total)
+
+    @traced("graph.criticality")
+    @cached_async_query
+    async def criticality(self, node_type: str = None, limit: int = 20) -> List[Dict]:
+        """Same ranking as QueryEngine.criticality; edges and ownership are fetched concurrently."""
+        index = self.reachability()
+        if index is not None:
+            # The index already holds every pair; only ownership needs the database
+            pairs = index.edges
+            owners = await self.storage.ownership()
+        else:
+            pairs, owners = await asyncio.gather(self.storage.impact_pairs(), self.storage.ownership())
+
+        prefix = f"{node_type.lower()}:" if node_type else None
+        top = rank_criticality(pairs, owners, prefix, limit)
+        return with_names(top, {n['id']: n for n in await self.storage.get_nodes_by_ids([r["id"] for r in top])})
+
+    @traced("graph.impact_subgraph", rows=edge_rows)
+    @cached_async_query
+    async def impact_subgraph(self, node_ids: Tuple[str, ...]) -> Dict:
+        """Same as QueryEngine.impact_subgraph; edges and owners are fetched concurrently."""
+        if not node_ids:
+            return {"edges": [], "owners": {}}
+        return await self.storage.impact_subgraph(node_ids)
+
+    @traced("graph.shortest_path")
+    @cached_async_query
+    async def shortest_path(self, from_id: str, to_id: str) -> List[Dict]:
+        """Find data path between two nodes."""
+        return await self.storage.shortest_path(from_id, to_id)
+
+    async def pager(self, node_id: str) -> Dict:
+        """The node and its owning teams, fetched concurrently (what the pager intent needs)."""
+        node, owners = await asyncio.gather(self.get_node(node_id), self.get_owner(node_id))
+        return {"node": node, "owners": owners}
@@ -0,0 +1,124 @@
+from neo4j import AsyncGraphDatabase
+import asyncio
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .storage import CONNECT_RETRIES, driver_config, session_config, statement_summary
+from .cypher import (
+    NODE_BY_ID_CYPHER, NODES_BY_IDS_CYPHER, ALL_NODES_CYPHER, LABEL_NODES_CYPHER, OWNER_CYPHER,
+    DOWNSTREAM_CYPHER, UPSTREAM_CYPHER, DOWNSTREAM_HOP_CYPHER, UPSTREAM_HOP_CYPHER, IMPACT_PAIRS_CYPHER,
+    OWNERSHIP_CYPHER, SUBGRAPH_EDGES_CYPHER, SUBGRAPH_OWNERSHIP_CYPHER, SHORTEST_PATH_CYPHER, label_for,
+)
+from telemetry.tracing import span
+
+class AsyncGraphStorage:
+    """
+    Read-side counterpart of GraphStorage on the neo4j async driver.
+    One instance (and its connection pool) is meant to be shared by every
+    coroutine on the event loop; each query borrows its own session, so
+    independent queries run concurrently without a thread per request.
+    Writes stay on the synchronous GraphStorage used by ingestion.
+    """
+
+    name = "Neo4j"
+    supports_native_queries = False
+    persistent = True
+
+    def __init__(self, connect_retries: int = None):
+        uri = os.getenv("NEO4J_URI", "bolt://localhost:7687")
+        user = os.getenv("NEO4J_USER", "neo4j")
+        password = os.getenv("NEO4J_PASSWORD", "password")
+        self.connect_retries = connect_retries or CONNECT_RETRIES
+        self.uri = uri
+        # Identifies this graph in persisted ingest state and indexes
+        self.target = uri
+
+        # The async driver connects lazily; call verify_connection() to wait for the server
+        self.driver = AsyncGraphDatabase.driver(uri, auth=(user, password), **driver_config())
+
+    async def verify_connection(self):
+        """Waits for Neo4j to be ready, retrying once a second."""
+        max_retries = self.connect_retries
+        for i in range(max_retries):
+            try:
+                await self.driver.verify_connectivity()
+                print("Connected to Neo4j.")
+                return
+            except Exception as e:
+                print(f"Waiting for Neo4j... ({i+1}/{max_retries})")
+                await asyncio.sleep(1)
+        raise Exception(f"Could not connect to Neo4j after {max_retries} seconds.")
+
+    async def close(self):
+        await self.driver.close()
+
+    async def query(self, cypher: str, params: dict = None):
+        """Executes a read query in a managed read transaction and returns list of records."""
+        if params is None:
+            params = {}
+        with span("storage.query", statement=statement_summary(cypher)) as s:
+            async with self.driver.session(**session_config()) as session:
+                records = await session.execute_read(_run_query, cypher, params)
+            s.set(rows=len(records))
+        return records
+
+    # --- Reads used by AsyncQueryEngine, awaitable versions of GraphStorage's ---
+
+    async def get_node(self, node_id: str) -> Optional[Dict]:
+        records = await self.query(NODE_BY_ID_CYPHER, {"id": node_id})
+        return records[0]['n'] if records else None
+
+    async def get_nodes_by_ids(self, node_ids: List[str]) -> List[Dict]:
+        if not node_ids:
+            return []
+        return [r['n'] for r in await self.query(NODES_BY_IDS_CYPHER, {"ids": list(node_ids)})]
+
+    async def get_nodes(self, node_type: str = None, limit: int = 100) -> List[Dict]:
+        cypher = LABEL_NODES_CYPHER.format(label=label_for(node_type)) if node_type else ALL_NODES_CYPHER
+        return [r['n'] for r in await self.query(cypher, {"limit": limit})]
+
+    async def get_owner(self, node_id: str) -> List[Dict]:
+        return [r['t'] for r in await self.query(OWNER_CYPHER, {"id": node_id})]
+
+    async def impact_reach(self, node_id: str, direction: str) -> List[Dict]:
+        if direction == "down":
+            return [r['dependent'] for r in await self.query(DOWNSTREAM_CYPHER, {"id": node_id})]
+        return [r['dependency'] for r in await self.query(UPSTREAM_CYPHER, {"id": node_id})]
+
+    async def impact_neighbours(self, node_ids: List[str], direction: str) -> List[str]:
+        cypher = DOWNSTREAM_HOP_CYPHER if direction == "down" else UPSTREAM_HOP_CYPHER
+        return [r['id'] for r in await self.query(cypher, {"ids": list(node_ids)})]
+
+    async def impact_pairs(self) -> List[Tuple[str, str]]:
+        return [(r['source'], r['target']) for r in await self.query(IMPACT_PAIRS_CYPHER)]
+
+    async def ownership(self) -> Dict[str, List[str]]:
+        return {r['id']: r['teams'] for r in await self.query(OWNERSHIP_CYPHER)}
+
+    async def impact_subgraph(self, node_ids: Iterable[str]) -> Dict:
+        """Edges and owners are fetched concurrently."""
+        ids = sorted(set(node_ids))
+        edge_records, owner_records = await asyncio.gather(
+            self.query(SUBGRAPH_EDGES_CYPHER, {"ids": ids}),
+            self.query(SUBGRAPH_OWNERSHIP_CYPHER, {"ids": ids}),
+        )
+        return {"edges": sorted((r['source'], r['target']) for r in edge_records),
+                "owners": {r['id']: r['teams'] for r in owner_records}}
+
+    async def shortest_path(self, from_id: str, to_id: str) -> List:
+        records = await self.query(SHORTEST_PATH_CYPHER, {"from_id": from_id, "to_id": to_id})
+        return records[0]['p'] if records else []
+
+async def _run_query(tx, query: str, params: dict):
+    result = await tx.run(query, **params)
+    return [record.data() async for record in result]
+
+def create_async_storage():
+    """
+    Async storage for the backend selected by GRAPH_BACKEND.
+    The in-memory backend has no I/O, so its reads are only wrapped as coroutines.
+    """
+    if os.getenv("GRAPH_BACKEND", "neo4j").lower() == "memory":
+        from .memory import AsyncMemoryStorage, MemoryGraphStorage
+        return AsyncMemoryStorage(MemoryGraphStorage())
+    return AsyncGraphStorage()
@@ -0,0 +1,158 @@
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from .delta import DEFAULT_STATE_PATH
+from .reachability import DEFAULT_INDEX_PATH
+
+# Max cached QueryEngine results per engine; 0 disables caching
+DEFAULT_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "256"))
+# How often graph_version() looks for ingests made by other processes
+VERSION_POLL_SECONDS = float(os.getenv("GRAPH_VERSION_POLL_SECONDS", "0.5"))
+# Every ingest (CLI, --watch, snapshot import) rewrites these
+PERSISTED_PATHS = (DEFAULT_INDEX_PATH, DEFAULT_STATE_PATH)
+
+_version_lock = threading.Lock()
+_graph_version = 0
+_persisted_mtimes: Optional[Tuple] = None
+_next_poll = 0.0
+
+def _mtime(path: str) -> Optional[float]:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+def _poll_persisted():
+    """Bumps the version when another process's ingest rewrote the persisted index or ingest state."""
+    global _persisted_mtimes, _next_poll, _graph_version
+    now = time.monotonic()
+    if now < _next_poll:
+        return
+    mtimes = tuple(_mtime(path) for path in PERSISTED_PATHS)
+    with _version_lock:
+        _next_poll = now + VERSION_POLL_SECONDS
+        if _persisted_mtimes is not None and mtimes != _persisted_mtimes:
+            _graph_version += 1
+        _persisted_mtimes = mtimes
+
+def graph_version() -> int:
+    """
+    Process-wide counter of graph writes that invalidate cached query results.
+    Ingests in this process bump it directly; ingests in other processes are
+    noticed (within VERSION_POLL_SECONDS) through the files they rewrite.
+    """
+    _poll_persisted()
+    return _graph_version
+
+def bump_graph_version() -> int:
+    """Called after the graph changes (e.g. by ingest()) so cached results are dropped."""
+    global _graph_version
+    with _version_lock:
+        _graph_version += 1
+        return _graph_version
+
+class QueryCache:
+    """
+    Thread-safe LRU of query results, tagged with the graph version they were
+    computed at. The first access after a version bump drops every entry.
+    """
+
+    def __init__(self, max_size: int = None):
+        self.max_size = DEFAULT_CACHE_SIZE if max_size is None else max_size
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.version = graph_version()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_version(self):
+        current = graph_version()
+        if current != self.version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self.version = current
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        with self._lock:
+            self._check_version()
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key: Hashable, value: Any, version: int):
+        """Stores a result computed at `version`; results that raced with a write are discarded."""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._check_version()
+            if version != self.version:
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "graph_version": self.version,
+        }
+
+def cached_query(method):
+    """
+    Caches a QueryEngine method on `self.cache`, keyed by method name and arguments.
+    Returned objects are shared between callers and must not be mutated.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        cache = self.cache
+        if cache.max_size <= 0:
+            return method(self, *args, **kwargs)
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        found, value = cache.get(key)
+        if found:
+            return value
+        version = graph_version()
+        value = method(self, *args, **kwargs)
+        cache.put(key, value, version)
+        return value
+    return wrapper
+
+def cached_async_query(method):
+    """Async counterpart of cached_query for AsyncQueryEngine coroutines."""
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        cache = self.cache
+        if cache.max_size <= 0:
+            return await method(self, *args, **kwargs)
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        found, value = cache.get(key)
+        if found:
+            return value
+        version = graph_version()
+        value = await method(self, *args, **kwargs)
+        cache.put(key, value, version)
+        return value
+    return wrapper
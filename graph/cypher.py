@@ -0,0 +1,80 @@
+"""Cypher statements behind the reads of GraphStorage and AsyncGraphStorage."""
+
+# Every node carries this label next to its type label, so a single unique
+# index on :Entity(id) serves all id lookups regardless of node type.
+ENTITY_LABEL = "Entity"
+
+NODE_BY_ID_CYPHER = f"MATCH (n:{ENTITY_LABEL} {{id: $id}}) RETURN n"
+NODES_BY_IDS_CYPHER = f"MATCH (n:{ENTITY_LABEL}) WHERE n.id IN $ids RETURN n ORDER BY n.id"
+ALL_NODES_CYPHER = f"MATCH (n:{ENTITY_LABEL}) RETURN n LIMIT $limit"
+# Labels can't be parameters: {label} is filled in with label_for(node_type), backtick-quoted
+LABEL_NODES_CYPHER = "MATCH (n:`{label}`) RETURN n LIMIT $limit"
+
+OWNER_CYPHER = f"""
+MATCH (n:{ENTITY_LABEL} {{id: $id}})-[:OWNED_BY]->(t:Team)
+RETURN t
+"""
+
+# Downstream: (n)<-[*]-(dependent)
+# Note: DEPENDS_ON direction: Service A DEPENDS_ON Service B.
+# If B goes down, A is affected. So we traverse incoming DEPENDS_ON edges.
+# Also CALLS edges: A CALLS B. If B down, A affected.
+
+# Finding everything that depends on node_id
+DOWNSTREAM_CYPHER = f"""
+MATCH (n:{ENTITY_LABEL} {{id: $id}})<-[:DEPENDS_ON|CALLS*]-(dependent)
+RETURN distinct dependent
+"""
+
+# Finding everything this node depends on (root cause analysis context)
+UPSTREAM_CYPHER = f"""
+MATCH (n:{ENTITY_LABEL} {{id: $id}})-[:DEPENDS_ON|CALLS*]->(dependency)
+RETURN distinct dependency
+"""
+
+# One hop of a blast radius walk, for a whole frontier at once
+DOWNSTREAM_HOP_CYPHER = f"""
+UNWIND $ids AS id
+MATCH (:{ENTITY_LABEL} {{id: id}})<-[:DEPENDS_ON|CALLS]-(dependent:{ENTITY_LABEL})
+RETURN DISTINCT dependent.id AS id
+"""
+
+UPSTREAM_HOP_CYPHER = f"""
+UNWIND $ids AS id
+MATCH (:{ENTITY_LABEL} {{id: id}})-[:DEPENDS_ON|CALLS]->(dependency:{ENTITY_LABEL})
+RETURN DISTINCT dependency.id AS id
+"""
+
+# Whole-graph inputs of the criticality ranking
+IMPACT_PAIRS_CYPHER = f"""
+MATCH (a:{ENTITY_LABEL})-[:DEPENDS_ON|CALLS]->(b:{ENTITY_LABEL})
+RETURN DISTINCT a.id AS source, b.id AS target
+"""
+
+OWNERSHIP_CYPHER = f"""
+MATCH (n:{ENTITY_LABEL})-[:OWNED_BY]->(t:Team)
+RETURN n.id AS id, collect(DISTINCT t.id) AS teams
+"""
+
+# Edges and owners among the nodes of a blast radius, for drawing it
+SUBGRAPH_EDGES_CYPHER = f"""
+MATCH (a:{ENTITY_LABEL})-[:DEPENDS_ON|CALLS]->(b:{ENTITY_LABEL})
+WHERE a.id IN $ids AND b.id IN $ids
+RETURN DISTINCT a.id AS source, b.id AS target
+"""
+
+SUBGRAPH_OWNERSHIP_CYPHER = f"""
+MATCH (n:{ENTITY_LABEL})-[:OWNED_BY]->(t:Team)
+WHERE n.id IN $ids
+RETURN n.id AS id, collect(DISTINCT t.id) AS teams
+"""
+
+SHORTEST_PATH_CYPHER = f"""
+MATCH (start:{ENTITY_LABEL} {{id: $from_id}}), (end:{ENTITY_LABEL} {{id: $to_id}})
+MATCH p = shortestPath((start)-[*]-(end))
+RETURN p
+"""
+
+def label_for(node_type: str) -> str:
+    """Ensure label is Capitalized to match Neo4j data (e.g. 'service' -> 'Service'), with backticks escaped"""
+    return node_type.capitalize().replace("`", "``")
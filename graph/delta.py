@@ -0,0 +1,195 @@
+import hashlib
+import json
+import os
+from collections.abc import Mapping
+from typing import List, Dict, Tuple
+
+# Where the last ingested state (fingerprints + records per connector) is kept
+DEFAULT_STATE_PATH = os.getenv(
+    "INGEST_STATE_PATH",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.ekg_ingest_state.json'))
+)
+
+STATE_VERSION = 1
+
+def fingerprint_file(path: str) -> str:
+    """sha256 of the file contents, or "missing" if it doesn't exist."""
+    if not os.path.exists(path):
+        return "missing"
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def fingerprint_files(paths: List[str]) -> str:
+    """Combined fingerprint of a connector's source files, including which files there are."""
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        digest.update(f"{path}\0{fingerprint_file(path)}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+def _json_default(value):
+    # Connector records (connectors.records) are Mappings rather than dicts
+    if isinstance(value, Mapping):
+        return dict(value)
+    return str(value)
+
+def record_hash(record: Dict) -> str:
+    payload = json.dumps(record, sort_keys=True, default=_json_default)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+def edge_key(edge: Dict) -> str:
+    """Edges are MERGEd on (source, TYPE, target), so that's their identity in the graph."""
+    return f"{edge['source']}|{edge['type'].upper()}|{edge['target']}"
+
+def merge_records(outputs: List[Tuple[List[Dict], List[Dict]]]) -> Tuple[Dict[str, Dict], Dict[str, Dict]]:
+    """
+    Folds connector outputs into the graph they produce, with the same
+    semantics as running the upserts one connector after another:
+    the first label wins, name and properties are overwritten in order.
+    """
+    nodes: Dict[str, Dict] = {}
+    edges: Dict[str, Dict] = {}
+    for connector_nodes, connector_edges in outputs:
+        for node in connector_nodes:
+            merged = nodes.get(node['id'])
+            if merged is None:
+                merged = {"id": node['id'], "type": node['type'], "name": node['name'], "properties": {}}
+                nodes[node['id']] = merged
+            merged['name'] = node['name']
+            merged['properties'].update(node['properties'])
+        for edge in connector_edges:
+            key = edge_key(edge)
+            merged = edges.get(key)
+            if merged is None:
+                merged = {"id": edge['id'], "type": edge['type'].upper(), "source": edge['source'],
+                          "target": edge['target'], "properties": {}}
+                edges[key] = merged
+            merged['properties'].update(edge['properties'])
+    return nodes, edges
+
+class GraphDelta:
+    """Difference between two merged graphs, ready to be applied by a storage backend."""
+
+    def __init__(self):
+        self.upsert_nodes: List[Dict] = []
+        self.remove_nodes: List[str] = []
+        self.upsert_edges: List[Dict] = []
+        self.remove_edges: List[Dict] = []
+        self.added_nodes = 0
+        self.changed_nodes = 0
+        self.added_edges = 0
+        self.changed_edges = 0
+
+    def is_empty(self) -> bool:
+        return not (self.upsert_nodes or self.remove_nodes or self.upsert_edges or self.remove_edges)
+
+    def summary(self) -> str:
+        return (f"nodes +{self.added_nodes} ~{self.changed_nodes} -{len(self.remove_nodes)}, "
+                f"edges +{self.added_edges} ~{self.changed_edges} -{len(self.remove_edges)}")
+
+def diff_graphs(old_nodes: Dict[str, Dict], old_edges: Dict[str, Dict],
+                new_nodes: Dict[str, Dict], new_edges: Dict[str, Dict]) -> GraphDelta:
+    """Computes added, changed and removed nodes/edges between two merge_records() results."""
+    delta = GraphDelta()
+
+    # A label change can't be expressed as a property update, so the node is
+    # recreated. DETACH DELETE drops its edges, which then have to be rewritten.
+    relabelled = set()
+
+    for node_id, node in new_nodes.items():
+        old = old_nodes.get(node_id)
+        if old is None:
+            delta.upsert_nodes.append(node)
+            delta.added_nodes += 1
+        elif old['type'] != node['type']:
+            relabelled.add(node_id)
+            delta.remove_nodes.append(node_id)
+            delta.upsert_nodes.append(node)
+            delta.changed_nodes += 1
+        elif record_hash(old) != record_hash(node):
+            delta.upsert_nodes.append(node)
+            delta.changed_nodes += 1
+
+    for node_id in old_nodes:
+        if node_id not in new_nodes:
+            delta.remove_nodes.append(node_id)
+
+    for key, edge in new_edges.items():
+        old = old_edges.get(key)
+        if old is None:
+            delta.upsert_edges.append(edge)
+            delta.added_edges += 1
+        elif edge['source'] in relabelled or edge['target'] in relabelled or record_hash(old) != record_hash(edge):
+            delta.upsert_edges.append(edge)
+            delta.changed_edges += 1
+
+    removed_node_ids = set(delta.remove_nodes) - relabelled
+    for key, edge in old_edges.items():
+        if key in new_edges:
+            continue
+        # Edges of deleted nodes go away with DETACH DELETE
+        if edge['source'] in removed_node_ids or edge['target'] in removed_node_ids:
+            continue
+        delta.remove_edges.append(edge)
+
+    return delta
+
+class IngestState:
+    """
+    Persisted result of the last ingestion: for each connector, the fingerprint
+    of its source and the nodes/edges it produced.
+    """
+
+    def __init__(self, target: str = None, connectors: Dict[str, Dict] = None):
+        self.target = target
+        self.connectors: Dict[str, Dict] = connectors or {}
+
+    @classmethod
+    def load(cls, path: str = None) -> "IngestState":
+        path = path or DEFAULT_STATE_PATH
+        if not os.path.exists(path):
+            return cls()
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Ignoring unreadable ingest state {path}: {e}")
+            return cls()
+        if data.get('version') != STATE_VERSION:
+            return cls()
+        return cls(data.get('target'), data.get('connectors', {}))
+
+    def save(self, path: str = None):
+        path = path or DEFAULT_STATE_PATH
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"version": STATE_VERSION, "target": self.target, "connectors": self.connectors},
+                      f, default=_json_default)
+        os.replace(tmp_path, path)
+
+    def outputs(self) -> List[Tuple[List[Dict], List[Dict]]]:
+        return [(entry['nodes'], entry['edges']) for entry in self.connectors.values()]
+
+def load_state(storage, path: str = None) -> IngestState:
+    """The ingest state last saved for `storage`; in-memory graphs keep theirs on the storage object."""
+    if not storage.persistent:
+        return storage.ingest_state or IngestState()
+    return IngestState.load(path)
+
+def save_state(storage, state: IngestState, path: str = None):
+    if not storage.persistent:
+        storage.ingest_state = state
+        return
+    state.save(path)
+
+def discard_state(storage, path: str = None):
+    """Forgets the saved state, e.g. before the graph is written, so a run that stops midway isn't diffed against."""
+    if not storage.persistent:
+        storage.ingest_state = None
+        return
+    try:
+        os.remove(path or DEFAULT_STATE_PATH)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,277 @@
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import List, Dict, Iterable, Optional
+import os
+
+from .reachability import IMPACT_REL_TYPES
+
+class MemoryGraphStorage:
+    """
+    In-process graph backend that holds the connector output in memory.
+
+    Mirrors the write API of GraphStorage (clear_graph, upsert_node(s),
+    upsert_edge(s), close) and answers the QueryEngine lookups natively
+    from dictionaries instead of Cypher:
+      - nodes:   id -> flattened properties (same shape as Neo4j record.data())
+      - labels:  label -> ids carrying it (insertion ordered)
+      - out_adj: rel_type -> source id -> {target id: props}
+      - in_adj:  rel_type -> target id -> {source id: props}
+
+    It has no `query`: QueryEngine only calls the reads below, which
+    GraphStorage answers with Cypher.
+    """
+
+    name = "In-Memory"
+    supports_native_queries = True
+    # Ingest state and the reachability index stay on this object instead of
+    # the files shared with Neo4j (see graph.delta.load_state, graph.reachability.load_index)
+    persistent = False
+
+    def __init__(self, batch_size: int = None):
+        # batch_size is accepted for signature compatibility with GraphStorage
+        self.batch_size = batch_size
+        # The graph lives and dies with this object, so persisted state never matches another instance
+        self.target = f"memory:{os.getpid()}:{id(self)}"
+        self.clear_graph()
+
+    def verify_connection(self):
+        return
+
+    def close(self):
+        return
+
+    @contextmanager
+    def session(self):
+        """Counterpart of GraphStorage.session; there is nothing to pool here."""
+        yield self
+
+    def clear_graph(self):
+        """Deletes all nodes and relationships."""
+        self.nodes: Dict[str, Dict] = {}
+        self.labels: Dict[str, Dict[str, None]] = defaultdict(dict)
+        self.out_adj: Dict[str, Dict[str, Dict[str, Dict]]] = defaultdict(lambda: defaultdict(dict))
+        self.in_adj: Dict[str, Dict[str, Dict[str, Dict]]] = defaultdict(lambda: defaultdict(dict))
+        self.ingest_state = None
+        self.reachability_index = None
+
+    # --- Writes ---
+
+    def upsert_node(self, node: dict):
+        """Same semantics as MERGE + SET n += props."""
+        data = self.nodes.setdefault(node['id'], {"id": node['id']})
+        data['name'] = node['name']
+        data.update(node['properties'])
+        self.labels[node['type']][node['id']] = None
+
+    def upsert_edge(self, edge: dict):
+        """Edges whose endpoints don't exist are dropped, like the MATCH in Cypher."""
+        source, target = edge['source'], edge['target']
+        if source not in self.nodes or target not in self.nodes:
+            return
+        rel_type = edge['type'].upper()
+        props = self.out_adj[rel_type][source].setdefault(target, {})
+        props.update(edge['properties'])
+        self.in_adj[rel_type][target][source] = props
+
+    def upsert_nodes(self, nodes: Iterable[dict], chunk_size: int = None) -> int:
+        count = 0
+        for node in nodes:
+            self.upsert_node(node)
+            count += 1
+        return count
+
+    def upsert_edges(self, edges: Iterable[dict], chunk_size: int = None) -> int:
+        count = 0
+        for edge in edges:
+            self.upsert_edge(edge)
+            count += 1
+        return count
+
+    def remove_node(self, node_id: str):
+        """Same semantics as DETACH DELETE."""
+        if self.nodes.pop(node_id, None) is None:
+            return
+        for ids in self.labels.values():
+            ids.pop(node_id, None)
+        for rel_type in list(self.out_adj):
+            for target in self.out_adj[rel_type].pop(node_id, {}):
+                self.in_adj[rel_type][target].pop(node_id, None)
+            for source in self.in_adj[rel_type].pop(node_id, {}):
+                self.out_adj[rel_type][source].pop(node_id, None)
+
+    def is_empty(self) -> bool:
+        return not self.nodes
+
+    def apply_delta(self, delta) -> None:
+        """Applies a graph.delta.GraphDelta. Upserts replace properties rather than merging them."""
+        for edge in delta.remove_edges:
+            rel_type = edge['type'].upper()
+            self.out_adj[rel_type].get(edge['source'], {}).pop(edge['target'], None)
+            self.in_adj[rel_type].get(edge['target'], {}).pop(edge['source'], None)
+        for node_id in delta.remove_nodes:
+            self.remove_node(node_id)
+        for node in delta.upsert_nodes:
+            data = {"id": node['id'], "name": node['name']}
+            data.update(node['properties'])
+            self.nodes[node['id']] = data
+            self.labels[node['type']][node['id']] = None
+        for edge in delta.upsert_edges:
+            source, target = edge['source'], edge['target']
+            if source not in self.nodes or target not in self.nodes:
+                continue
+            rel_type = edge['type'].upper()
+            props = dict(edge['properties'])
+            self.out_adj[rel_type][source][target] = props
+            self.in_adj[rel_type][target][source] = props
+
+    def export_records(self):
+        """Every node and edge in connector format, e.g. for graph.snapshot."""
+        from .snapshot import edge_id
+        label_of = {}
+        for label, ids in self.labels.items():
+            for node_id in ids:
+                label_of.setdefault(node_id, label)
+        nodes = [{"id": node_id, "type": label_of.get(node_id, "Entity"), "name": data.get('name'),
+                  "properties": {k: v for k, v in data.items() if k not in ("id", "name")}}
+                 for node_id, data in self.nodes.items()]
+        edges = [{"id": edge_id(source, rel_type, target), "source": source, "target": target,
+                  "type": rel_type, "properties": dict(props)}
+                 for rel_type, rows in self.out_adj.items()
+                 for source, targets in rows.items() for target, props in targets.items()]
+        return nodes, edges
+
+    # --- Reads used by QueryEngine, the same calls GraphStorage answers with Cypher ---
+    # Nodes are returned as copies: results are cached and shared with callers.
+
+    def _node(self, node_id: str) -> Dict:
+        return dict(self.nodes[node_id])
+
+    def get_node(self, node_id: str) -> Optional[Dict]:
+        return self._node(node_id) if node_id in self.nodes else None
+
+    def get_nodes_by_ids(self, node_ids: List[str]) -> List[Dict]:
+        """The nodes that exist among node_ids, ordered by id."""
+        return [self._node(i) for i in sorted(set(node_ids)) if i in self.nodes]
+
+    def get_nodes(self, node_type: str = None, limit: int = 100) -> List[Dict]:
+        if node_type:
+            ids = self.labels.get(node_type.capitalize(), {})
+        else:
+            ids = self.nodes
+        result = []
+        for node_id in ids:
+            if len(result) >= limit:
+                break
+            result.append(self._node(node_id))
+        return result
+
+    def get_owner(self, node_id: str) -> List[Dict]:
+        teams = self.labels.get("Team", {})
+        targets = self.out_adj["OWNED_BY"].get(node_id, {})
+        return [self._node(t) for t in targets if t in teams]
+
+    def _reach(self, node_id: str, adjacency: Dict[str, Dict[str, Dict[str, Dict]]]) -> List[str]:
+        """BFS over the impact relationship types. The start node is only
+        included if it is reachable from itself (i.e. part of a cycle)."""
+        seen = set()
+        order = []
+        queue = deque([node_id])
+        while queue:
+            current = queue.popleft()
+            for rel_type in IMPACT_REL_TYPES:
+                for neighbour in adjacency[rel_type].get(current, {}):
+                    if neighbour not in seen:
+                        seen.add(neighbour)
+                        order.append(neighbour)
+                        queue.append(neighbour)
+        return order
+
+    def impact_neighbours(self, node_ids: List[str], direction: str) -> List[str]:
+        """One DEPENDS_ON/CALLS hop from every id: dependents ("down") or dependencies ("up")."""
+        adjacency = self.in_adj if direction == "down" else self.out_adj
+        result = set()
+        for node_id in node_ids:
+            for rel_type in IMPACT_REL_TYPES:
+                result.update(adjacency[rel_type].get(node_id, {}))
+        return list(result)
+
+    def impact_pairs(self) -> List[tuple]:
+        """All (source, target) DEPENDS_ON/CALLS pairs."""
+        return [(source, target) for rel_type in IMPACT_REL_TYPES
+                for source, targets in self.out_adj[rel_type].items() for target in targets]
+
+    def ownership(self) -> Dict[str, List[str]]:
+        """Node id -> ids of the teams it is OWNED_BY."""
+        teams = self.labels.get("Team", {})
+        return {source: [t for t in targets if t in teams]
+                for source, targets in self.out_adj["OWNED_BY"].items() if targets}
+
+    def impact_subgraph(self, node_ids: Iterable[str]) -> Dict:
+        """DEPENDS_ON/CALLS pairs among node_ids, and the teams owning each of them."""
+        ids = set(node_ids)
+        teams = self.labels.get("Team", {})
+        edges = sorted({(source, target) for source in ids for rel_type in IMPACT_REL_TYPES
+                        for target in self.out_adj[rel_type].get(source, {}) if target in ids})
+        owners = {i: [t for t in self.out_adj["OWNED_BY"].get(i, {}) if t in teams] for i in ids}
+        return {"edges": edges, "owners": {i: t for i, t in owners.items() if t}}
+
+    def impact_reach(self, node_id: str, direction: str) -> List[Dict]:
+        """Every node reachable over DEPENDS_ON/CALLS: dependents ("down") or dependencies ("up")."""
+        if node_id not in self.nodes:
+            return []
+        return [self._node(i) for i in self._reach(node_id, self.in_adj if direction == "down" else self.out_adj)]
+
+    def shortest_path(self, from_id: str, to_id: str) -> List:
+        """
+        Undirected BFS over every relationship type.
+        Returns the same shape as Neo4j's Path serialization:
+        [node, "REL_TYPE", node, "REL_TYPE", node, ...]
+        """
+        if from_id not in self.nodes or to_id not in self.nodes:
+            return []
+        if from_id == to_id:
+            # shortestPath requires at least one hop
+            return []
+
+        parents = {from_id: None}
+        queue = deque([from_id])
+        while queue and to_id not in parents:
+            current = queue.popleft()
+            for rel_type in list(self.out_adj):
+                for adjacency in (self.out_adj[rel_type], self.in_adj[rel_type]):
+                    for neighbour in adjacency.get(current, {}):
+                        if neighbour not in parents:
+                            parents[neighbour] = (current, rel_type)
+                            queue.append(neighbour)
+
+        if to_id not in parents:
+            return []
+
+        path = [self._node(to_id)]
+        current = to_id
+        while parents[current] is not None:
+            previous, rel_type = parents[current]
+            path = [self._node(previous), rel_type] + path
+            current = previous
+        return path
+
+class AsyncMemoryStorage:
+    """
+    MemoryGraphStorage for AsyncQueryEngine: the reads become coroutines (that
+    never wait), everything else is the wrapped storage's.
+    """
+
+    READS = ("get_node", "get_nodes_by_ids", "get_nodes", "get_owner", "impact_reach", "impact_neighbours",
+             "impact_pairs", "ownership", "impact_subgraph", "shortest_path")
+
+    def __init__(self, storage: MemoryGraphStorage):
+        self.storage = storage
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.storage, name)
+        if name not in self.READS:
+            return attr
+
+        async def read(*args, **kwargs):
+            return attr(*args, **kwargs)
+        return read
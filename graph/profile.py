@@ -0,0 +1,94 @@
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from telemetry.tracing import enclosing_span
+
+# Run every GraphStorage.query under PROFILE and aggregate the plans
+PROFILE_QUERIES = os.getenv("NEO4J_PROFILE", "").lower() in ("1", "true", "yes")
+
+# Operators that read every node in the database
+FULL_SCAN_OPERATORS = {"AllNodesScan"}
+
+def operator_name(operator_type: str) -> str:
+    """"AllNodesScan@neo4j" -> "AllNodesScan"."""
+    return operator_type.split("@", 1)[0]
+
+def plan_stats(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Totals of a PROFILE plan (the driver's ResultSummary.profile): db hits
+    summed over every operator, rows produced by the root, the operators used
+    and whether any of them scans all nodes.
+    """
+    db_hits = 0
+    operators = set()
+    stack = [profile]
+    while stack:
+        plan = stack.pop()
+        db_hits += plan.get("dbHits", 0)
+        operators.add(operator_name(plan.get("operatorType", "")))
+        stack.extend(plan.get("children", []))
+    return {
+        "db_hits": db_hits,
+        "rows": profile.get("rows", 0),
+        "operators": sorted(operators),
+        "full_scan": bool(operators & FULL_SCAN_OPERATORS),
+    }
+
+def current_method() -> str:
+    """The QueryEngine method (its graph.* span) a statement runs for, or "other"."""
+    method = enclosing_span("graph.")
+    return method.name[len("graph."):] if method is not None else "other"
+
+class QueryProfiler:
+    """
+    PROFILE results aggregated per QueryEngine method:
+    statements run, db hits, rows, operators seen, full scans and the
+    statements that did them. Thread-safe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.methods: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, method: str, statement: str, stats: Dict[str, Any]):
+        with self._lock:
+            entry = self.methods.setdefault(method, {
+                "queries": 0, "db_hits": 0, "rows": 0, "max_db_hits": 0,
+                "operators": set(), "full_scans": 0, "full_scan_statements": set(),
+            })
+            entry["queries"] += 1
+            entry["db_hits"] += stats["db_hits"]
+            entry["rows"] += stats["rows"]
+            entry["max_db_hits"] = max(entry["max_db_hits"], stats["db_hits"])
+            entry["operators"].update(stats["operators"])
+            if stats["full_scan"]:
+                entry["full_scans"] += 1
+                entry["full_scan_statements"].add(statement)
+
+    def report(self, calls: Optional[Dict[str, int]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        JSON-friendly copy of the aggregates. With calls (method -> number of
+        QueryEngine calls made), db hits per call are included as well.
+        """
+        with self._lock:
+            report = {}
+            for method, entry in sorted(self.methods.items()):
+                row = dict(entry, operators=sorted(entry["operators"]),
+                           full_scan_statements=sorted(entry["full_scan_statements"]))
+                if calls and calls.get(method):
+                    row["db_hits_per_call"] = entry["db_hits"] / calls[method]
+                report[method] = row
+            return report
+
+    def reset(self):
+        with self._lock:
+            self.methods.clear()
+
+def format_report(report: Dict[str, Dict[str, Any]]) -> List[str]:
+    lines = [f"{'method':<18} {'queries':>8} {'db hits':>10} {'max':>8} {'rows':>8}  operators"]
+    for method, row in report.items():
+        flag = "  FULL SCAN" if row["full_scans"] else ""
+        lines.append(f"{method:<18} {row['queries']:>8} {row['db_hits']:>10} {row['max_db_hits']:>8} "
+                     f"{row['rows']:>8}  {', '.join(row['operators'])}{flag}")
+    return lines
@@ -1,67 +1,164 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+import base64
+import json
+import os
 from .storage import GraphStorage
+from .cache import QueryCache, cached_query
+from .reachability import ReachabilityIndex, ReachabilityIndexLoader
+from .criticality import rank_criticality
+from telemetry.tracing import traced
+
+def encode_cursor(offsets: Dict[str, int]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(offsets).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor: Optional[str]) -> Dict[str, int]:
+    if not cursor:
+        return {"down": 0, "up": 0}
+    try:
+        offsets = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return {"down": int(offsets["down"]), "up": int(offsets["up"])}
+    except (ValueError, KeyError, TypeError):
+        raise ValueError(f"Invalid blast radius cursor: {cursor!r}")
+
+def walk_hops(node_id: str, neighbours, direction: str, max_depth: Optional[int],
+              wanted: Optional[int] = None) -> List[Tuple[int, str]]:
+    """
+    Breadth-first (hop, id) pairs, ordered by hop then id, using
+    neighbours(ids, direction) for each hop. Stops after the hop that brings
+    the count to `wanted`.
+    """
+    ordered: List[Tuple[int, str]] = []
+    seen = set()
+    frontier = [node_id]
+    hop = 0
+    while frontier and (max_depth is None or hop < max_depth):
+        if wanted is not None and len(ordered) >= wanted:
+            break
+        hop += 1
+        # The start node is only reported if a cycle leads back to it, like in Cypher
+        frontier = sorted(set(neighbours(frontier, direction)) - seen)
+        seen.update(frontier)
+        ordered.extend((hop, i) for i in frontier)
+    return ordered
+
+def walked_total(ordered: List[Tuple[int, str]], wanted: Optional[int]) -> Optional[int]:
+    """Number of nodes within reach if the walk ran to the end, None if it stopped early."""
+    return len(ordered) if wanted is None or len(ordered) < wanted else None
+
+def hop_page(ordered: List[Tuple[int, str]], offset: int, limit: Optional[int]) -> Tuple[List[Tuple[int, str]], bool]:
+    """Slices one page out of (hop, id) pairs and reports whether more remain."""
+    end = None if limit is None else offset + limit
+    return ordered[offset:end], end is not None and len(ordered) > end
+
+def blast_radius_page(node_id: str, max_depth: Optional[int], offsets: Dict[str, int],
+                      down_page: List[Tuple[int, str]], down_more: bool,
+                      up_page: List[Tuple[int, str]], up_more: bool,
+                      nodes: Dict[str, Dict], total: Optional[int]) -> Dict[str, Any]:
+    """
+    Assembles the paginated blast radius result shared by QueryEngine and AsyncQueryEngine.
+    count_affected is the number of downstream nodes within max_depth across
+    all pages, or None when a live walk stopped before reaching them all.
+    """
+    def by_hop(page):
+        groups: List[Dict[str, Any]] = []
+        for hop, i in page:
+            if not groups or groups[-1]["hop"] != hop:
+                groups.append({"hop": hop, "nodes": []})
+            groups[-1]["nodes"].append(nodes.get(i, {"id": i}))
+        return groups
+
+    downstream = [nodes.get(i, {"id": i}) for _, i in down_page]
+    next_cursor = None
+    if down_more or up_more:
+        next_cursor = encode_cursor({"down": offsets["down"] + len(down_page),
+                                     "up": offsets["up"] + len(up_page)})
+    return {
+        "node": node_id,
+        "max_depth": max_depth,
+        "downstream_impact": downstream,
+        "upstream_dependencies": [nodes.get(i, {"id": i}) for _, i in up_page],
+        "downstream_by_hop": by_hop(down_page),
+        "upstream_by_hop": by_hop(up_page),
+        "count_affected": total,
+        "next_cursor": next_cursor
+    }
+
+def impact_rows(result: Dict) -> int:
+    """Row count of a blast_radius result for tracing: nodes returned in both directions."""
+    return len(result.get("downstream_impact", [])) + len(result.get("upstream_dependencies", []))
+
+def edge_rows(result: Dict) -> int:
+    """Row count of an impact_subgraph result for tracing: edges returned."""
+    return len(result["edges"])
+
+def with_names(rows: List[Dict], nodes: Dict[str, Dict]) -> List[Dict]:
+    """Numbers ranked criticality rows and adds node names."""
+    return [{"rank": rank, "name": nodes.get(row["id"], {}).get("name", row["id"]), **row}
+            for rank, row in enumerate(rows, start=1)]
 
 class QueryEngine:
-    def __init__(self, storage: GraphStorage):
+    def __init__(self, storage: GraphStorage, cache_size: int = None, use_reachability: bool = None):
         self.storage = storage
+        # Results are reused until the graph version is bumped by an ingest
+        self.cache = QueryCache(cache_size)
+        # blast_radius reads the closure materialized at ingest time unless
+        # BLAST_RADIUS_MODE=live asks for variable-length traversals
+        if use_reachability is None:
+            use_reachability = os.getenv("BLAST_RADIUS_MODE", "index").lower() != "live"
+        self.use_reachability = use_reachability
+        self._reachability = ReachabilityIndexLoader(storage)
+
+    def reachability(self) -> Optional[ReachabilityIndex]:
+        """The reachability index written by the last ingest into this graph, if any."""
+        if not self.use_reachability:
+            return None
+        return self._reachability.get()
 
+    @traced("graph.get_node")
+    @cached_query
     def get_node(self, node_id: str) -> Optional[Dict]:
         """Retrieve a single node by ID."""
-        records = self.storage.query("MATCH (n {id: $id}) RETURN n", {"id": node_id})
-        if records:
-            return records[0]['n']
-        return None
+        return self.storage.get_node(node_id)
 
+    @traced("graph.get_nodes")
+    @cached_query
     def get_nodes(self, node_type: str = None, limit: int = 100) -> List[Dict]:
         """List nodes, optionally filtered by type."""
-        if node_type:
-            # Safe because type is verified or originates from trusted list usually
-            # But strictly we should sanitize.
-            # Here we assume node_type is clean 'Service', 'Database' etc.
-            # Fix: Ensure label is Capitalized to match Neo4j data (e.g. 'service' -> 'Service')
-            cypher = f"MATCH (n:`{node_type.capitalize()}`) RETURN n LIMIT $limit"
-        else:
-            cypher = "MATCH (n) RETURN n LIMIT $limit"
-        
-        records = self.storage.query(cypher, {"limit": limit})
-        return [r['n'] for r in records]
+        return self.storage.get_nodes(node_type, limit)
 
+    @traced("graph.get_owner")
+    @cached_query
     def get_owner(self, node_id: str) -> List[Dict]:
         """Find the team that owns this node."""
-        cypher = """
-        MATCH (n {id: $id})-[:OWNED_BY]->(t:Team)
-        RETURN t
-        """
-        records = self.storage.query(cypher, {"id": node_id})
-        return [r['t'] for r in records]
-        
-    def blast_radius(self, node_id: str) -> Dict[str, List[Dict]]:
+        return self.storage.get_owner(node_id)
+
+    @traced("graph.blast_radius", rows=impact_rows)
+    @cached_query
+    def blast_radius(self, node_id: str, max_depth: int = None, limit: int = None,
+                     cursor: str = None) -> Dict[str, List[Dict]]:
         """
         Calculate impact:
         1. Downstream: What depends on this? (Transitive)
         2. Upstream: What does this depend on? (Optional context)
         3. Directly affected teams.
+
+        With max_depth, limit or cursor, the result is walked hop by hop and
+        paginated instead; see _blast_radius_page.
         """
-        # Downstream: (n)<-[*]-(dependent)
-        # Note: DEPENDS_ON direction: Service A DEPENDS_ON Service B.
-        # If B goes down, A is affected. So we traverse incoming DEPENDS_ON edges.
-        # Also CALLS edges: A CALLS B. If B down, A affected.
-        
-        # Finding everything that depends on node_id
-        downstream_cypher = """
-        MATCH (n {id: $id})<-[:DEPENDS_ON|CALLS*]-(dependent)
-        RETURN distinct dependent
-        """
-        
-        # Finding everything this node depends on (root cause analysis context)
-        upstream_cypher = """
-        MATCH (n {id: $id})-[:DEPENDS_ON|CALLS*]->(dependency)
-        RETURN distinct dependency
-        """
-        
-        downstream = [r['dependent'] for r in self.storage.query(downstream_cypher, {"id": node_id})]
-        upstream = [r['dependency'] for r in self.storage.query(upstream_cypher, {"id": node_id})]
-        
+        # Both directions (and every hop of a paged walk) share one pooled session
+        with self.storage.session():
+            if max_depth is not None or limit is not None or cursor is not None:
+                return self._blast_radius_page(node_id, max_depth, limit, cursor)
+            return self._blast_radius_all(node_id)
+
+    def _blast_radius_all(self, node_id: str) -> Dict[str, List[Dict]]:
+        index = self.reachability()
+        if index is not None:
+            downstream = self.storage.get_nodes_by_ids(index.downstream_ids(node_id))
+            upstream = self.storage.get_nodes_by_ids(index.upstream_ids(node_id))
+        else:
+            downstream = self.storage.impact_reach(node_id, "down")
+            upstream = self.storage.impact_reach(node_id, "up")
         return {
             "node": node_id,
             "downstream_impact": downstream,
@@ -69,24 +166,75 @@ class QueryEngine:
             "count_affected": len(downstream)
         }
 
+    def _walk(self, node_id: str, direction: str, max_depth: Optional[int], offset: int,
+              limit: Optional[int]) -> Tuple[List[Tuple[int, str]], bool, Optional[int]]:
+        """
+        Breadth-first walk returning the (hop, id) pairs of one page, ordered by
+        hop then id, whether more remain, and the number of nodes within
+        max_depth if known. With the reachability index every hop is an
+        in-memory lookup, so the whole walk is done and the total is exact.
+        Without it each hop is a query, and the walk stops as soon as the page
+        is full, so the first page of a huge radius only touches the first few hops.
+        """
+        index = self.reachability()
+        if index is not None:
+            ordered = walk_hops(node_id, index.neighbours, direction, max_depth)
+            return (*hop_page(ordered, offset, limit), len(ordered))
+        wanted = None if limit is None else offset + limit + 1
+        ordered = walk_hops(node_id, self.storage.impact_neighbours, direction, max_depth, wanted)
+        return (*hop_page(ordered, offset, limit), walked_total(ordered, wanted))
+
+    def _blast_radius_page(self, node_id: str, max_depth: Optional[int], limit: Optional[int],
+                           cursor: Optional[str]) -> Dict[str, Any]:
+        """
+        One page of the blast radius, at most `limit` nodes per direction within
+        `max_depth` hops, grouped by hop distance. Pass `next_cursor` back to get
+        the following page.
+        """
+        offsets = decode_cursor(cursor)
+        down_page, down_more, total = self._walk(node_id, "down", max_depth, offsets["down"], limit)
+        up_page, up_more, _ = self._walk(node_id, "up", max_depth, offsets["up"], limit)
+        nodes = {n['id']: n for n in self.storage.get_nodes_by_ids([i for _, i in down_page + up_page])}
+        return blast_radius_page(node_id, max_depth, offsets, down_page, down_more,
+                                 up_page, up_more, nodes, total)
+
+    @traced("graph.criticality")
+    @cached_query
+    def criticality(self, node_type: str = None, limit: int = 20) -> List[Dict]:
+        """
+        Nodes ranked by how much breaks if they fail: downstream impact count
+        and affected teams, computed for the whole graph in one pass (see
+        graph.criticality.rank_criticality) rather than a blast_radius per node.
+        """
+        index = self.reachability()
+        with self.storage.session():
+            pairs = index.edges if index is not None else self.storage.impact_pairs()
+            owners = self.storage.ownership()
+
+            prefix = f"{node_type.lower()}:" if node_type else None
+            top = rank_criticality(pairs, owners, prefix, limit)
+            return with_names(top, {n['id']: n for n in self.storage.get_nodes_by_ids([r["id"] for r in top])})
+
+    @traced("graph.impact_subgraph", rows=edge_rows)
+    @cached_query
+    def impact_subgraph(self, node_ids: Tuple[str, ...]) -> Dict[str, Any]:
+        """
+        DEPENDS_ON/CALLS edges among node_ids (e.g. the nodes of a blast radius)
+        as sorted (source, target) pairs, and the owning team ids of each node.
+        Pass a tuple so the result can be cached.
+        """
+        if not node_ids:
+            return {"edges": [], "owners": {}}
+        return self.storage.impact_subgraph(node_ids)
+
+    @traced("graph.pager")
+    def pager(self, node_id: str) -> Dict:
+        """The node and its owning teams (what the pager intent needs), on one session."""
+        with self.storage.session():
+            return {"node": self.get_node(node_id), "owners": self.get_owner(node_id)}
+
+    @traced("graph.shortest_path")
+    @cached_query
     def shortest_path(self, from_id: str, to_id: str) -> List[Dict]:
         """Find data path between two nodes."""
-        cypher = """
-        MATCH p = shortestPath((start {id: $from_id})-[*]-(end {id: $to_id}))
-        RETURN p
-        """
-        records = self.storage.query(cypher, {"from_id": from_id, "to_id": to_id})
-        if not records:
-            return []
-            
-        # Parse path object is a bit complex in raw result, Neo4j driver returns Path object
-        # But .data() converts it.
-        # Simple extraction of nodes involved
-        # For visualization, we might need nodes and edges.
-        # Let's return list of node names/ids in order or the full path.
-        
-        # Simplifying for list output
-        path_data = records[0]['p']
-        # path_data is likely a list of nodes and rels if we check how data() serializes Path.
-        # Let's just return it and parse in UI.
-        return path_data
+        return self.storage.shortest_path(from_id, to_id)
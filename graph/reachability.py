@@ -0,0 +1,317 @@
+import json
+import os
+from typing import List, Dict, Iterable, Tuple
+
+# Relationship types that propagate failures: A DEPENDS_ON/CALLS B means A breaks if B breaks
+IMPACT_REL_TYPES = ("DEPENDS_ON", "CALLS")
+
+DEFAULT_INDEX_PATH = os.getenv(
+    "REACHABILITY_INDEX_PATH",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.ekg_reachability.json'))
+)
+
+INDEX_VERSION = 1
+
+def impact_edges(node_ids: Iterable[str], edges: Iterable[Dict]) -> List[Tuple[str, str]]:
+    """(source, target) pairs of the impact subgraph, limited to edges whose endpoints exist."""
+    known = set(node_ids)
+    pairs = set()
+    for edge in edges:
+        if edge['type'].upper() in IMPACT_REL_TYPES and edge['source'] in known and edge['target'] in known:
+            pairs.add((edge['source'], edge['target']))
+    return sorted(pairs)
+
+def strongly_connected_components(count: int, adjacency: List[List[int]]) -> List[List[int]]:
+    """
+    Iterative Tarjan over vertices 0..count-1.
+    Components come out in reverse topological order: every component is
+    emitted after all components reachable from it.
+    """
+    index = [-1] * count
+    lowlink = [0] * count
+    on_stack = [False] * count
+    stack: List[int] = []
+    components: List[List[int]] = []
+    counter = 0
+
+    for root in range(count):
+        if index[root] != -1:
+            continue
+        work = [(root, 0)]
+        while work:
+            v, i = work.pop()
+            if i == 0:
+                index[v] = lowlink[v] = counter
+                counter += 1
+                stack.append(v)
+                on_stack[v] = True
+            recurse = False
+            neighbours = adjacency[v]
+            while i < len(neighbours):
+                w = neighbours[i]
+                i += 1
+                if index[w] == -1:
+                    work.append((v, i))
+                    work.append((w, 0))
+                    recurse = True
+                    break
+                if on_stack[w]:
+                    lowlink[v] = min(lowlink[v], index[w])
+            if recurse:
+                continue
+            if lowlink[v] == index[v]:
+                component = []
+                while True:
+                    w = stack.pop()
+                    on_stack[w] = False
+                    component.append(w)
+                    if w == v:
+                        break
+                components.append(component)
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[v])
+    return components
+
+def transitive_closure(count: int, adjacency: List[List[int]]) -> List[int]:
+    """
+    Reachable set of every vertex as an int bitset, computed once per strongly
+    connected component on the condensation. A vertex only reaches itself if
+    it sits on a cycle, matching Cypher's `(n)-[*]->(m)` semantics.
+    """
+    components = strongly_connected_components(count, adjacency)
+    component_of = [0] * count
+    for c, members in enumerate(components):
+        for v in members:
+            component_of[v] = c
+
+    reach = [0] * len(components)
+    for c, members in enumerate(components):
+        member_bits = 0
+        for v in members:
+            member_bits |= 1 << v
+        bits = 0
+        cyclic = len(members) > 1
+        for v in members:
+            for w in adjacency[v]:
+                d = component_of[w]
+                if d == c:
+                    cyclic = True
+                else:
+                    # Successor components were finished earlier (reverse topological order)
+                    bits |= reach[d] | (1 << w)
+        if cyclic:
+            bits |= member_bits
+        reach[c] = bits
+
+    return [reach[component_of[v]] for v in range(count)]
+
+def _bits_to_indexes(bits: int) -> List[int]:
+    result = []
+    while bits:
+        low = bits & -bits
+        result.append(low.bit_length() - 1)
+        bits ^= low
+    return result
+
+class ReachabilityIndex:
+    """
+    Materialized transitive closure of the DEPENDS_ON/CALLS subgraph in both directions.
+    downstream[x]: everything that (transitively) depends on x, i.e. breaks if x breaks.
+    upstream[x]:   everything x (transitively) depends on.
+    """
+
+    def __init__(self, target: str = None):
+        self.target = target
+        self.ids: List[str] = []
+        self.position: Dict[str, int] = {}
+        self.edges = set()
+        self.downstream: List[int] = []
+        self.upstream: List[int] = []
+        # direction -> id -> one-hop neighbours, built from edges on first use
+        self._adjacency = None
+
+    @classmethod
+    def build(cls, pairs: Iterable[Tuple[str, str]], target: str = None) -> "ReachabilityIndex":
+        index = cls(target)
+        index.edges = set(pairs)
+        index._rebuild()
+        return index
+
+    def _intern(self, node_id: str) -> int:
+        position = self.position.get(node_id)
+        if position is None:
+            position = len(self.ids)
+            self.ids.append(node_id)
+            self.position[node_id] = position
+            self.downstream.append(0)
+            self.upstream.append(0)
+        return position
+
+    def _rebuild(self):
+        self._adjacency = None
+        self.ids, self.position = [], {}
+        self.downstream, self.upstream = [], []
+        for source, target in sorted(self.edges):
+            self._intern(source)
+            self._intern(target)
+        count = len(self.ids)
+        forward = [[] for _ in range(count)]
+        reverse = [[] for _ in range(count)]
+        for source, target in self.edges:
+            s, t = self.position[source], self.position[target]
+            forward[s].append(t)
+            reverse[t].append(s)
+        self.upstream = transitive_closure(count, forward)
+        self.downstream = transitive_closure(count, reverse)
+
+    def add_edges(self, pairs: Iterable[Tuple[str, str]]):
+        """
+        Incremental insert: for a new edge u -> v, everything that reaches u
+        (plus u) now reaches everything v reaches (plus v).
+        """
+        for source, target in pairs:
+            if (source, target) in self.edges:
+                continue
+            self.edges.add((source, target))
+            self._adjacency = None
+            u, v = self._intern(source), self._intern(target)
+            reaches_u = self.downstream[u] | (1 << u)
+            reached_from_v = self.upstream[v] | (1 << v)
+            for a in _bits_to_indexes(reached_from_v):
+                self.downstream[a] |= reaches_u
+            for b in _bits_to_indexes(reaches_u):
+                self.upstream[b] |= reached_from_v
+
+    def remove_edges(self, pairs: Iterable[Tuple[str, str]]):
+        """Deletions can't be applied to a closure locally, so the index is recomputed."""
+        before = len(self.edges)
+        self.edges.difference_update(pairs)
+        if len(self.edges) != before:
+            self._rebuild()
+
+    def apply_delta(self, delta, known_ids=None):
+        """
+        Updates the index from a graph.delta.GraphDelta.
+        known_ids (all node ids after the delta) filters out edges whose
+        endpoints don't exist, which the graph drops as well.
+        """
+        removed_nodes = set(delta.remove_nodes)
+        removed = {(e['source'], e['target']) for e in delta.remove_edges if e['type'].upper() in IMPACT_REL_TYPES}
+        # DETACH DELETE takes a node's edges with it; relabelled nodes get theirs back via upsert_edges
+        removed |= {pair for pair in self.edges if pair[0] in removed_nodes or pair[1] in removed_nodes}
+        self.remove_edges(removed)
+        self.add_edges((e['source'], e['target']) for e in delta.upsert_edges
+                       if e['type'].upper() in IMPACT_REL_TYPES
+                       and (known_ids is None or (e['source'] in known_ids and e['target'] in known_ids)))
+
+    def neighbours(self, node_ids: Iterable[str], direction: str) -> List[str]:
+        """One hop from every id, like GraphStorage.impact_neighbours: dependents ("down") or dependencies ("up")."""
+        if self._adjacency is None:
+            self._adjacency = {"down": {}, "up": {}}
+            for source, target in self.edges:
+                self._adjacency["down"].setdefault(target, []).append(source)
+                self._adjacency["up"].setdefault(source, []).append(target)
+        adjacency = self._adjacency[direction]
+        result = set()
+        for node_id in node_ids:
+            result.update(adjacency.get(node_id, ()))
+        return list(result)
+
+    def downstream_ids(self, node_id: str) -> List[str]:
+        position = self.position.get(node_id)
+        if position is None:
+            return []
+        return sorted(self.ids[i] for i in _bits_to_indexes(self.downstream[position]))
+
+    def upstream_ids(self, node_id: str) -> List[str]:
+        position = self.position.get(node_id)
+        if position is None:
+            return []
+        return sorted(self.ids[i] for i in _bits_to_indexes(self.upstream[position]))
+
+    def save(self, path: str = None):
+        path = path or DEFAULT_INDEX_PATH
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                "version": INDEX_VERSION,
+                "target": self.target,
+                "ids": self.ids,
+                "edges": sorted(self.edges),
+                "downstream": [format(bits, 'x') for bits in self.downstream],
+                "upstream": [format(bits, 'x') for bits in self.upstream],
+            }, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str = None):
+        """Returns the saved index, or None if there is no usable one."""
+        path = path or DEFAULT_INDEX_PATH
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Ignoring unreadable reachability index {path}: {e}")
+            return None
+        if data.get('version') != INDEX_VERSION:
+            return None
+        index = cls(data.get('target'))
+        index.ids = data['ids']
+        index.position = {node_id: i for i, node_id in enumerate(index.ids)}
+        index.edges = {tuple(pair) for pair in data['edges']}
+        index.downstream = [int(bits, 16) for bits in data['downstream']]
+        index.upstream = [int(bits, 16) for bits in data['upstream']]
+        return index
+
+def load_index(storage) -> "ReachabilityIndex":
+    """The index last saved for `storage`, or None; in-memory graphs keep theirs on the storage object."""
+    if not storage.persistent:
+        return storage.reachability_index
+    index = ReachabilityIndex.load()
+    return index if index and index.target == storage.target else None
+
+def save_index(storage, index: ReachabilityIndex):
+    if not storage.persistent:
+        storage.reachability_index = index
+        return
+    index.save()
+
+def discard_index(storage):
+    """Drops the saved index so blast_radius traverses the graph until the next one is saved."""
+    if not storage.persistent:
+        storage.reachability_index = None
+        return
+    try:
+        os.remove(DEFAULT_INDEX_PATH)
+    except FileNotFoundError:
+        pass
+
+class ReachabilityIndexLoader:
+    """
+    Loads the saved index for one graph and reloads it when the file changes,
+    e.g. after an ingest in another process.
+    """
+
+    def __init__(self, storage, path: str = None):
+        self.storage = storage
+        self.target = storage.target
+        self.path = path or DEFAULT_INDEX_PATH
+        self._index = None
+        self._mtime = None
+
+    def get(self):
+        if not self.storage.persistent:
+            return self.storage.reachability_index
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return None
+        if mtime != self._mtime:
+            index = ReachabilityIndex.load(self.path)
+            # An index built for another database would give wrong answers
+            self._index = index if index and index.target == self.target else None
+            self._mtime = mtime
+        return self._index
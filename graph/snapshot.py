@@ -0,0 +1,254 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .delta import merge_records
+
+# Where the graph snapshot used to warm the app is kept
+DEFAULT_SNAPSHOT_PATH = os.getenv(
+    "GRAPH_SNAPSHOT_PATH",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.ekg_snapshot.bin'))
+)
+
+MAGIC = b"EKGSNAP\0"
+SNAPSHOT_VERSION = 1
+_HEADER = struct.Struct("<8sII")  # magic, version, metadata length
+_ALIGN = 8
+
+def _pad(size: int) -> int:
+    return (-size) % _ALIGN
+
+def edge_id(source: str, rel_type: str, target: str) -> str:
+    """Edge ids aren't stored in the graph; rebuilt in the connectors' "edge:..." style."""
+    return f"edge:{source}-{rel_type.lower()}-{target}"
+
+def write_snapshot(path: str, nodes: Iterable[Dict], edges: Iterable[Dict],
+                   target: str = None, sources: str = None) -> Dict:
+    """
+    Writes nodes and edges (connector format) to a binary snapshot.
+
+    Layout after a small JSON header: node ids interned into one UTF-8 blob
+    with uint32 offsets, a uint16 label code per node, and per relationship
+    type a CSR adjacency (uint32 offsets per node, uint32 target positions).
+    Names and properties, which are free-form, go into JSON blobs; edge
+    properties are stored only for the edges that have any.
+    Records are folded like an ingest would (graph.delta.merge_records) and
+    edges whose endpoints are missing are dropped, like in the graph.
+    `sources` is an opaque fingerprint of the inputs, for staleness checks.
+    Returns the metadata written.
+    """
+    by_id, merged_edges = merge_records([(list(nodes), list(edges))])
+    ids = sorted(by_id)
+    position = {node_id: i for i, node_id in enumerate(ids)}
+    labels = sorted({by_id[i]['type'] for i in ids})
+    label_code = {label: i for i, label in enumerate(labels)}
+
+    # rel type -> source position -> {target position: props}
+    adjacency: Dict[str, Dict[int, Dict[int, Dict]]] = {}
+    for edge in merged_edges.values():
+        s, t = position.get(edge['source']), position.get(edge['target'])
+        if s is None or t is None:
+            continue
+        adjacency.setdefault(edge['type'], {}).setdefault(s, {})[t] = edge['properties']
+
+    sections: List[Tuple[str, bytes]] = []
+    encoded = [node_id.encode('utf-8') for node_id in ids]
+    offsets = array('I', [0])
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+    sections.append(("ids.offsets", offsets.tobytes()))
+    sections.append(("ids.blob", b"".join(encoded)))
+    sections.append(("labels", array('H', (label_code[by_id[i]['type']] for i in ids)).tobytes()))
+    sections.append(("nodes.json", json.dumps(
+        [[by_id[i]['name'], by_id[i]['properties']] for i in ids],
+        separators=(',', ':'), default=str).encode('utf-8')))
+
+    rel_types = sorted(adjacency)
+    # rel type -> edge position (as a string, for JSON) -> props
+    edge_props: Dict[str, Dict[str, Dict]] = {}
+    edge_count = 0
+    for rel_type in rel_types:
+        rows = adjacency[rel_type]
+        csr_offsets = array('I', [0])
+        targets = array('I')
+        for s in range(len(ids)):
+            for t, props in sorted(rows.get(s, {}).items()):
+                if props:
+                    edge_props.setdefault(rel_type, {})[str(len(targets))] = props
+                targets.append(t)
+            csr_offsets.append(len(targets))
+        edge_count += len(targets)
+        sections.append((f"{rel_type}.offsets", csr_offsets.tobytes()))
+        sections.append((f"{rel_type}.targets", targets.tobytes()))
+    sections.append(("edges.json", json.dumps(edge_props, separators=(',', ':'), default=str).encode('utf-8')))
+
+    meta = {
+        "target": target,
+        "sources": sources,
+        "byteorder": sys.byteorder,
+        "node_count": len(ids),
+        "edge_count": edge_count,
+        "labels": labels,
+        "rel_types": rel_types,
+        "sections": {},
+    }
+    # Section offsets are relative to the end of the (padded) header
+    offset = 0
+    for name, data in sections:
+        meta["sections"][name] = [offset, len(data)]
+        offset += len(data) + _pad(len(data))
+    meta_bytes = json.dumps(meta, separators=(',', ':')).encode('utf-8')
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, SNAPSHOT_VERSION, len(meta_bytes)))
+        f.write(meta_bytes)
+        f.write(b"\0" * _pad(_HEADER.size + len(meta_bytes)))
+        for _, data in sections:
+            f.write(data)
+            f.write(b"\0" * _pad(len(data)))
+    os.replace(tmp_path, path)
+    return meta
+
+class GraphSnapshot:
+    """
+    Read side of a snapshot file. The file is memory-mapped and the integer
+    sections are used in place, so opening it costs the header parse only;
+    ids and properties are decoded on first use.
+
+        with GraphSnapshot.open(path) as snapshot:
+            snapshot.load_into(storage)
+    """
+
+    def __init__(self, path: str, mapped: mmap.mmap, meta: Dict, base: int):
+        self.path = path
+        self.meta = meta
+        self._mmap = mapped
+        self._view = memoryview(mapped)
+        self._base = base
+        self._ids: Optional[List[str]] = None
+        self._position: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def open(cls, path: str = None) -> "GraphSnapshot":
+        path = path or DEFAULT_SNAPSHOT_PATH
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, meta_length = _HEADER.unpack_from(mapped, 0)
+            if magic != MAGIC or version != SNAPSHOT_VERSION:
+                raise ValueError(f"{path} is not a version {SNAPSHOT_VERSION} graph snapshot")
+            meta = json.loads(mapped[_HEADER.size:_HEADER.size + meta_length])
+            if meta["byteorder"] != sys.byteorder:
+                raise ValueError(f"{path} was written on a {meta['byteorder']}-endian machine")
+        except Exception:
+            mapped.close()
+            raise
+        base = _HEADER.size + meta_length
+        return cls(path, mapped, meta, base + _pad(base))
+
+    @classmethod
+    def read_meta(cls, path: str = None) -> Optional[Dict]:
+        """The snapshot's metadata, or None if there is no readable snapshot."""
+        try:
+            with cls.open(path) as snapshot:
+                return snapshot.meta
+        except (OSError, ValueError) as e:
+            if os.path.exists(path or DEFAULT_SNAPSHOT_PATH):
+                print(f"Warning: Ignoring unreadable graph snapshot: {e}")
+            return None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._mmap is None:
+            return
+        self._view.release()
+        self._mmap.close()
+        self._mmap = None
+
+    def _section(self, name: str) -> memoryview:
+        offset, length = self.meta["sections"][name]
+        start = self._base + offset
+        return self._view[start:start + length]
+
+    def _ints(self, name: str, typecode: str = 'I') -> memoryview:
+        return self._section(name).cast(typecode)
+
+    @property
+    def node_count(self) -> int:
+        return self.meta["node_count"]
+
+    @property
+    def edge_count(self) -> int:
+        return self.meta["edge_count"]
+
+    @property
+    def ids(self) -> List[str]:
+        if self._ids is None:
+            offsets = self._ints("ids.offsets")
+            blob = self._section("ids.blob").tobytes()
+            self._ids = [blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(self.node_count)]
+        return self._ids
+
+    def position(self, node_id: str) -> Optional[int]:
+        if self._position is None:
+            self._position = {node_id: i for i, node_id in enumerate(self.ids)}
+        return self._position.get(node_id)
+
+    def neighbours(self, node_id: str, rel_type: str) -> List[str]:
+        """Targets of node_id's outgoing rel_type edges, read straight from the CSR arrays."""
+        s = self.position(node_id)
+        if s is None or rel_type not in self.meta["rel_types"]:
+            return []
+        offsets = self._ints(f"{rel_type}.offsets")
+        targets = self._ints(f"{rel_type}.targets")
+        return [self.ids[t] for t in targets[offsets[s]:offsets[s + 1]]]
+
+    def nodes(self) -> List[Dict]:
+        """Nodes in connector format ({"id", "type", "name", "properties"})."""
+        labels = self.meta["labels"]
+        codes = self._ints("labels", 'H')
+        data = json.loads(self._section("nodes.json").tobytes())
+        return [{"id": node_id, "type": labels[codes[i]], "name": data[i][0], "properties": data[i][1]}
+                for i, node_id in enumerate(self.ids)]
+
+    def edges(self) -> List[Dict]:
+        """Edges in connector format ({"id", "source", "target", "type", "properties"})."""
+        ids = self.ids
+        edge_props = json.loads(self._section("edges.json").tobytes())
+        result = []
+        for rel_type in self.meta["rel_types"]:
+            offsets = self._ints(f"{rel_type}.offsets").tolist()
+            targets = self._ints(f"{rel_type}.targets").tolist()
+            props = edge_props.get(rel_type, {})
+            for s in range(self.node_count):
+                start, end = offsets[s], offsets[s + 1]
+                if start == end:
+                    continue
+                source = ids[s]
+                for e in range(start, end):
+                    target = ids[targets[e]]
+                    result.append({"id": edge_id(source, rel_type, target), "source": source, "target": target,
+                                   "type": rel_type, "properties": dict(props[str(e)]) if props and str(e) in props else {}})
+        return result
+
+    def load_into(self, storage) -> Tuple[List[Dict], List[Dict]]:
+        """Writes every node, then every edge, through the storage's batch upserts. Returns them."""
+        nodes, edges = self.nodes(), self.edges()
+        storage.upsert_nodes(nodes)
+        storage.upsert_edges(edges)
+        return nodes, edges
+
+def export_snapshot(storage, path: str = None, sources: str = None) -> Dict:
+    """Snapshots whatever is currently in the graph (Neo4j or in-memory)."""
+    nodes, edges = storage.export_records()
+    return write_snapshot(path or DEFAULT_SNAPSHOT_PATH, nodes, edges, target=storage.target, sources=sources)
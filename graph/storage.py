@@ -1,19 +1,87 @@
 from neo4j import GraphDatabase
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
 import os
+import threading
 import time
 
+from telemetry.tracing import span
+from .profile import PROFILE_QUERIES, QueryProfiler, plan_stats, current_method
+from .cypher import (
+    ENTITY_LABEL, NODE_BY_ID_CYPHER, NODES_BY_IDS_CYPHER, ALL_NODES_CYPHER, LABEL_NODES_CYPHER, OWNER_CYPHER,
+    DOWNSTREAM_CYPHER, UPSTREAM_CYPHER, DOWNSTREAM_HOP_CYPHER, UPSTREAM_HOP_CYPHER, IMPACT_PAIRS_CYPHER,
+    OWNERSHIP_CYPHER, SUBGRAPH_EDGES_CYPHER, SUBGRAPH_OWNERSHIP_CYPHER, SHORTEST_PATH_CYPHER, label_for,
+)
+
+# Rows written per UNWIND transaction by the batch upsert methods
+DEFAULT_BATCH_SIZE = int(os.getenv("NEO4J_BATCH_SIZE", "1000"))
+
+# Seconds GraphStorage waits for Neo4j to come up before giving up
+CONNECT_RETRIES = int(os.getenv("NEO4J_CONNECT_RETRIES", "60"))
+
+# Driver and session settings shared by GraphStorage and AsyncGraphStorage
+MAX_POOL_SIZE = int(os.getenv("NEO4J_MAX_POOL_SIZE", "50"))
+# Seconds to wait for a free pooled connection before failing
+ACQUISITION_TIMEOUT = float(os.getenv("NEO4J_ACQUISITION_TIMEOUT", "60"))
+# Seconds execute_read/execute_write keep retrying transient errors (leader switches, deadlocks)
+MAX_RETRY_TIME = float(os.getenv("NEO4J_MAX_RETRY_TIME", "30"))
+# Records pulled from the server per batch while a result is consumed
+FETCH_SIZE = int(os.getenv("NEO4J_FETCH_SIZE", "1000"))
+# Target database; unset uses the user's home database, which costs a lookup per new session
+DATABASE = os.getenv("NEO4J_DATABASE") or None
+
+def driver_config() -> Dict:
+    """Keyword arguments for GraphDatabase.driver / AsyncGraphDatabase.driver."""
+    return {
+        "max_connection_pool_size": MAX_POOL_SIZE,
+        "connection_acquisition_timeout": ACQUISITION_TIMEOUT,
+        "max_transaction_retry_time": MAX_RETRY_TIME,
+    }
+
+def session_config() -> Dict:
+    """Keyword arguments for driver.session()."""
+    config = {"fetch_size": FETCH_SIZE}
+    if DATABASE:
+        config["database"] = DATABASE
+    return config
+
+def statement_summary(cypher: str, length: int = 120) -> str:
+    """A statement on one line, shortened, for span attributes."""
+    return " ".join(cypher.split())[:length]
+
+def _chunks(rows: List[Dict], size: int):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
 class GraphStorage:
-    def __init__(self):
+    name = "Neo4j"
+    supports_native_queries = False
+    # Ingest state and the reachability index are saved to disk for other processes
+    persistent = True
+
+    def __init__(self, batch_size: int = None, profile: bool = None, connect_retries: int = None):
         uri = os.getenv("NEO4J_URI", "bolt://localhost:7687")
         user = os.getenv("NEO4J_USER", "neo4j")
         password = os.getenv("NEO4J_PASSWORD", "password")
+        self.batch_size = batch_size or DEFAULT_BATCH_SIZE
+        self.connect_retries = connect_retries or CONNECT_RETRIES
+        self.uri = uri
+        # Identifies this graph in persisted ingest state and indexes
+        self.target = uri
+        # Labels whose id constraint has been ensured by this process
+        self._constrained_labels = set()
+        # Session opened by session() for the current thread, if any
+        self._local = threading.local()
+        # Set when every query runs under PROFILE (see graph.profile)
+        self.profiler = QueryProfiler() if (PROFILE_QUERIES if profile is None else profile) else None
         
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = GraphDatabase.driver(uri, auth=(user, password), **driver_config())
         self.verify_connection()
 
     def verify_connection(self):
-        """Waits for Neo4j to be ready."""
-        max_retries = 60
+        """Waits for Neo4j to be ready, retrying once a second."""
+        max_retries = self.connect_retries
         for i in range(max_retries):
             try:
                 self.driver.verify_connectivity()
@@ -22,65 +90,362 @@ class GraphStorage:
             except Exception as e:
                 print(f"Waiting for Neo4j... ({i+1}/{max_retries})")
                 time.sleep(1)
-        raise Exception("Could not connect to Neo4j after 60 seconds.")
+        raise Exception(f"Could not connect to Neo4j after {max_retries} seconds.")
 
     def close(self):
         self.driver.close()
 
+    @contextmanager
+    def session(self):
+        """
+        Pooled session for a group of calls: every query and write made on
+        this thread inside the block reuses it instead of borrowing a new one.
+        Nested blocks share the outermost session.
+
+            with storage.session():
+                node = storage.query(...)
+                owners = storage.query(...)
+        """
+        current = getattr(self._local, "session", None)
+        if current is not None:
+            yield current
+            return
+        with self.driver.session(**session_config()) as session:
+            self._local.session = session
+            try:
+                yield session
+            finally:
+                self._local.session = None
+
+    def read(self, work, *args):
+        """Runs work(tx, *args) in a managed read transaction (routable to followers, retried)."""
+        with self.session() as session:
+            return session.execute_read(work, *args)
+
+    def write(self, work, *args):
+        """Runs work(tx, *args) in a managed write transaction, retried on transient errors."""
+        with self.session() as session:
+            return session.execute_write(work, *args)
+
     def clear_graph(self):
         """Deletes all nodes and relationships."""
-        with self.driver.session() as session:
-            session.run("MATCH (n) DETACH DELETE n")
-            # Create constraints for performance/uniqueness
-            try:
-                session.run("CREATE CONSTRAINT FOR (n:Service) REQUIRE n.id IS UNIQUE")
-                session.run("CREATE CONSTRAINT FOR (n:Database) REQUIRE n.id IS UNIQUE")
-                session.run("CREATE CONSTRAINT FOR (n:Team) REQUIRE n.id IS UNIQUE")
-            except:
-                pass # Constraints might already exist
+        self.write(_run_query, "MATCH (n) DETACH DELETE n", {})
+        self.ensure_constraints([])
+
+    def ensure_constraints(self, labels: Iterable[str]):
+        """
+        Creates a unique id constraint (which is backed by an index) for
+        :Entity and for every label a connector emits. Schema changes can't
+        share a transaction with data writes, so this runs before them.
+        """
+        missing = [l for l in [ENTITY_LABEL, *labels] if l not in self._constrained_labels]
+        if not missing:
+            return
+        with self.session():
+            if ENTITY_LABEL in missing:
+                self._label_entities()
+            for label in missing:
+                constraint = f"{label.lower()}_id_unique"
+                try:
+                    self.write(_run_query, f"CREATE CONSTRAINT `{constraint}` IF NOT EXISTS "
+                                           f"FOR (n:`{label}`) REQUIRE n.id IS UNIQUE", {})
+                    self._constrained_labels.add(label)
+                except Exception as e:
+                    # e.g. existing duplicate ids; writes still work, just without the index
+                    print(f"Warning: Could not create constraint on :{label}(id): {e}")
+
+    def _label_entities(self):
+        """
+        Adds :Entity to the nodes of graphs written before the label existed.
+        Each batch_size rows are committed on their own, so a large graph isn't
+        relabelled in one transaction; CALL { ... } IN TRANSACTIONS only runs
+        in an auto-commit transaction, hence session.run.
+        """
+        with self.session() as session:
+            session.run(f"MATCH (n) WHERE n.id IS NOT NULL AND NOT n:{ENTITY_LABEL} "
+                        f"CALL {{ WITH n SET n:{ENTITY_LABEL} }} IN TRANSACTIONS OF {int(self.batch_size)} ROWS").consume()
 
     def upsert_node(self, node: dict):
         """
         Upserts a node using MERGE.
         node: { "id": "...", "type": "...", "name": "...", "properties": {...} }
         """
+        self.ensure_constraints([node['type']])
         query = f"""
-        MERGE (n:`{node['type']}` {{id: $id}})
+        MERGE (n:{ENTITY_LABEL} {{id: $id}})
+        SET n:`{node['type']}`
         SET n.name = $name
         SET n += $props
         """
-        with self.driver.session() as session:
-            session.run(query, id=node['id'], name=node['name'], props=node['properties'])
+        self.write(_run_query, query, {"id": node['id'], "name": node['name'], "props": node['properties']})
 
     def upsert_edge(self, edge: dict):
         """
         Upserts an edge using MERGE.
         edge: { "type": "...", "source": "...", "target": "...", ... }
         """
-        # We need to MATCH source and target first. 
-        # Since nodes might have different labels, we can match by ID (assuming constraint) 
-        # OR we just match generic node (n {id: $source}).
-        
-        # Note: In Neo4j, it's efficient to match by Label if possible, but our ID is unique.
+        # We need to MATCH source and target first.
+        # Nodes have different type labels, but all of them carry :Entity,
+        # whose unique id constraint turns these into index seeks.
         
         rel_type = edge['type'].upper()
         
         query = f"""
-        MATCH (s {{id: $source_id}})
-        MATCH (t {{id: $target_id}})
+        MATCH (s:{ENTITY_LABEL} {{id: $source_id}})
+        MATCH (t:{ENTITY_LABEL} {{id: $target_id}})
         MERGE (s)-[r:`{rel_type}`]->(t)
         SET r += $props
         """
-        with self.driver.session() as session:
-            session.run(query, 
-                        source_id=edge['source'], 
-                        target_id=edge['target'], 
-                        props=edge['properties'])
+        self.write(_run_query, query, {"source_id": edge['source'],
+                                       "target_id": edge['target'],
+                                       "props": edge['properties']})
+
+    def upsert_nodes(self, nodes: Iterable[dict], chunk_size: int = None) -> int:
+        """
+        Batch version of upsert_node.
+        Nodes are grouped by label (labels can't be parameterized in Cypher) and
+        each chunk is written with a single UNWIND statement in one transaction.
+        Returns the number of rows written.
+        """
+        chunk_size = chunk_size or self.batch_size
+        by_label = defaultdict(list)
+        for node in nodes:
+            by_label[node['type']].append({
+                "id": node['id'],
+                "name": node['name'],
+                "props": node['properties']
+            })
+
+        self.ensure_constraints(by_label)
+        written = 0
+        with self.session():
+            for label, rows in by_label.items():
+                query = f"""
+                UNWIND $rows AS row
+                MERGE (n:{ENTITY_LABEL} {{id: row.id}})
+                SET n:`{label}`
+                SET n.name = row.name
+                SET n += row.props
+                """
+                for chunk in _chunks(rows, chunk_size):
+                    self.write(_run_write, query, chunk)
+                    written += len(chunk)
+        return written
+
+    def upsert_edges(self, edges: Iterable[dict], chunk_size: int = None) -> int:
+        """
+        Batch version of upsert_edge.
+        Edges are grouped by relationship type and written chunk by chunk
+        with a single UNWIND statement per transaction.
+        Returns the number of rows submitted.
+        """
+        chunk_size = chunk_size or self.batch_size
+        by_type = defaultdict(list)
+        for edge in edges:
+            by_type[edge['type'].upper()].append({
+                "source_id": edge['source'],
+                "target_id": edge['target'],
+                "props": edge['properties']
+            })
+
+        written = 0
+        with self.session():
+            for rel_type, rows in by_type.items():
+                query = f"""
+                UNWIND $rows AS row
+                MATCH (s:{ENTITY_LABEL} {{id: row.source_id}})
+                MATCH (t:{ENTITY_LABEL} {{id: row.target_id}})
+                MERGE (s)-[r:`{rel_type}`]->(t)
+                SET r += row.props
+                """
+                for chunk in _chunks(rows, chunk_size):
+                    self.write(_run_write, query, chunk)
+                    written += len(chunk)
+        return written
+
+    def is_empty(self) -> bool:
+        return not self.query(f"MATCH (n:{ENTITY_LABEL}) RETURN n.id AS id LIMIT 1")
+
+    def apply_delta(self, delta) -> None:
+        """
+        Applies a graph.delta.GraphDelta in a single write transaction, so readers
+        see either the old graph or the new one, never a half-loaded graph.
+        Upserts replace properties (SET n = ...) so removed keys disappear too.
+        """
+        if delta.is_empty():
+            return
+        self.ensure_constraints({node['type'] for node in delta.upsert_nodes})
+        self.write(self._apply_delta_tx, delta)
+
+    def _apply_delta_tx(self, tx, delta):
+        size = self.batch_size
+
+        removed_by_type = defaultdict(list)
+        for edge in delta.remove_edges:
+            removed_by_type[edge['type'].upper()].append({"source_id": edge['source'], "target_id": edge['target']})
+        for rel_type, rows in removed_by_type.items():
+            query = f"""
+            UNWIND $rows AS row
+            MATCH (s:{ENTITY_LABEL} {{id: row.source_id}})-[r:`{rel_type}`]->(t:{ENTITY_LABEL} {{id: row.target_id}})
+            DELETE r
+            """
+            for chunk in _chunks(rows, size):
+                tx.run(query, rows=chunk).consume()
+
+        for chunk in _chunks(delta.remove_nodes, size):
+            tx.run(f"UNWIND $rows AS id MATCH (n:{ENTITY_LABEL} {{id: id}}) DETACH DELETE n", rows=chunk).consume()
+
+        nodes_by_label = defaultdict(list)
+        for node in delta.upsert_nodes:
+            nodes_by_label[node['type']].append({"id": node['id'], "name": node['name'], "props": node['properties']})
+        for label, rows in nodes_by_label.items():
+            query = f"""
+            UNWIND $rows AS row
+            MERGE (n:{ENTITY_LABEL} {{id: row.id}})
+            SET n:`{label}`
+            SET n = row.props
+            SET n.id = row.id, n.name = row.name
+            """
+            for chunk in _chunks(rows, size):
+                tx.run(query, rows=chunk).consume()
+
+        edges_by_type = defaultdict(list)
+        for edge in delta.upsert_edges:
+            edges_by_type[edge['type'].upper()].append(
+                {"source_id": edge['source'], "target_id": edge['target'], "props": edge['properties']})
+        for rel_type, rows in edges_by_type.items():
+            query = f"""
+            UNWIND $rows AS row
+            MATCH (s:{ENTITY_LABEL} {{id: row.source_id}})
+            MATCH (t:{ENTITY_LABEL} {{id: row.target_id}})
+            MERGE (s)-[r:`{rel_type}`]->(t)
+            SET r = row.props
+            """
+            for chunk in _chunks(rows, size):
+                tx.run(query, rows=chunk).consume()
+
+    def export_records(self):
+        """Every node and edge in connector format, e.g. for graph.snapshot."""
+        from .snapshot import edge_id
+        with self.session():
+            node_records = self.query(
+                f"MATCH (n:{ENTITY_LABEL}) "
+                f"RETURN n.id AS id, [l IN labels(n) WHERE l <> '{ENTITY_LABEL}'][0] AS type, properties(n) AS props")
+            edge_records = self.query(
+                f"MATCH (s:{ENTITY_LABEL})-[r]->(t:{ENTITY_LABEL}) "
+                f"RETURN s.id AS source, type(r) AS type, t.id AS target, properties(r) AS props")
+        nodes = [{"id": r['id'], "type": r['type'] or ENTITY_LABEL, "name": r['props'].get('name'),
+                  "properties": {k: v for k, v in r['props'].items() if k not in ("id", "name")}}
+                 for r in node_records]
+        edges = [{"id": edge_id(r['source'], r['type'], r['target']), "source": r['source'],
+                  "target": r['target'], "type": r['type'], "properties": r['props']}
+                 for r in edge_records]
+        return nodes, edges
 
     def query(self, cypher: str, params: dict = None):
-        """Executes a read query and returns list of records."""
+        """Executes a read query in a managed read transaction and returns list of records."""
         if params is None:
             params = {}
-        with self.driver.session() as session:
-            result = session.run(cypher, **params)
-            return [record.data() for record in result]
+        with span("storage.query", statement=statement_summary(cypher)) as s:
+            if self.profiler is None:
+                records = self.read(_run_query, cypher, params)
+            else:
+                records, profile = self.read(_run_profiled, cypher, params)
+                stats = plan_stats(profile)
+                self.profiler.record(current_method(), statement_summary(cypher), stats)
+                s.set(db_hits=stats["db_hits"], operators=stats["operators"])
+            s.set(rows=len(records))
+        return records
+
+    # --- Reads used by QueryEngine; MemoryGraphStorage answers the same calls natively ---
+
+    def get_node(self, node_id: str) -> Optional[Dict]:
+        records = self.query(NODE_BY_ID_CYPHER, {"id": node_id})
+        return records[0]['n'] if records else None
+
+    def get_nodes_by_ids(self, node_ids: List[str]) -> List[Dict]:
+        """The nodes that exist among node_ids, ordered by id."""
+        if not node_ids:
+            return []
+        return [r['n'] for r in self.query(NODES_BY_IDS_CYPHER, {"ids": list(node_ids)})]
+
+    def get_nodes(self, node_type: str = None, limit: int = 100) -> List[Dict]:
+        cypher = LABEL_NODES_CYPHER.format(label=label_for(node_type)) if node_type else ALL_NODES_CYPHER
+        return [r['n'] for r in self.query(cypher, {"limit": limit})]
+
+    def get_owner(self, node_id: str) -> List[Dict]:
+        return [r['t'] for r in self.query(OWNER_CYPHER, {"id": node_id})]
+
+    def impact_reach(self, node_id: str, direction: str) -> List[Dict]:
+        """Every node reachable over DEPENDS_ON/CALLS: dependents ("down") or dependencies ("up")."""
+        if direction == "down":
+            return [r['dependent'] for r in self.query(DOWNSTREAM_CYPHER, {"id": node_id})]
+        return [r['dependency'] for r in self.query(UPSTREAM_CYPHER, {"id": node_id})]
+
+    def impact_neighbours(self, node_ids: List[str], direction: str) -> List[str]:
+        """Ids one DEPENDS_ON/CALLS hop from any of node_ids: dependents ("down") or dependencies ("up")."""
+        cypher = DOWNSTREAM_HOP_CYPHER if direction == "down" else UPSTREAM_HOP_CYPHER
+        return [r['id'] for r in self.query(cypher, {"ids": list(node_ids)})]
+
+    def impact_pairs(self) -> List[Tuple[str, str]]:
+        """All (source, target) DEPENDS_ON/CALLS pairs."""
+        return [(r['source'], r['target']) for r in self.query(IMPACT_PAIRS_CYPHER)]
+
+    def ownership(self) -> Dict[str, List[str]]:
+        """Node id -> ids of the teams it is OWNED_BY."""
+        return {r['id']: r['teams'] for r in self.query(OWNERSHIP_CYPHER)}
+
+    def impact_subgraph(self, node_ids: Iterable[str]) -> Dict:
+        """DEPENDS_ON/CALLS pairs among node_ids, sorted, and the teams owning each of them."""
+        ids = sorted(set(node_ids))
+        with self.session():
+            edges = sorted((r['source'], r['target']) for r in self.query(SUBGRAPH_EDGES_CYPHER, {"ids": ids}))
+            owners = {r['id']: r['teams'] for r in self.query(SUBGRAPH_OWNERSHIP_CYPHER, {"ids": ids})}
+        return {"edges": edges, "owners": owners}
+
+    def shortest_path(self, from_id: str, to_id: str) -> List:
+        """The serialized Path: [node, "REL_TYPE", node, ...], or [] if there is none."""
+        records = self.query(SHORTEST_PATH_CYPHER, {"from_id": from_id, "to_id": to_id})
+        return records[0]['p'] if records else []
+
+
+def create_storage(batch_size: int = None):
+    """
+    Returns the storage backend selected by GRAPH_BACKEND ("neo4j" or "memory").
+    With GRAPH_FALLBACK=memory, a Neo4j connection failure falls back to the
+    in-memory backend instead of raising.
+    """
+    backend = os.getenv("GRAPH_BACKEND", "neo4j").lower()
+    if backend == "memory":
+        if PROFILE_QUERIES:
+            raise TypeError("NEO4J_PROFILE profiles Cypher statements, which the in-memory backend "
+                            "(GRAPH_BACKEND=memory) doesn't run; unset one of them.")
+        from .memory import MemoryGraphStorage
+        return MemoryGraphStorage(batch_size=batch_size)
+
+    try:
+        return GraphStorage(batch_size=batch_size)
+    except Exception as e:
+        if os.getenv("GRAPH_FALLBACK", "").lower() != "memory":
+            raise
+        print(f"Neo4j unavailable ({e}). Falling back to in-memory graph.")
+        from .memory import MemoryGraphStorage
+        return MemoryGraphStorage(batch_size=batch_size)
+
+def _run_write(tx, query: str, rows: List[Dict]):
+    """Transaction function used by the batch upserts."""
+    tx.run(query, rows=rows).consume()
+
+def _run_query(tx, query: str, params: Dict) -> List[Dict]:
+    """
+    Transaction function for a single statement. Records are materialized
+    inside the transaction, since a managed transaction may be retried and
+    its result is gone once it commits.
+    """
+    return [record.data() for record in tx.run(query, **params)]
+
+def _run_profiled(tx, query: str, params: Dict) -> Tuple[List[Dict], Dict]:
+    """_run_query under PROFILE; also returns the executed plan with its db hits."""
+    result = tx.run(f"PROFILE {query}", **params)
+    records = [record.data() for record in result]
+    return records, result.consume().profile
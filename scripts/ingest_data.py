@@ -1,51 +1,393 @@
-from neo4j import GraphDatabase
+import argparse
 import sys
 import os
+import threading
+import time
 
 # Add project root to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from connectors.docker_compose import DockerComposeConnector
-from connectors.teams import TeamsConnector
-from connectors.kubernetes import KubernetesConnector
-from graph.storage import GraphStorage
+from connectors.runner import (default_connectors, run_connectors, stream_connectors, use_pool, merge_results,
+                               print_timings)
+from graph.storage import create_storage, DEFAULT_BATCH_SIZE
+from graph.delta import (IngestState, fingerprint_files, merge_records, diff_graphs, load_state, save_state,
+                         discard_state)
+from graph.cache import bump_graph_version
+from graph.reachability import ReachabilityIndex, impact_edges, load_index, save_index, discard_index
+from graph.snapshot import GraphSnapshot, DEFAULT_SNAPSHOT_PATH, export_snapshot
 
-def ingest():
+def _rate(count: int, seconds: float) -> str:
+    if seconds <= 0:
+        return "n/a"
+    return f"{count / seconds:,.0f} rows/s"
+
+def connector_key(connector) -> str:
+    return f"{connector.__class__.__name__}:{','.join(connector.patterns())}"
+
+def sources_fingerprint(connectors) -> str:
+    """Fingerprint of every connector's source files; a snapshot taken under another one is stale."""
+    return "|".join(f"{connector_key(c)}={fingerprint_files(c.source_files())}" for c in connectors)
+
+class IngestCancelled(Exception):
+    """Raised from a progress callback to stop ingest() at the next stage boundary."""
+
+def _report(progress, stage: str, fraction: float):
+    if progress is not None:
+        progress(stage, fraction)
+
+def ingest(storage=None, batch_size: int = None, incremental: bool = False, state_path: str = None,
+           connectors=None, workers: int = None, snapshot_path: str = None, changed=None, progress=None):
+    """
+    Loads every connector into the graph.
+    If no storage is given, one is created from the environment and closed afterwards.
+    Connectors default to connectors.runner.default_connectors(); their files are
+    parsed in parallel by `workers` processes.
+
+    Full mode clears the graph and rewrites everything. Incremental mode only
+    re-runs connectors whose source changed and applies the resulting diff.
+    Both modes record the ingested state so the next incremental run can diff against it.
+    `changed` limits an incremental run to those connectors, when the caller
+    knows the others' files are untouched (see watch).
+    With snapshot_path, the resulting graph is also written there (see warm_start).
+
+    progress(stage, fraction) is called between stages. It may raise
+    IngestCancelled to stop the run there: before the graph is written nothing
+    has changed; later, the writes so far stay, but the ingest state and the
+    reachability index were discarded before the first write, so the next
+    incremental run re-applies every source and blast_radius traverses the
+    graph until then.
+    """
     print("Starting Ingestion...")
-    storage = GraphStorage()
-    
-    # Optional: Clear graph to avoid stale data during dev
-    print("Clearing existing graph...")
-    storage.clear_graph()
-    
-    base_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data'))
-    
-    connectors = [
-        DockerComposeConnector(os.path.join(base_path, 'docker-compose.yml')),
-        TeamsConnector(os.path.join(base_path, 'teams.yaml')),
-        KubernetesConnector(os.path.join(base_path, 'k8s-deployments.yaml'))
-    ]
-    
-    for c in connectors:
-        print(f"Running {c.__class__.__name__}...")
-        nodes, edges = c.load()
-        
-        print(f"  Upserting {len(nodes)} nodes...")
-        for n in nodes:
-            storage.upsert_node(n)
-            
-        print(f"  Upserting {len(edges)} edges...")
-        for e in edges:
-            storage.upsert_edge(e)
-            
-    storage.close()
+    owns_storage = storage is None
+    if owns_storage:
+        storage = create_storage(batch_size=batch_size)
+
+    if connectors is None:
+        connectors = default_connectors()
+
+    try:
+        try:
+            if incremental:
+                _ingest_incremental(storage, connectors, workers, state_path, changed, progress)
+            else:
+                _ingest_full(storage, connectors, workers, state_path, progress)
+        except IngestCancelled:
+            # Results cached while the graph was being written must not outlive it
+            bump_graph_version()
+            raise
+        if snapshot_path:
+            _report(progress, "Writing snapshot", 0.95)
+            start = time.perf_counter()
+            meta = export_snapshot(storage, snapshot_path, sources_fingerprint(connectors))
+            print(f"  Wrote snapshot of {meta['node_count']} nodes and {meta['edge_count']} edges "
+                  f"in {time.perf_counter() - start:.2f}s")
+    finally:
+        if owns_storage:
+            storage.close()
+    _report(progress, "Done", 1.0)
     print("Ingestion Complete.")
 
+def _discard_derived(storage, state_path: str = None):
+    """Called before the first graph write: until the run saves new ones, the old state and index are wrong."""
+    discard_state(storage, state_path)
+    discard_index(storage)
+
+def _ingest_full(storage, connectors, workers: int = None, state_path: str = None, progress=None):
+    state = IngestState(target=storage.target)
+    fingerprints = [fingerprint_files(c.source_files()) for c in connectors]
+
+    if use_pool(connectors, workers):
+        # Parsed before the graph is cleared, so it stays queryable (and a cancel is free) meanwhile
+        _report(progress, "Parsing sources", 0.05)
+        start = time.perf_counter()
+        results = run_connectors(connectors, workers)
+        print(f"Parsed sources in {time.perf_counter() - start:.2f}s")
+        print_timings(results)
+
+        # All nodes go in before any edge, so cross-connector edges find both endpoints
+        nodes, edges = merge_results(results)
+
+        _report(progress, "Writing nodes", 0.4)
+        _discard_derived(storage, state_path)
+        # Optional: Clear graph to avoid stale data during dev
+        print("Clearing existing graph...")
+        storage.clear_graph()
+
+        start = time.perf_counter()
+        storage.upsert_nodes(nodes)
+        node_secs = time.perf_counter() - start
+        print(f"  Upserted {len(nodes)} nodes in {node_secs:.2f}s ({_rate(len(nodes), node_secs)})")
+    else:
+        # Parsed here anyway, so nodes are written chunk by chunk as connector.stream
+        # yields them instead of after every file is parsed
+        _report(progress, "Writing nodes", 0.05)
+        _discard_derived(storage, state_path)
+        print("Clearing existing graph...")
+        storage.clear_graph()
+
+        start = time.perf_counter()
+        results = stream_connectors(connectors, storage.upsert_nodes, storage.batch_size or DEFAULT_BATCH_SIZE)
+        nodes, edges = merge_results(results)
+        node_secs = time.perf_counter() - start
+        print_timings(results)
+        print(f"  Parsed and upserted {len(nodes)} nodes in {node_secs:.2f}s ({_rate(len(nodes), node_secs)})")
+
+    _report(progress, "Writing edges", 0.6)
+    start = time.perf_counter()
+    storage.upsert_edges(edges)
+    edge_secs = time.perf_counter() - start
+    print(f"  Upserted {len(edges)} edges in {edge_secs:.2f}s ({_rate(len(edges), edge_secs)})")
+
+    _report(progress, "Indexing", 0.8)
+    start = time.perf_counter()
+    index = ReachabilityIndex.build(impact_edges((n['id'] for n in nodes), edges), storage.target)
+    save_index(storage, index)
+    print(f"  Built reachability index for {len(index.ids)} nodes in {time.perf_counter() - start:.2f}s")
+    bump_graph_version()
+
+    for result, fingerprint in zip(results, fingerprints):
+        state.connectors[connector_key(result.connector)] = {
+            "fingerprint": fingerprint, "nodes": result.nodes, "edges": result.edges}
+
+    save_state(storage, state, state_path)
+
+def _ingest_incremental(storage, connectors, workers: int = None, state_path: str = None, changed=None,
+                        progress=None):
+    _report(progress, "Checking sources", 0.05)
+    previous = load_state(storage, state_path)
+    # A state recorded against another database, or a graph that was wiped
+    # since, can't be diffed against: start from nothing.
+    if previous.target != storage.target or storage.is_empty():
+        print("No usable previous ingest state, computing full delta.")
+        previous = IngestState()
+
+    state = IngestState(target=storage.target)
+    stale = []
+
+    for c in connectors:
+        key = connector_key(c)
+        entry = previous.connectors.get(key)
+        if entry and changed is not None and c not in changed:
+            # Known untouched: don't even hash its files
+            state.connectors[key] = entry
+            continue
+        fingerprint = fingerprint_files(c.source_files())
+        if entry and entry['fingerprint'] == fingerprint:
+            print(f"{c.__class__.__name__}: unchanged, skipping.")
+            state.connectors[key] = entry
+        else:
+            # Placeholder keeps connector order stable in the state
+            state.connectors[key] = {"fingerprint": fingerprint, "nodes": [], "edges": []}
+            stale.append(c)
+
+    if stale:
+        _report(progress, f"Parsing {', '.join(c.__class__.__name__ for c in stale)}", 0.1)
+        results = run_connectors(stale, workers)
+        print_timings(results)
+        for result in results:
+            entry = state.connectors[connector_key(result.connector)]
+            entry['nodes'], entry['edges'] = result.nodes, result.edges
+
+    if not stale and set(state.connectors) == set(previous.connectors):
+        print("No source changes detected.")
+        return
+
+    _report(progress, "Computing changes", 0.5)
+    old_nodes, old_edges = merge_records(previous.outputs())
+    new_nodes, new_edges = merge_records(state.outputs())
+    delta = diff_graphs(old_nodes, old_edges, new_nodes, new_edges)
+    print(f"Delta: {delta.summary()}")
+
+    _report(progress, "Applying changes", 0.6)
+    # The index is updated in place from the one loaded here
+    index = load_index(storage) if previous.connectors else None
+    _discard_derived(storage, state_path)
+    start = time.perf_counter()
+    storage.apply_delta(delta)
+    print(f"  Applied delta in {time.perf_counter() - start:.2f}s")
+
+    _report(progress, "Indexing", 0.8)
+    start = time.perf_counter()
+    if index is None:
+        index = ReachabilityIndex.build(impact_edges(new_nodes, new_edges.values()), storage.target)
+    else:
+        index.apply_delta(delta, known_ids=new_nodes)
+    save_index(storage, index)
+    print(f"  Updated reachability index in {time.perf_counter() - start:.2f}s")
+    if not delta.is_empty():
+        bump_graph_version()
+
+    save_state(storage, state, state_path)
+
+# Ingest state entry holding a graph loaded wholesale (see record_loaded_graph)
+LOADED_STATE_KEY = "snapshot"
+
+def record_loaded_graph(storage, nodes, edges, state_path: str = None):
+    """
+    Brings everything derived from the graph in line after it was loaded
+    wholesale, e.g. from a snapshot: rebuilds and saves the reachability
+    index, records the loaded nodes and edges as the ingest state (under one
+    entry that no connector owns, so the next incremental run re-parses every
+    source and diffs against what the graph really holds) and bumps the graph
+    version so cached results are dropped.
+    """
+    index = ReachabilityIndex.build(impact_edges((n['id'] for n in nodes), edges), storage.target)
+    save_index(storage, index)
+    state = IngestState(target=storage.target)
+    state.connectors[LOADED_STATE_KEY] = {"fingerprint": None, "nodes": nodes, "edges": edges}
+    save_state(storage, state, state_path)
+    bump_graph_version()
+
+def warm_start(storage, snapshot_path: str = None, connectors=None, state_path: str = None) -> bool:
+    """
+    Fills an empty graph from a snapshot instead of parsing the YAML sources,
+    if the snapshot was taken from the current sources. Returns whether it did.
+    """
+    if connectors is None:
+        connectors = default_connectors()
+    meta = GraphSnapshot.read_meta(snapshot_path)
+    if meta is None or meta.get("sources") != sources_fingerprint(connectors):
+        return False
+    if not storage.is_empty():
+        return False
+
+    start = time.perf_counter()
+    with GraphSnapshot.open(snapshot_path) as snapshot:
+        nodes, edges = snapshot.load_into(storage)
+    record_loaded_graph(storage, nodes, edges, state_path)
+    print(f"Loaded {len(nodes)} nodes and {len(edges)} edges from snapshot in {time.perf_counter() - start:.2f}s")
+    return True
+
+class IngestJob:
+    """
+    Runs ingest() on a background thread so a UI stays responsive. Poll
+    `status` ("running", "done", "cancelled", "failed"), `stage` and
+    `fraction`; cancel() stops it at the next stage boundary (see ingest).
+    With warm=True an empty graph is first filled from the snapshot if it is
+    current (see warm_start), and only parsed otherwise.
+    """
+
+    def __init__(self, storage, warm: bool = False, **kwargs):
+        self.storage = storage
+        self.warm = warm
+        self.kwargs = kwargs
+        self.status = "pending"
+        self.stage = "Queued"
+        self.fraction = 0.0
+        self.error = None
+        self.seconds = None
+        self._cancel = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self.status == "running"
+
+    def start(self) -> "IngestJob":
+        self.status = "running"
+        self._thread = threading.Thread(target=self._run, name="ingest", daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    def wait(self, timeout: float = None) -> str:
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.status
+
+    def _progress(self, stage: str, fraction: float):
+        if self._cancel.is_set():
+            raise IngestCancelled()
+        self.stage, self.fraction = stage, fraction
+
+    def _run(self):
+        start = time.perf_counter()
+        try:
+            snapshot_path = self.kwargs.get("snapshot_path")
+            loaded = False
+            if self.warm and snapshot_path:
+                self._progress("Loading snapshot", 0.05)
+                loaded = warm_start(self.storage, snapshot_path, self.kwargs.get("connectors"),
+                                    self.kwargs.get("state_path"))
+            if loaded:
+                self._progress("Loaded from snapshot", 1.0)
+            else:
+                ingest(self.storage, progress=self._progress, **self.kwargs)
+            self.status = "done"
+        except IngestCancelled:
+            self.status = "cancelled"
+            print("Ingestion cancelled.")
+        except Exception as e:
+            self.error = e
+            self.status = "failed"
+            print(f"Ingestion failed: {e}")
+        finally:
+            self.seconds = time.perf_counter() - start
+
+def watch(storage=None, batch_size: int = None, connectors=None, workers: int = None, state_path: str = None,
+          snapshot_path: str = None, debounce: float = None):
+    """
+    Keeps the graph in sync with the sources: brings it up to date once, then
+    on every (debounced) change re-runs only the connectors owning the changed
+    files and applies their delta. Blocks until interrupted.
+    """
+    # watchdog is only needed here
+    from connectors.watcher import SourceWatcher
+
+    owns_storage = storage is None
+    if owns_storage:
+        storage = create_storage(batch_size=batch_size)
+    if connectors is None:
+        connectors = default_connectors()
+
+    def on_change(changed):
+        print(f"Change detected in {', '.join(c.__class__.__name__ for c in changed)}.")
+        ingest(storage, incremental=True, connectors=connectors, workers=workers, state_path=state_path,
+               snapshot_path=snapshot_path, changed=changed)
+
+    try:
+        ingest(storage, incremental=True, connectors=connectors, workers=workers, state_path=state_path,
+               snapshot_path=snapshot_path)
+        with SourceWatcher(connectors, on_change, debounce) as watcher:
+            print(f"Watching {', '.join(sorted(watcher.roots()))} for changes (Ctrl+C to stop)...")
+            while True:
+                time.sleep(1)
+    except KeyboardInterrupt:
+        print("Stopped watching.")
+    finally:
+        if owns_storage:
+            storage.close()
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest configuration files into the graph.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only apply the changes since the last ingestion instead of rebuilding the graph.")
+    parser.add_argument("--batch-size", type=int, default=None,
+                        help="Rows per UNWIND transaction (default: NEO4J_BATCH_SIZE or 1000).")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Parser processes (default: INGEST_WORKERS or CPU count, 1 disables the pool).")
+    parser.add_argument("--compose", nargs="+", help="docker-compose files, directories or globs.")
+    parser.add_argument("--teams", nargs="+", help="teams.yaml files, directories or globs.")
+    parser.add_argument("--k8s", nargs="+", help="Kubernetes manifests, directories or globs.")
+    parser.add_argument("--snapshot", nargs="?", const=DEFAULT_SNAPSHOT_PATH, default=None,
+                        help=f"Also write a graph snapshot for fast cold starts (default path: {DEFAULT_SNAPSHOT_PATH}).")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep running and re-ingest incrementally whenever a source file changes.")
+    parser.add_argument("--debounce", type=float, default=None,
+                        help="Seconds without changes before re-ingesting in watch mode (default: WATCH_DEBOUNCE_SECONDS or 1).")
+    args = parser.parse_args()
+
     try:
-        ingest()
+        if args.watch:
+            watch(batch_size=args.batch_size, workers=args.workers, debounce=args.debounce,
+                  connectors=default_connectors(args.compose, args.teams, args.k8s), snapshot_path=args.snapshot)
+        else:
+            ingest(batch_size=args.batch_size, incremental=args.incremental, workers=args.workers,
+                   connectors=default_connectors(args.compose, args.teams, args.k8s), snapshot_path=args.snapshot)
     except Exception as e:
         print(f"Ingestion failed: {e}")
-        # Don't exit with error if it's just connection issues during build, 
+        # Don't exit with error if it's just connection issues during build,
         # but for now we want to see it fail.
         sys.exit(1)
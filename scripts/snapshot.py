@@ -0,0 +1,87 @@
+import argparse
+import sys
+import os
+import time
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from connectors.runner import default_connectors, run_connectors, merge_results
+from graph.storage import create_storage
+from graph.snapshot import DEFAULT_SNAPSHOT_PATH, GraphSnapshot, write_snapshot, export_snapshot
+from scripts.ingest_data import sources_fingerprint, warm_start, record_loaded_graph
+
+def export_command(args):
+    connectors = default_connectors(args.compose, args.teams, args.k8s)
+    start = time.perf_counter()
+    if args.source == "connectors":
+        nodes, edges = merge_results(run_connectors(connectors, args.workers))
+        meta = write_snapshot(args.path, nodes, edges, sources=sources_fingerprint(connectors))
+    else:
+        storage = create_storage()
+        try:
+            meta = export_snapshot(storage, args.path, sources_fingerprint(connectors))
+        finally:
+            storage.close()
+    print(f"Wrote {meta['node_count']} nodes and {meta['edge_count']} edges to {args.path} "
+          f"({os.path.getsize(args.path):,} bytes) in {time.perf_counter() - start:.2f}s")
+
+def import_command(args):
+    storage = create_storage()
+    try:
+        if args.replace:
+            storage.clear_graph()
+        if args.force:
+            # Skip the staleness check: load whatever the snapshot holds
+            with GraphSnapshot.open(args.path) as snapshot:
+                nodes, edges = snapshot.load_into(storage)
+            record_loaded_graph(storage, nodes, edges)
+            print(f"Loaded {len(nodes)} nodes and {len(edges)} edges.")
+        elif not warm_start(storage, args.path, default_connectors(args.compose, args.teams, args.k8s)):
+            print("Snapshot is missing, stale or the graph is not empty; nothing loaded "
+                  "(use --replace to clear the graph, --force to skip the source check).")
+            sys.exit(1)
+    finally:
+        storage.close()
+
+def info_command(args):
+    start = time.perf_counter()
+    with GraphSnapshot.open(args.path) as snapshot:
+        opened = time.perf_counter() - start
+        meta = snapshot.meta
+        print(f"{args.path}: {meta['node_count']} nodes, {meta['edge_count']} edges")
+        print(f"  Labels: {', '.join(meta['labels'])}")
+        print(f"  Relationships: {', '.join(meta['rel_types'])}")
+        print(f"  Taken from: {meta['target'] or 'connectors'}")
+        start = time.perf_counter()
+        snapshot.nodes()
+        snapshot.edges()
+        print(f"  Opened in {opened * 1000:.2f} ms, decoded in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Export and import compact graph snapshots.")
+    parser.add_argument("--path", default=DEFAULT_SNAPSHOT_PATH, help="Snapshot file.")
+    parser.add_argument("--compose", nargs="+", help="docker-compose files, directories or globs.")
+    parser.add_argument("--teams", nargs="+", help="teams.yaml files, directories or globs.")
+    parser.add_argument("--k8s", nargs="+", help="Kubernetes manifests, directories or globs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="Write a snapshot.")
+    export_parser.add_argument("--from", dest="source", choices=["connectors", "graph"], default="connectors",
+                               help="Parse the sources, or read the graph selected by GRAPH_BACKEND.")
+    export_parser.add_argument("--workers", type=int, default=None, help="Parser processes.")
+    export_parser.set_defaults(func=export_command)
+
+    import_parser = commands.add_parser("import", help="Seed the graph selected by GRAPH_BACKEND from a snapshot.")
+    import_parser.add_argument("--replace", action="store_true", help="Clear the graph first.")
+    import_parser.add_argument("--force", action="store_true", help="Load even if the sources changed since.")
+    import_parser.set_defaults(func=import_command)
+
+    info_parser = commands.add_parser("info", help="Describe a snapshot.")
+    info_parser.set_defaults(func=info_command)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import argparse
+import json
+import os
+import sys
+from collections import defaultdict
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+def percentile(samples, q: float) -> float:
+    """Nearest-rank percentile of sorted samples."""
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage latency percentiles from exported spans (JSON lines).")
+    parser.add_argument("paths", nargs="+", help="Span files written via TRACE_PATH or the UI export.")
+    parser.add_argument("--stage", action="append", help="Only these span names (repeatable).")
+    args = parser.parse_args()
+
+    durations = defaultdict(list)
+    for path in args.paths:
+        with open(path, 'r') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if args.stage and record["name"] not in args.stage:
+                    continue
+                if record.get("duration_ms") is not None:
+                    durations[record["name"]].append(record["duration_ms"])
+
+    print(f"{'stage':<28} {'count':>7} {'p50 ms':>10} {'p99 ms':>10} {'max ms':>10}")
+    for name in sorted(durations):
+        samples = sorted(durations[name])
+        print(f"{name:<28} {len(samples):>7} {percentile(samples, 0.5):>10.1f} "
+              f"{percentile(samples, 0.99):>10.1f} {samples[-1]:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -1,48 +1,43 @@
+import argparse
 import sys
 import os
+import time
 
 # Add project root to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from connectors.docker_compose import DockerComposeConnector
-from connectors.teams import TeamsConnector
-from connectors.kubernetes import KubernetesConnector
+from connectors.runner import default_connectors, run_connectors, merge_results, print_timings
 
 def main():
+    parser = argparse.ArgumentParser(description="Run the connectors without writing to the graph.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Parser processes (default: INGEST_WORKERS or CPU count, 1 disables the pool).")
+    parser.add_argument("--compose", nargs="+", help="docker-compose files, directories or globs.")
+    parser.add_argument("--teams", nargs="+", help="teams.yaml files, directories or globs.")
+    parser.add_argument("--k8s", nargs="+", help="Kubernetes manifests, directories or globs.")
+    args = parser.parse_args()
+
     print("Validating Connectors...")
-    
-    base_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data'))
-    
-    connectors = [
-        DockerComposeConnector(os.path.join(base_path, 'docker-compose.yml')),
-        TeamsConnector(os.path.join(base_path, 'teams.yaml')),
-        KubernetesConnector(os.path.join(base_path, 'k8s-deployments.yaml'))
-    ]
-    
-    total_nodes = 0
-    total_edges = 0
-    
-    all_nodes = []
-    all_edges = []
-
-    for c in connectors:
-        print(f"Running {c.__class__.__name__}...")
-        nodes, edges = c.load()
-        print(f"  -> Found {len(nodes)} nodes and {len(edges)} edges.")
-        total_nodes += len(nodes)
-        total_edges += len(edges)
-        all_nodes.extend(nodes)
-        all_edges.extend(edges)
+
+    connectors = default_connectors(args.compose, args.teams, args.k8s)
+
+    start = time.perf_counter()
+    results = run_connectors(connectors, args.workers)
+    elapsed = time.perf_counter() - start
+    print_timings(results)
+
+    all_nodes, all_edges = merge_results(results)
 
     print("-" * 30)
-    print(f"Total Nodes: {total_nodes}")
-    print(f"Total Edges: {total_edges}")
-    
+    print(f"Total Nodes: {len(all_nodes)}")
+    print(f"Total Edges: {len(all_edges)}")
+    print(f"Parsed in {elapsed:.2f}s")
+
     # Print sample to verify
     if all_nodes:
-        print(f"\nSample Node: {all_nodes[0]}")
+        print(f"\nSample Node: {dict(all_nodes[0])}")
     if all_edges:
-        print(f"Sample Edge: {all_edges[0]}")
+        print(f"Sample Edge: {dict(all_edges[0])}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,190 @@
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Finished spans are also appended here as JSON lines, one per span (any process)
+TRACE_PATH = os.getenv("TRACE_PATH")
+# Finished spans kept in memory for the UI and export_jsonl
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "10000"))
+
+_current: contextvars.ContextVar = contextvars.ContextVar("ekg_span", default=None)
+_lock = threading.Lock()
+_finished: deque = deque(maxlen=TRACE_BUFFER_SIZE)
+
+class Span:
+    """
+    One timed stage of a request. Spans started while another is active on
+    the same thread (or asyncio task) become its children and share its trace id.
+
+        with span("storage.query") as s:
+            records = ...
+            s.set(rows=len(records))
+    """
+
+    def __init__(self, name: str, **attributes):
+        self.name = name
+        self.attributes: Dict[str, Any] = attributes
+        self.trace_id: Optional[str] = None
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id: Optional[str] = None
+        self.parent: Optional["Span"] = None
+        self.start_time = 0.0
+        self.duration_ms: Optional[float] = None
+        self._start = 0.0
+        self._token = None
+
+    def set(self, **attributes) -> "Span":
+        self.attributes.update(attributes)
+        return self
+
+    def start(self, activate: bool = True) -> "Span":
+        """Starts timing. With activate, spans started until end() are its children."""
+        parent = _current.get()
+        if parent is not None:
+            self.trace_id, self.parent_id, self.parent = parent.trace_id, parent.span_id, parent
+        else:
+            self.trace_id = uuid.uuid4().hex
+        if activate:
+            self._token = _current.set(self)
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        return self
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._start) * 1000
+
+    def end(self, error: BaseException = None):
+        if self.duration_ms is not None:
+            return
+        self.duration_ms = self.elapsed_ms()
+        if error is not None:
+            self.attributes["error"] = f"{type(error).__name__}: {error}"
+        if self._token is not None:
+            _current.reset(self._token)
+            self._token = None
+        _record(self)
+
+    def __enter__(self) -> "Span":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end(exc)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start_time,
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+        }
+
+def span(name: str, **attributes) -> Span:
+    return Span(name, **attributes)
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+def enclosing_span(prefix: str) -> Optional[Span]:
+    """The innermost active span whose name starts with prefix."""
+    current = _current.get()
+    while current is not None and not current.name.startswith(prefix):
+        current = current.parent
+    return current
+
+def record_span(name: str, duration_ms: float, **attributes) -> Span:
+    """Records a stage timed elsewhere (e.g. in a worker process) as a child of the current span."""
+    recorded = Span(name, **attributes).start(activate=False)
+    recorded.start_time -= duration_ms / 1000
+    recorded.duration_ms = duration_ms
+    _record(recorded)
+    return recorded
+
+def _record(finished: Span):
+    data = finished.to_dict()
+    with _lock:
+        _finished.append(data)
+        if TRACE_PATH:
+            with open(TRACE_PATH, 'a') as f:
+                f.write(json.dumps(data, default=str) + "\n")
+
+def row_count(result: Any) -> int:
+    """Rows in a result: list length, 0 for None, 1 otherwise."""
+    if result is None:
+        return 0
+    if isinstance(result, list):
+        return len(result)
+    return 1
+
+def traced(name: str, rows: Callable[[Any], int] = row_count):
+    """
+    Decorator running a function (or coroutine function) in a span that
+    records rows(result) as its row count.
+    """
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(name) as s:
+                    result = await fn(*args, **kwargs)
+                    s.set(rows=rows(result))
+                    return result
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name) as s:
+                result = fn(*args, **kwargs)
+                s.set(rows=rows(result))
+                return result
+        return wrapper
+    return decorator
+
+def finished_spans(trace_id: str = None) -> List[Dict[str, Any]]:
+    """Buffered finished spans, oldest first, optionally of one trace only."""
+    with _lock:
+        spans = list(_finished)
+    if trace_id is not None:
+        spans = [s for s in spans if s["trace_id"] == trace_id]
+    return spans
+
+def to_jsonl(spans: Iterable[Dict[str, Any]] = None) -> str:
+    return "".join(json.dumps(s, default=str) + "\n" for s in (finished_spans() if spans is None else spans))
+
+def export_jsonl(path: str, spans: Iterable[Dict[str, Any]] = None) -> int:
+    """Writes spans (default: the whole buffer) to path as JSON lines. Returns how many."""
+    spans = finished_spans() if spans is None else list(spans)
+    with open(path, 'w') as f:
+        f.write(to_jsonl(spans))
+    return len(spans)
+
+def breakdown(spans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Per-stage totals of one trace: name, nesting depth, calls, total ms, and
+    summed rows and tokens where recorded. Stages keep first-start order;
+    a stage's time includes its children's.
+    """
+    depth_of: Dict[str, int] = {}
+    stages: Dict[str, Dict[str, Any]] = {}
+    for s in sorted(spans, key=lambda s: s["start"]):
+        # A parent that started later (see record_span) or fell out of the buffer still nests its children
+        depth = depth_of.get(s["parent_id"], 0) + 1 if s["parent_id"] else 0
+        depth_of[s["span_id"]] = depth
+        stage = stages.setdefault(s["name"], {"stage": s["name"], "depth": depth, "calls": 0, "ms": 0.0,
+                                              "rows": None, "tokens": None})
+        stage["calls"] += 1
+        stage["ms"] += s["duration_ms"] or 0.0
+        for key in ("rows", "tokens"):
+            value = s["attributes"].get(key)
+            if value is not None:
+                stage[key] = (stage[key] or 0) + value
+    return list(stages.values())
@@ -0,0 +1,33 @@
+"""Small compose and teams sources shared by the ingest and query tests."""
+from connectors.docker_compose import DockerComposeConnector
+from connectors.teams import TeamsConnector
+
+COMPOSE = """
+services:
+  web:
+    build: ./web
+    depends_on:
+      - api
+  api:
+    build: ./api
+    environment:
+      - DATABASE_URL=postgresql://postgres:secret@db:5432/app
+  db:
+    image: postgres:15
+"""
+
+TEAMS = """
+teams:
+  - name: app-team
+    lead: "@erin"
+    owns:
+      - web
+      - api
+      - db
+"""
+
+def sources(tmp_path, compose: str = COMPOSE):
+    (tmp_path / "docker-compose.yml").write_text(compose)
+    (tmp_path / "teams.yaml").write_text(TEAMS)
+    return [DockerComposeConnector(str(tmp_path / "docker-compose.yml")),
+            TeamsConnector(str(tmp_path / "teams.yaml"))]
@@ -0,0 +1,43 @@
+from graph.cache import QueryCache, bump_graph_version, graph_version
+from graph.memory import MemoryGraphStorage
+from graph.query import QueryEngine
+from scripts.ingest_data import ingest
+
+from sources import COMPOSE, sources
+
+def test_least_recently_used_entry_is_evicted():
+    cache = QueryCache(2)
+    version = graph_version()
+    cache.put("a", 1, version)
+    cache.put("b", 2, version)
+    assert cache.get("a") == (True, 1)
+    cache.put("c", 3, version)
+
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, 1) and cache.get("c") == (True, 3)
+    assert cache.stats()["evictions"] == 1
+
+def test_version_bump_drops_every_entry():
+    cache = QueryCache(10)
+    version = graph_version()
+    cache.put("a", 1, version)
+    bump_graph_version()
+
+    assert cache.get("a") == (False, None)
+    assert cache.stats()["invalidations"] == 1
+    # Computed before the bump: a write raced with it, so it isn't stored
+    cache.put("a", 1, version)
+    assert cache.get("a") == (False, None)
+
+def test_engine_results_are_refreshed_after_an_ingest(tmp_path):
+    storage = MemoryGraphStorage()
+    ingest(storage, connectors=sources(tmp_path), workers=1)
+    engine = QueryEngine(storage, cache_size=16)
+
+    first = engine.blast_radius("database:db")
+    assert engine.blast_radius("database:db") is first
+    assert engine.cache.stats()["hits"] == 1
+
+    compose = COMPOSE.replace("  web:\n    build: ./web\n    depends_on:\n      - api\n", "")
+    ingest(storage, incremental=True, connectors=sources(tmp_path, compose), workers=1)
+    assert [n["id"] for n in engine.blast_radius("database:db")["downstream_impact"]] == ["service:api"]
@@ -0,0 +1,106 @@
+from graph.delta import diff_graphs, merge_records
+from graph.memory import MemoryGraphStorage
+from graph.reachability import ReachabilityIndex, impact_edges
+from scripts.ingest_data import ingest
+
+from sources import COMPOSE, sources
+
+def node(node_id, node_type, **properties):
+    return {"id": node_id, "type": node_type, "name": node_id.partition(':')[2], "properties": properties}
+
+def edge(source, rel_type, target, **properties):
+    return {"id": f"edge:{source}-{rel_type.lower()}-{target}", "type": rel_type,
+            "source": source, "target": target, "properties": properties}
+
+OLD = ([node("service:web", "Service"), node("service:api", "Service", port=80),
+        node("database:db", "Database"), node("service:legacy", "Service"), node("cache:sessions", "Cache")],
+       [edge("service:web", "DEPENDS_ON", "service:api"), edge("service:api", "CALLS", "database:db"),
+        edge("service:legacy", "DEPENDS_ON", "database:db"), edge("service:web", "CALLS", "cache:sessions"),
+        edge("service:api", "DEPENDS_ON", "cache:sessions")])
+
+NEW = ([node("service:web", "Service"), node("service:api", "Service", port=8080),
+        node("database:db", "Database"), node("service:worker", "Service"),
+        # Same id, different label: recreated, and its edges rewritten
+        node("cache:sessions", "Database")],
+       [edge("service:web", "DEPENDS_ON", "service:api"), edge("service:api", "CALLS", "database:db", env_var="DB_URL"),
+        edge("service:worker", "DEPENDS_ON", "database:db"), edge("service:web", "CALLS", "cache:sessions")])
+
+def graph(storage):
+    nodes, edges = storage.export_records()
+    return (sorted(nodes, key=lambda n: n["id"]),
+            sorted(edges, key=lambda e: (e["source"], e["type"], e["target"])))
+
+def written(outputs):
+    storage = MemoryGraphStorage()
+    nodes, edges = merge_records(outputs)
+    storage.upsert_nodes(nodes.values())
+    storage.upsert_edges(edges.values())
+    return storage
+
+def test_diff_graphs_classifies_every_change():
+    old, new = merge_records([OLD]), merge_records([NEW])
+    delta = diff_graphs(*old, *new)
+
+    assert sorted(n["id"] for n in delta.upsert_nodes) == ["cache:sessions", "service:api", "service:worker"]
+    assert (delta.added_nodes, delta.changed_nodes) == (1, 2)
+    assert sorted(delta.remove_nodes) == ["cache:sessions", "service:legacy"]
+    assert sorted((e["source"], e["target"]) for e in delta.upsert_edges) == [
+        ("service:api", "database:db"), ("service:web", "cache:sessions"), ("service:worker", "database:db")]
+    assert (delta.added_edges, delta.changed_edges) == (1, 2)
+    # legacy's edge goes with DETACH DELETE; only the edge between two surviving nodes is removed
+    assert [(e["source"], e["target"]) for e in delta.remove_edges] == [("service:api", "cache:sessions")]
+
+def test_applied_delta_matches_a_full_write():
+    storage = written([OLD])
+    storage.apply_delta(diff_graphs(*merge_records([OLD]), *merge_records([NEW])))
+    assert graph(storage) == graph(written([NEW]))
+
+def test_diff_of_identical_graphs_is_empty():
+    delta = diff_graphs(*merge_records([OLD]), *merge_records([OLD]))
+    assert delta.is_empty()
+    assert delta.summary() == "nodes +0 ~0 -0, edges +0 ~0 -0"
+
+CHANGED = COMPOSE.replace("""  web:
+    build: ./web
+    depends_on:
+      - api
+""", "") + """    labels:
+      tier: primary
+  worker:
+    build: ./worker
+    depends_on:
+      - db
+      - cache
+  cache:
+    image: redis:7
+"""
+
+def test_incremental_ingest_matches_a_full_ingest(tmp_path):
+    storage = MemoryGraphStorage()
+    ingest(storage, connectors=sources(tmp_path), workers=1)
+    ingest(storage, incremental=True, connectors=sources(tmp_path, CHANGED), workers=1)
+
+    full = MemoryGraphStorage()
+    ingest(full, connectors=sources(tmp_path, CHANGED), workers=1)
+    assert graph(storage) == graph(full)
+    assert storage.get_node("service:web") is None and storage.get_node("database:db")["tier"] == "primary"
+
+    nodes, edges = storage.export_records()
+    rebuilt = ReachabilityIndex.build(impact_edges([n["id"] for n in nodes], edges))
+    for node_id in ("database:db", "cache:cache", "service:api", "service:worker"):
+        assert storage.reachability_index.downstream_ids(node_id) == rebuilt.downstream_ids(node_id)
+        assert storage.reachability_index.upstream_ids(node_id) == rebuilt.upstream_ids(node_id)
+
+def test_incremental_ingest_without_changes_writes_nothing(tmp_path, capsys):
+    storage = MemoryGraphStorage()
+    ingest(storage, connectors=sources(tmp_path), workers=1)
+    before, index = graph(storage), storage.reachability_index
+
+    def fail(*args):
+        raise AssertionError("unchanged sources were written")
+    storage.apply_delta = fail
+    storage.clear_graph = fail
+    ingest(storage, incremental=True, connectors=sources(tmp_path), workers=1)
+
+    assert "No source changes detected." in capsys.readouterr().out
+    assert graph(storage) == before and storage.reachability_index is index
@@ -0,0 +1,53 @@
+import pytest
+
+from graph import delta, reachability
+from graph.memory import MemoryGraphStorage
+from graph.reachability import ReachabilityIndexLoader
+from scripts.ingest_data import IngestCancelled, ingest
+
+from sources import COMPOSE, sources
+
+def test_memory_ingest_keeps_state_and_index_off_disk(tmp_path, monkeypatch):
+    index_path, state_path = tmp_path / "index.json", tmp_path / "state.json"
+    monkeypatch.setattr(reachability, "DEFAULT_INDEX_PATH", str(index_path))
+    monkeypatch.setattr(delta, "DEFAULT_STATE_PATH", str(state_path))
+    storage = MemoryGraphStorage()
+
+    ingest(storage, connectors=sources(tmp_path), workers=1)
+
+    assert not index_path.exists() and not state_path.exists()
+    assert storage.reachability_index.downstream_ids("database:db") == ["service:api", "service:web"]
+    assert storage.ingest_state.target == storage.target
+
+def test_memory_incremental_removes_deleted_nodes(tmp_path):
+    storage = MemoryGraphStorage()
+    ingest(storage, connectors=sources(tmp_path), workers=1)
+
+    compose = COMPOSE.replace("  web:\n    build: ./web\n    depends_on:\n      - api\n", "")
+    ingest(storage, incremental=True, connectors=sources(tmp_path, compose), workers=1)
+
+    assert storage.get_node("service:web") is None
+    assert storage.reachability_index.downstream_ids("database:db") == ["service:api"]
+
+def test_cancelled_ingest_is_repaired_by_the_next_incremental_run(tmp_path, monkeypatch):
+    index_path, state_path = tmp_path / "index.json", tmp_path / "state.json"
+    monkeypatch.setattr(reachability, "DEFAULT_INDEX_PATH", str(index_path))
+    monkeypatch.setattr(delta, "DEFAULT_STATE_PATH", str(state_path))
+    # Saved to disk like the Neo4j backend's
+    storage = MemoryGraphStorage()
+    storage.persistent = True
+    ingest(storage, connectors=sources(tmp_path), workers=1)
+    assert index_path.exists() and state_path.exists()
+
+    def cancel_at_edges(stage, fraction):
+        if stage == "Writing edges":
+            raise IngestCancelled()
+
+    with pytest.raises(IngestCancelled):
+        ingest(storage, connectors=sources(tmp_path), workers=1, progress=cancel_at_edges)
+    # Nodes are back, their edges aren't: nothing derived from the old graph may remain
+    assert not index_path.exists() and not state_path.exists()
+
+    ingest(storage, incremental=True, connectors=sources(tmp_path), workers=1)
+    assert [n["id"] for n in storage.impact_reach("database:db", "down")] == ["service:api", "service:web"]
+    assert ReachabilityIndexLoader(storage).get().downstream_ids("database:db") == ["service:api", "service:web"]
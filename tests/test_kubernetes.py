@@ -0,0 +1,49 @@
+from connectors.kubernetes import KubernetesConnector
+
+MANIFESTS = """
+apiVersion: v1
+kind: ConfigMap
+data:
+  settings: [1, 2, {nested: true}]
+---
+metadata: {name: late-kind}
+spec: {replicas: 2}
+kind: Deployment
+---
+- not
+- a mapping
+---
+apiVersion: apps/v1
+kind: Deployment
+metadata:
+  name: api
+  namespace: shop
+  labels: &labels {app: api}
+spec:
+  selector: *labels
+  template:
+    spec:
+      containers:
+        - image: shop/api:1.0
+"""
+
+def load(tmp_path, text: str):
+    path = tmp_path / "manifests.yaml"
+    path.write_text(text)
+    return KubernetesConnector(str(path)).load_file(str(path))
+
+def test_only_deployments_become_nodes(tmp_path):
+    nodes, edges = load(tmp_path, MANIFESTS)
+    assert [n["id"] for n in nodes] == ["service:late-kind", "service:api"]
+    assert nodes[1]["properties"]["k8s_image"] == "shop/api:1.0"
+    assert nodes[1]["properties"]["k8s_namespace"] == "shop"
+    assert edges == []
+
+def test_yaml_error_loads_nothing_from_the_file(tmp_path):
+    assert load(tmp_path, MANIFESTS + "---\nkind: Deployment\nmetadata: {name: broken\n") == ([], [])
+
+def test_stream_yields_documents_before_an_error(tmp_path):
+    path = tmp_path / "manifests.yaml"
+    path.write_text(MANIFESTS + "---\nkind: Deployment\nmetadata: {name: broken\n")
+    streamed = list(KubernetesConnector(str(path)).stream_file(str(path)))
+    assert [record["id"] for _, record in streamed] == ["service:late-kind", "service:api"]
@@ -0,0 +1,100 @@
+import json
+import os
+
+import pytest
+
+from benchmarks import plans
+from graph.profile import QueryProfiler, current_method, format_report, plan_stats
+from telemetry.tracing import span
+
+# Shaped like the driver's ResultSummary.profile
+INDEX_SEEK_PLAN = {
+    "operatorType": "ProduceResults@neo4j", "dbHits": 0, "rows": 1,
+    "children": [{
+        "operatorType": "Projection@neo4j", "dbHits": 3, "rows": 1,
+        "children": [{"operatorType": "NodeUniqueIndexSeek@neo4j", "dbHits": 2, "rows": 1, "children": []}],
+    }],
+}
+FULL_SCAN_PLAN = {
+    "operatorType": "ProduceResults@neo4j", "dbHits": 0, "rows": 4,
+    "children": [{
+        "operatorType": "Filter@neo4j", "dbHits": 40, "rows": 4,
+        "children": [{"operatorType": "AllNodesScan@neo4j", "dbHits": 21, "rows": 20}],
+    }],
+}
+
+def test_plan_stats_totals_every_operator():
+    assert plan_stats(INDEX_SEEK_PLAN) == {
+        "db_hits": 5, "rows": 1, "full_scan": False,
+        "operators": ["NodeUniqueIndexSeek", "ProduceResults", "Projection"],
+    }
+    stats = plan_stats(FULL_SCAN_PLAN)
+    assert (stats["db_hits"], stats["rows"], stats["full_scan"]) == (61, 4, True)
+
+def test_query_profiler_aggregates_per_method():
+    profiler = QueryProfiler()
+    profiler.record("get_node", "MATCH (n:Entity {id: $id})", plan_stats(INDEX_SEEK_PLAN))
+    profiler.record("get_node", "MATCH (n:Entity {id: $id})", plan_stats(INDEX_SEEK_PLAN))
+    profiler.record("get_nodes", "MATCH (n) RETURN n", plan_stats(FULL_SCAN_PLAN))
+
+    report = profiler.report({"get_node": 2, "get_nodes": 1})
+    assert report["get_node"] == {
+        "queries": 2, "db_hits": 10, "rows": 2, "max_db_hits": 5, "full_scans": 0,
+        "operators": ["NodeUniqueIndexSeek", "ProduceResults", "Projection"],
+        "full_scan_statements": [], "db_hits_per_call": 5.0,
+    }
+    assert report["get_nodes"]["full_scan_statements"] == ["MATCH (n) RETURN n"]
+    # The report is plain JSON, as written by benchmarks/plans.py --output
+    assert json.loads(json.dumps(report)) == report
+    assert "FULL SCAN" in format_report(report)[2]
+
+    profiler.reset()
+    assert profiler.report() == {}
+
+def test_statements_are_attributed_to_the_enclosing_engine_method():
+    assert current_method() == "other"
+    with span("graph.blast_radius"):
+        with span("storage.query"):
+            assert current_method() == "blast_radius"
+
+def test_check_flags_full_scans_and_regressions(tmp_path, capsys):
+    profiler = QueryProfiler()
+    profiler.record("get_node", "MATCH (n:Entity {id: $id})", plan_stats(INDEX_SEEK_PLAN))
+    report = profiler.report({"get_node": 1})
+    baseline = tmp_path / "plans.json"
+    baseline.write_text(json.dumps({"methods": {"get_node": {"db_hits_per_call": 4.0}}}))
+
+    assert plans.check(report, str(baseline), max_regression=1.5)
+    assert not plans.check(report, str(baseline), max_regression=1.2)
+    assert "REGRESSION" in capsys.readouterr().out
+
+    profiler.record("get_nodes", "MATCH (n) RETURN n", plan_stats(FULL_SCAN_PLAN))
+    assert not plans.check(profiler.report())
+
+@pytest.fixture
+def neo4j_storage(tmp_path, monkeypatch):
+    """A profiled GraphStorage on NEO4J_URI; the database is cleared like benchmarks/plans.py does."""
+    if not os.getenv("NEO4J_URI"):
+        pytest.skip("NEO4J_URI is not set")
+    from graph import delta, reachability
+    from graph.storage import GraphStorage
+    monkeypatch.setattr(reachability, "DEFAULT_INDEX_PATH", str(tmp_path / "index.json"))
+    monkeypatch.setattr(delta, "DEFAULT_STATE_PATH", str(tmp_path / "state.json"))
+    try:
+        storage = GraphStorage(profile=True, connect_retries=1)
+    except Exception as e:
+        pytest.skip(f"Neo4j at {os.getenv('NEO4J_URI')} is unreachable: {e}")
+    yield storage
+    storage.close()
+
+def test_engine_plans_use_indexes(neo4j_storage, tmp_path):
+    from benchmarks.topology import generate_topology
+    from connectors.runner import default_connectors
+    from scripts.ingest_data import ingest
+
+    paths = generate_topology(str(tmp_path / "topology"), services=30, seed=7)
+    ingest(neo4j_storage, connectors=default_connectors(paths["compose"], paths["teams"], paths["k8s"]), workers=1)
+    report = plans.profile_methods(neo4j_storage, services=30, samples=3, seed=7)
+
+    assert {"get_node", "blast_radius", "criticality"} <= set(report)
+    assert plans.check(report)
@@ -0,0 +1,72 @@
+import asyncio
+
+from graph.async_query import AsyncQueryEngine
+from graph.memory import MemoryGraphStorage
+from graph.query import QueryEngine
+from scripts.ingest_data import ingest
+
+from sources import sources
+
+def engines(tmp_path, use_reachability: bool):
+    storage = MemoryGraphStorage()
+    ingest(storage, connectors=sources(tmp_path), workers=1)
+    return (QueryEngine(storage, use_reachability=use_reachability),
+            AsyncQueryEngine(storage, use_reachability=use_reachability))
+
+def test_sync_and_async_engines_agree(tmp_path):
+    for use_reachability in (True, False):
+        sync, async_ = engines(tmp_path, use_reachability)
+        calls = [("get_node", ("service:api",)), ("get_nodes", ("service",)), ("get_owner", ("database:db",)),
+                 ("blast_radius", ("database:db",)), ("criticality", ()),
+                 ("impact_subgraph", (("service:web", "service:api", "database:db"),)),
+                 ("shortest_path", ("service:web", "database:db"))]
+        for name, args in calls:
+            assert getattr(sync, name)(*args) == asyncio.run(getattr(async_, name)(*args)), name
+        paged = sync.blast_radius("database:db", limit=1)
+        assert paged == asyncio.run(async_.blast_radius("database:db", limit=1))
+
+def test_blast_radius_with_and_without_the_index(tmp_path):
+    indexed, _ = engines(tmp_path, True)
+    live, _ = engines(tmp_path, False)
+    assert indexed.reachability() is not None and live.reachability() is None
+    for engine in (indexed, live):
+        result = engine.blast_radius("database:db")
+        assert [n["id"] for n in result["downstream_impact"]] == ["service:api", "service:web"]
+        assert result["upstream_dependencies"] == []
+
+def test_results_are_copies_of_the_stored_nodes(tmp_path):
+    engine, _ = engines(tmp_path, True)
+    engine.get_node("service:api")["name"] = "changed"
+    engine.get_nodes("service")[0]["name"] = "changed"
+    assert engine.storage.nodes["service:api"]["name"] == "api"
+    assert engine.storage.nodes["service:web"]["name"] == "web"
+
+def test_blast_radius_pages_are_served_from_the_index(tmp_path, monkeypatch):
+    indexed, async_indexed = engines(tmp_path, True)
+    live, _ = engines(tmp_path, False)
+    for max_depth in (None, 1):
+        pages, cursor = [], None
+        while True:
+            page = live.blast_radius("database:db", max_depth=max_depth, limit=1, cursor=cursor)
+            pages.append(page)
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+        walked = sum(len(page["downstream_impact"]) for page in pages)
+        assert pages[-1]["count_affected"] == walked == (2 if max_depth is None else 1)
+        if max_depth is None:
+            # A live walk that stopped at the first full page can't know the total yet
+            assert pages[0]["count_affected"] is None
+
+        def no_queries(*args):
+            raise AssertionError("paged blast radius queried the graph with the index loaded")
+        monkeypatch.setattr(indexed.storage, "impact_neighbours", no_queries)
+        for cursor, page in zip([None] + [p["next_cursor"] for p in pages], pages):
+            served = indexed.blast_radius("database:db", max_depth=max_depth, limit=1, cursor=cursor)
+            assert served["downstream_by_hop"] == page["downstream_by_hop"]
+            assert served["next_cursor"] == page["next_cursor"]
+            # The index knows the total from the first page on
+            assert served["count_affected"] == walked
+            assert served == asyncio.run(async_indexed.blast_radius("database:db", max_depth=max_depth,
+                                                                    limit=1, cursor=cursor))
+        monkeypatch.undo()
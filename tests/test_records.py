@@ -0,0 +1,34 @@
+import pickle
+import sys
+
+import pytest
+
+from connectors.records import EdgeRecord, NodeRecord
+from graph.delta import record_hash
+
+def test_node_record_reads_like_a_dict():
+    node = NodeRecord("service:api", "Service", "api", {"image": "api:1"})
+    as_dict = {"id": "service:api", "type": "Service", "name": "api", "properties": {"image": "api:1"}}
+
+    assert node == as_dict and dict(node) == as_dict
+    assert node["id"] == "service:api" and node.get("missing") is None
+    assert list(node) == ["id", "type", "name", "properties"] and len(node) == 4
+    assert record_hash(node) == record_hash(as_dict)
+    with pytest.raises(KeyError):
+        node["_FIELDS"]
+
+def test_edge_record_derives_its_id():
+    edge = EdgeRecord("depends_on", "service:web", "service:api")
+    assert edge == {"id": "edge:service:web-depends_on-service:api", "type": "depends_on",
+                    "source": "service:web", "target": "service:api", "properties": {}}
+    assert EdgeRecord("calls", "service:a", "service:b", id="edge:custom")["id"] == "edge:custom"
+
+def test_records_survive_pickling_with_interned_strings():
+    node = NodeRecord("service:" + "api", "Service", "api", {"image": "api:1"})
+    edge = EdgeRecord("CALLS", "service:web", "service:" + "api", {"env_var": "API_URL"})
+
+    for record in (node, edge):
+        copy = pickle.loads(pickle.dumps(record))
+        assert type(copy) is type(record) and copy == record
+    assert pickle.loads(pickle.dumps(edge)).target is sys.intern("service:api")
+    assert pickle.loads(pickle.dumps(node)).id is sys.intern("service:api")
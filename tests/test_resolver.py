@@ -0,0 +1,48 @@
+from chat.resolver import EntityResolver, edit_distance
+
+NODES = [
+    {"id": "service:order-service", "name": "order-service"},
+    {"id": "service:payment-service", "name": "payment-service"},
+    {"id": "service:orders", "name": "orders"},
+    {"id": "database:orders", "name": "orders"},
+    {"id": "cache:redis", "name": "redis"},
+]
+
+def resolver() -> EntityResolver:
+    entities = EntityResolver()
+    entities.build(NODES)
+    return entities
+
+def test_edit_distance_counts_a_transposition_once():
+    assert edit_distance("paymnet", "payment", 2) == 1
+    assert edit_distance("order", "ordre", 1) == 1
+    assert edit_distance("redis", "mysql", 2) == 3
+
+def test_exact_ids_and_names():
+    entities = resolver()
+    assert entities.resolve("service:order-service") == ("service:order-service", [])
+    assert entities.resolve("Order Service") == ("service:order-service", [])
+
+def test_typos_within_the_budget():
+    entities = resolver()
+    assert entities.resolve("service:paymnet-service") == ("service:payment-service", [])
+    assert entities.resolve("order servce") == ("service:order-service", [])
+    # Below four characters nothing is fuzzy-matched
+    assert entities.resolve("rdis")[0] == "cache:redis"
+    assert entities.resolve("rds") == (None, [])
+
+def test_unique_prefix():
+    assert resolver().resolve("payment") == ("service:payment-service", [])
+
+def test_ambiguous_names_list_the_candidates():
+    entities = resolver()
+    assert entities.resolve("orders") == (None, ["database:orders", "service:orders"])
+    # A type, even misspelt, narrows it down
+    assert entities.resolve("database orders") == ("database:orders", [])
+    assert entities.resolve("databse orders") == ("database:orders", [])
+
+def test_normalize_parameters():
+    parameters = {"from_id": "order servce", "to_id": "orders", "max_depth": 2}
+    ambiguous = resolver().normalize_parameters(parameters)
+    assert parameters == {"from_id": "service:order-service", "to_id": "orders", "max_depth": 2}
+    assert ambiguous == {"to_id": ["database:orders", "service:orders"]}
@@ -0,0 +1,12 @@
+from chat.router import ROUTING_EXAMPLES, ROUTING_PROMPT, ChatRouter, routing_prompt
+
+def test_default_budget_keeps_an_example():
+    prompt = ChatRouter().system_prompt
+    assert prompt.startswith(ROUTING_PROMPT)
+    assert ROUTING_EXAMPLES[0] in prompt
+
+def test_first_example_survives_a_zero_budget():
+    assert routing_prompt(0) == ROUTING_PROMPT + ROUTING_EXAMPLES[0]
+
+def test_examples_added_within_budget():
+    assert routing_prompt(10_000) == ROUTING_PROMPT + "".join(ROUTING_EXAMPLES)
@@ -0,0 +1,63 @@
+import sys
+import threading
+
+from chat.rules import RuleRouter
+
+NODES = [
+    {"id": "service:order-service", "name": "order-service"},
+    {"id": "service:payment-service", "name": "payment-service"},
+    {"id": "database:orders-db", "name": "orders-db"},
+    {"id": "team:platform-team", "name": "platform-team"},
+]
+
+def router() -> RuleRouter:
+    rules = RuleRouter()
+    rules.set_entities(NODES)
+    return rules
+
+def test_owner_of_a_service():
+    matched = router().match("who owns order-service?")
+    assert matched["intent"] == "get_owner"
+    assert matched["parameters"] == {"node_id": "service:order-service"}
+
+def test_pager_for_a_database():
+    matched = router().match("who should I page if orders-db is down?")
+    assert matched["intent"] == "pager"
+    assert matched["parameters"] == {"node_id": "database:orders-db"}
+
+def test_services_owned_by_a_team_fall_through():
+    # Not "who owns team:platform-team": the question is left to the LLM
+    assert router().match("list services owned by platform team") is None
+
+def test_team_is_never_paged_as_a_resource():
+    assert router().match("who is on call for platform team?") is None
+
+def test_blast_radius_depth():
+    matched = router().match("what breaks within 2 hops if orders-db fails?")
+    assert matched["intent"] == "blast_radius"
+    assert matched["parameters"] == {"node_id": "database:orders-db", "max_depth": 2}
+
+def test_entities_swap_while_matching():
+    rules = router()
+    smaller = NODES[:2]
+    errors = []
+
+    def match():
+        try:
+            for _ in range(2000):
+                rules.match("what breaks if orders-db fails?")
+        except Exception as e:
+            errors.append(e)
+
+    interval = sys.getswitchinterval()
+    # Switch threads as often as possible so the swap and the matching interleave
+    sys.setswitchinterval(1e-6)
+    try:
+        thread = threading.Thread(target=match)
+        thread.start()
+        for i in range(2000):
+            rules.set_entities(NODES if i % 2 else smaller)
+        thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert not errors
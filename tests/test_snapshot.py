@@ -0,0 +1,44 @@
+from graph.memory import MemoryGraphStorage
+from graph.snapshot import GraphSnapshot, export_snapshot
+from scripts.ingest_data import ingest, warm_start
+
+from sources import sources
+
+def graph(storage):
+    nodes, edges = storage.export_records()
+    return (sorted(nodes, key=lambda n: n["id"]),
+            sorted(edges, key=lambda e: (e["source"], e["type"], e["target"])))
+
+def test_snapshot_round_trip(tmp_path):
+    storage = MemoryGraphStorage()
+    ingest(storage, connectors=sources(tmp_path), workers=1)
+    path = str(tmp_path / "graph.snap")
+    meta = export_snapshot(storage, path, sources="fingerprint")
+
+    with GraphSnapshot.open(path) as snapshot:
+        assert snapshot.meta["sources"] == meta["sources"] == "fingerprint"
+        assert (snapshot.node_count, snapshot.edge_count) == (len(storage.nodes), len(graph(storage)[1]))
+        assert snapshot.neighbours("service:api", "DEPENDS_ON") == ["database:db"]
+        assert snapshot.neighbours("database:db", "DEPENDS_ON") == []
+        restored = MemoryGraphStorage()
+        snapshot.load_into(restored)
+
+    assert graph(restored) == graph(storage)
+    env_edge = next(e for e in graph(restored)[1] if e["source"] == "service:api" and e["type"] == "DEPENDS_ON")
+    assert env_edge["properties"] == {"env_var": "DATABASE_URL"}
+
+def test_warm_start_only_uses_a_current_snapshot(tmp_path):
+    connectors = sources(tmp_path)
+    path = str(tmp_path / "graph.snap")
+    storage = MemoryGraphStorage()
+    ingest(storage, connectors=connectors, workers=1, snapshot_path=path)
+
+    warm = MemoryGraphStorage()
+    assert warm_start(warm, path, connectors)
+    assert graph(warm) == graph(storage)
+    # Derived state is rebuilt, so blast_radius and incremental ingests work right away
+    assert warm.reachability_index.downstream_ids("database:db") == ["service:api", "service:web"]
+    assert warm.ingest_state.target == warm.target
+
+    (tmp_path / "teams.yaml").write_text("teams: []\n")
+    assert not warm_start(MemoryGraphStorage(), path, connectors)
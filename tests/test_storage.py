@@ -0,0 +1,81 @@
+import threading
+from contextlib import contextmanager
+
+from graph.cypher import ENTITY_LABEL
+from graph.storage import GraphStorage, _run_write
+
+class RecordingSession:
+    def __init__(self, statements):
+        self.statements = statements
+
+    def run(self, query, **params):
+        self.statements.append(query)
+        return self
+
+    def consume(self):
+        return None
+
+class RecordingStorage(GraphStorage):
+    """GraphStorage whose transactions are recorded instead of sent to Neo4j."""
+
+    def __init__(self, batch_size: int):
+        self.batch_size = batch_size
+        self.target = "bolt://recording"
+        self._constrained_labels = set()
+        self._local = threading.local()
+        self.profiler = None
+        self.statements = []
+        self.batches = []
+
+    @contextmanager
+    def session(self):
+        yield RecordingSession(self.statements)
+
+    def write(self, work, *args):
+        if work is _run_write:
+            self.batches.append(args)
+        else:
+            self.statements.append(args[0])
+
+def node(node_id, node_type):
+    return {"id": node_id, "type": node_type, "name": node_id.partition(':')[2], "properties": {}}
+
+def test_nodes_are_written_in_chunks_per_label():
+    storage = RecordingStorage(batch_size=2)
+    nodes = [node(f"service:s{i}", "Service") for i in range(5)] + [node("database:db", "Database")]
+
+    assert storage.upsert_nodes(nodes) == 6
+    sizes = [(query.split("SET n:")[1].split()[0], len(rows)) for query, rows in storage.batches]
+    assert sizes == [("`Service`", 2), ("`Service`", 2), ("`Service`", 1), ("`Database`", 1)]
+    assert [row["id"] for _, rows in storage.batches for row in rows] == [n["id"] for n in nodes]
+    assert all(query.count("UNWIND $rows") == 1 for query, _ in storage.batches)
+
+    # One constraint per label, created once before the writes
+    constraints = [s for s in storage.statements if s.startswith("CREATE CONSTRAINT")]
+    assert [s.split("`")[1] for s in constraints] == ["entity_id_unique", "service_id_unique", "database_id_unique"]
+    storage.upsert_nodes([node("service:s9", "Service")], chunk_size=10)
+    assert len([s for s in storage.statements if s.startswith("CREATE CONSTRAINT")]) == 3
+    assert ENTITY_LABEL in storage._constrained_labels
+
+def test_edges_are_grouped_by_relationship_type():
+    storage = RecordingStorage(batch_size=1000)
+    edges = [{"type": "depends_on", "source": "service:a", "target": "service:b", "properties": {}},
+             {"type": "CALLS", "source": "service:a", "target": "database:db", "properties": {"env_var": "DB_URL"}},
+             {"type": "DEPENDS_ON", "source": "service:b", "target": "database:db", "properties": {}}]
+
+    assert storage.upsert_edges(edges, chunk_size=1) == 3
+    types = [query.split("[r:")[1].split("]")[0] for query, _ in storage.batches]
+    assert types == ["`DEPENDS_ON`", "`DEPENDS_ON`", "`CALLS`"]
+    assert storage.batches[2][1] == [{"source_id": "service:a", "target_id": "database:db",
+                                      "props": {"env_var": "DB_URL"}}]
+
+def test_entity_label_is_backfilled_in_batches():
+    storage = RecordingStorage(batch_size=500)
+    storage.ensure_constraints(["Service"])
+    storage.ensure_constraints(["Service"])
+
+    relabels = [s for s in storage.statements if "IN TRANSACTIONS" in s]
+    assert len(relabels) == 1
+    assert relabels[0].endswith(f"SET n:{ENTITY_LABEL} }} IN TRANSACTIONS OF 500 ROWS")
+    # Nothing else touches nodes without the label
+    assert not [s for s in storage.statements if "NOT n:" in s and s not in relabels]
@@ -0,0 +1,68 @@
+import threading
+from typing import Optional
+
+from graph.storage import create_storage
+from graph.query import QueryEngine
+from graph.snapshot import DEFAULT_SNAPSHOT_PATH
+from scripts.ingest_data import IngestJob
+
+class GraphBackend:
+    """
+    Graph connection and ingestion shared by every session of the app (one
+    per process, see get_backend in streamlit_app). Connecting, the
+    empty-graph check and ingestion run on background threads, so a script
+    rerun never waits for Neo4j; reruns only read the status here.
+    """
+
+    def __init__(self):
+        self.storage = None
+        self.query_engine: Optional[QueryEngine] = None
+        self.error: Optional[Exception] = None
+        self.job: Optional[IngestJob] = None
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._connect, name="graph-connect", daemon=True)
+        self._thread.start()
+
+    @property
+    def status(self) -> str:
+        """"connecting", "failed" or "connected"."""
+        if self.query_engine is not None:
+            return "connected"
+        return "failed" if self.error is not None else "connecting"
+
+    def _connect(self):
+        try:
+            storage = create_storage()
+            query_engine = QueryEngine(storage)
+            empty = storage.is_empty()
+        except Exception as e:
+            print(f"Graph connection failed: {e}")
+            self.error = e
+            return
+        self.storage = storage
+        self.query_engine = query_engine
+        if empty:
+            # A snapshot of the current sources loads in a fraction of the time parsing takes
+            self.start_ingest(warm=True)
+
+    @property
+    def ingesting(self) -> bool:
+        return self.job is not None and self.job.running
+
+    def start_ingest(self, warm: bool = False) -> IngestJob:
+        """Starts an incremental ingest unless one is already running; returns the current job."""
+        with self._lock:
+            if not self.ingesting:
+                # Parsed in this process: a worker pool started from a threaded server isn't worth the risk
+                self.job = IngestJob(self.storage, warm=warm, incremental=True, workers=1,
+                                     snapshot_path=DEFAULT_SNAPSHOT_PATH).start()
+            return self.job
+
+    def queryable(self) -> bool:
+        """
+        Whether questions can be answered now. Neo4j serves reads while an
+        ingest writes; the in-memory graph isn't safe to read while it changes.
+        """
+        if self.status != "connected":
+            return False
+        return not (self.ingesting and self.storage.supports_native_queries)
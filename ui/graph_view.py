@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Past this many nodes, a drawing collapses its neighbours into one node per team (or type)
+CLUSTER_THRESHOLD = int(os.getenv("GRAPH_CLUSTER_THRESHOLD", "40"))
+# Rendered layouts kept in memory, keyed by a hash of the drawn subgraph
+LAYOUT_CACHE_SIZE = int(os.getenv("GRAPH_LAYOUT_CACHE_SIZE", "128"))
+
+# Graphviz node attributes per role
+NODE_STYLES = {
+    "focus": {"style": "filled", "fillcolor": "#f8d7da", "penwidth": "2"},
+    "downstream": {"style": "filled", "fillcolor": "#fff3cd"},
+    "upstream": {"style": "filled", "fillcolor": "#d1ecf1"},
+    "path": {"style": "filled", "fillcolor": "#e2e3e5"},
+}
+CLUSTER_STYLE = {"shape": "box3d"}
+
+def node_type(node_id: str) -> str:
+    """"service:payments-api" -> "service"."""
+    return node_id.split(":", 1)[0] if ":" in node_id else "node"
+
+def collapse(nodes: List[Dict[str, Any]], edges: Iterable[Tuple[str, str, str]],
+             owners: Dict[str, List[str]], threshold: int = None) -> Dict[str, Any]:
+    """
+    The drawable graph {"nodes": [...], "edges": [...]}, sorted so equal
+    subgraphs hash equally. Above `threshold` nodes every node but the focus
+    is folded into one cluster node per (role, owning team) for the largest
+    teams and per (role, type) for the rest; parallel edges between clusters
+    merge into one labelled with their count.
+    """
+    threshold = CLUSTER_THRESHOLD if threshold is None else threshold
+    representative = {n["id"]: n["id"] for n in nodes}
+    drawn = {n["id"]: n for n in nodes}
+    if len(nodes) > threshold:
+        by_team: Dict[Tuple[str, str, str], List[Dict]] = {}
+        for n in nodes:
+            if n["role"] == "focus":
+                continue
+            teams = owners.get(n["id"])
+            key = (n["role"], "team", teams[0]) if teams else (n["role"], "type", node_type(n["id"]))
+            by_team.setdefault(key, []).append(n)
+        # The largest teams keep their own cluster; the rest fold into one per type
+        ranked = sorted(by_team.items(), key=lambda item: (-len(item[1]), item[0]))
+        groups = dict(ranked[:threshold // 2])
+        for (role, _, _), members in ranked[threshold // 2:]:
+            for n in members:
+                groups.setdefault((role, "type", node_type(n["id"])), []).append(n)
+        drawn = {n["id"]: n for n in nodes if n["role"] == "focus"}
+        for (role, kind, name), members in groups.items():
+            cluster_id = f"cluster:{role}:{kind}:{name}"
+            label = name.split(":", 1)[-1] if kind == "team" else name
+            drawn[cluster_id] = {"id": cluster_id, "label": f"{label} ({kind})\n{len(members)} nodes",
+                                 "role": role, "cluster": True}
+            for n in members:
+                representative[n["id"]] = cluster_id
+
+    merged = Counter()
+    labels: Dict[Tuple[str, str], str] = {}
+    for source, target, label in edges:
+        pair = (representative.get(source), representative.get(target))
+        if None in pair or pair[0] == pair[1]:
+            continue
+        merged[pair] += 1
+        labels.setdefault(pair, label)
+    return {
+        "nodes": [drawn[i] for i in sorted(drawn)],
+        "edges": [{"source": s, "target": t, "label": f"{labels[(s, t)]} ×{count}" if count > 1 else labels[(s, t)]}
+                  for (s, t), count in sorted(merged.items())],
+    }
+
+def blast_radius_graph(result: Dict[str, Any], subgraph: Dict[str, Any], threshold: int = None) -> Dict[str, Any]:
+    """
+    Drawable graph of a blast_radius result (paged or not) and the
+    QueryEngine.impact_subgraph of its nodes. Edges point from dependent to dependency.
+    """
+    focus = result.get("node")
+    nodes = {focus: {"id": focus, "label": focus, "role": "focus"}}
+    for role, key in (("downstream", "downstream_impact"), ("upstream", "upstream_dependencies")):
+        for n in result.get(key, []):
+            nodes.setdefault(n["id"], {"id": n["id"], "label": n.get("name") or n["id"], "role": role})
+    edges = [(source, target, "") for source, target in subgraph["edges"]]
+    return collapse(list(nodes.values()), edges, subgraph["owners"], threshold)
+
+def path_graph(path: List[Any], threshold: int = None) -> Dict[str, Any]:
+    """Drawable graph of a shortest_path result: [node, "REL_TYPE", node, ...]."""
+    nodes = {}
+    edges = []
+    for i, item in enumerate(path):
+        if isinstance(item, dict):
+            nodes.setdefault(item["id"], {"id": item["id"], "label": item.get("name") or item["id"],
+                                          "role": "focus" if i in (0, len(path) - 1) else "path"})
+        elif 0 < i < len(path) - 1 and isinstance(path[i - 1], dict) and isinstance(path[i + 1], dict):
+            # The serialized path drops relationship direction; draw it in walk order
+            edges.append((path[i - 1]["id"], path[i + 1]["id"], str(item)))
+    return collapse(list(nodes.values()), edges, {}, threshold)
+
+def graph_key(graph: Dict[str, Any]) -> str:
+    return hashlib.sha1(json.dumps(graph, sort_keys=True).encode('utf-8')).hexdigest()
+
+def to_dot(graph: Dict[str, Any]) -> str:
+    """Graphviz DOT source of a drawable graph."""
+    import graphviz
+
+    dot = graphviz.Digraph(graph_attr={"rankdir": "LR", "fontsize": "10"},
+                           node_attr={"shape": "box", "fontname": "Helvetica", "fontsize": "10"},
+                           edge_attr={"fontname": "Helvetica", "fontsize": "8"})
+    # Graphviz reads "a:b" as node a, port b, so ids stay out of the source
+    names = {n["id"]: f"n{i}" for i, n in enumerate(graph["nodes"])}
+    for n in graph["nodes"]:
+        attrs = dict(NODE_STYLES.get(n["role"], {}), **(CLUSTER_STYLE if n.get("cluster") else {}))
+        dot.node(names[n["id"]], n["label"], tooltip=n["id"], **attrs)
+    for e in graph["edges"]:
+        dot.edge(names[e["source"]], names[e["target"]], label=e["label"])
+    return dot.source
+
+class LayoutCache:
+    """
+    Thread-safe LRU of rendered graphs keyed by graph_key, so a subgraph that
+    was drawn before (a repeated question, or chat history on every rerun) is
+    not laid out again. Entries don't depend on the graph version: a changed
+    graph yields a different subgraph and key.
+    """
+
+    def __init__(self, max_size: int = None):
+        self.max_size = LAYOUT_CACHE_SIZE if max_size is None else max_size
+        self._entries: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Tuple[str, str]]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: Tuple[str, str]):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+_layouts = LayoutCache()
+# Cleared when the dot executable turns out to be missing; browsers lay out the DOT source instead
+_dot_available = True
+
+def render(graph: Dict[str, Any], cache: LayoutCache = None) -> Tuple[str, str]:
+    """
+    ("svg", markup) laid out server-side by Graphviz's dot, or ("dot", source)
+    for st.graphviz_chart when the dot executable isn't installed. Cached.
+    """
+    global _dot_available
+    cache = _layouts if cache is None else cache
+    key = graph_key(graph)
+    rendered = cache.get(key)
+    if rendered is not None:
+        return rendered
+
+    import graphviz
+
+    source = to_dot(graph)
+    rendered = ("dot", source)
+    if _dot_available:
+        try:
+            rendered = ("svg", graphviz.Source(source).pipe(format="svg", encoding="utf-8"))
+        except graphviz.ExecutableNotFound:
+            print("Graphviz 'dot' not found; graphs will be laid out in the browser.")
+            _dot_available = False
+    cache.put(key, rendered)
+    return rendered
+
+def layout_stats() -> Dict[str, int]:
+    return _layouts.stats()
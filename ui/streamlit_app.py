@@ -7,14 +7,19 @@ import time
 # Add project root to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from graph.storage import GraphStorage
-from graph.query import QueryEngine
 from chat.router import ChatRouter
 from chat.context import ChatContext
-from scripts.ingest_data import ingest
+from graph.cache import graph_version
+from graph.profile import format_report
+from ui.backend import GraphBackend
+from ui.graph_view import blast_radius_graph, path_graph, render, layout_stats
+from telemetry.tracing import span, finished_spans, breakdown, to_jsonl
 
 st.set_page_config(page_title="Engineering Knowledge Graph", page_icon="🕸️", layout="wide")
 
+# Whole script run; not current, so each chat answer is its own trace
+rerun_span = span("ui.rerun").start(activate=False)
+
 # Initialize Session State
 if "messages" not in st.session_state:
     st.session_state.messages = []
@@ -22,30 +27,87 @@ if "messages" not in st.session_state:
 if "router" not in st.session_state:
     st.session_state.router = ChatRouter()
 
-# Lazy Init for Graph to avoid connection issues on pure UI refresh if DB down
-if "graph_ready" not in st.session_state:
-    st.session_state.graph_ready = False
-
 @st.cache_resource
-def get_graph_components():
-    """Cached resource for DB connection"""
-    try:
-        storage = GraphStorage()
-        query_engine = QueryEngine(storage)
-        return storage, query_engine
-    except Exception as e:
-        return None, None
-
-def check_and_ingest(query_engine):
-    """Check if graph has nodes, if not, ingest."""
-    try:
-        nodes = query_engine.get_nodes(limit=1)
-        if not nodes:
-            st.toast("Empty graph detected. Ingesting data...", icon="🔄")
-            ingest() 
-            st.toast("Ingestion Complete!", icon="✅")
-    except Exception as e:
-        st.error(f"Error checking graph state: {e}")
+def get_backend() -> GraphBackend:
+    """One graph connection per process; it connects (and ingests an empty graph) in the background."""
+    return GraphBackend()
+
+# Upper bound on nodes loaded for the router's entity resolution
+ENTITY_LIMIT = 100000
+# Nodes per direction in the first page of a blast radius; the rest is one click away
+BLAST_RADIUS_PAGE_SIZE = 50
+# Rows in the criticality ranking
+CRITICALITY_LIMIT = 20
+
+def refresh_entities(query_engine):
+    """Give the router's local rules the node names currently in the graph, once per graph version."""
+    if st.session_state.get("entities_version") == graph_version():
+        return
+    st.session_state.router.set_entities(query_engine.get_nodes(limit=ENTITY_LIMIT))
+    st.session_state.entities_version = graph_version()
+
+def render_breakdown(stages):
+    """Per-stage latency of one chat answer (see telemetry.tracing.breakdown)."""
+    with st.expander("Latency breakdown"):
+        st.dataframe(
+            [{"Stage": "\u2003" * stage["depth"] + stage["stage"], "Calls": stage["calls"],
+              "ms": round(stage["ms"], 1), "Rows": stage["rows"], "Tokens": stage["tokens"]} for stage in stages],
+            hide_index=True
+        )
+
+def answer_graph(query_engine, intent, result):
+    """Drawable subgraph of a blast radius or shortest path result, or None."""
+    if intent in ("blast_radius", "upstream") and isinstance(result, dict) and result.get("node"):
+        ids = [result["node"]] + [n["id"] for n in result["downstream_impact"] + result["upstream_dependencies"]]
+        return blast_radius_graph(result, query_engine.impact_subgraph(tuple(ids)))
+    if intent == "shortest_path" and isinstance(result, list) and result:
+        return path_graph(result)
+    return None
+
+def render_graph(graph):
+    """Draws a subgraph; its layout is cached, so redrawing chat history is cheap."""
+    if not graph or len(graph["nodes"]) < 2:
+        return
+    kind, data = render(graph)
+    if kind == "svg":
+        st.image(data)
+    else:
+        st.graphviz_chart(data)
+
+def render_status():
+    """Connection and ingestion status. Polled while something is in progress."""
+    backend = get_backend()
+    job = backend.job
+    if backend.status == "connecting":
+        st.info("Connecting to the graph...")
+    elif backend.status == "failed":
+        st.error("Neo4j Disconnected")
+        st.info("Ensure `docker-compose up` is running.")
+        st.caption(str(backend.error))
+    else:
+        st.success(f"Actively connected to {backend.storage.name} graph")
+
+    if job is not None and job.running:
+        st.progress(job.fraction, text=job.stage)
+        if st.button("Cancel ingestion"):
+            job.cancel()
+    elif backend.status == "connected":
+        if job is not None and job.status == "done":
+            st.caption(f"{job.stage} in {job.seconds:.1f}s.")
+        elif job is not None and job.status == "cancelled":
+            st.warning("Ingestion cancelled.")
+        elif job is not None and job.status == "failed":
+            st.error(f"Ingestion failed: {job.error}")
+        if st.button("Re-Ingest Data"):
+            # Only the changes since the last run are applied, so the graph stays queryable
+            backend.start_ingest()
+
+    # Once connecting or ingesting finishes, rerun the whole page so it can use the graph
+    seen = (backend.status, job.status if job else None)
+    changed = st.session_state.get("backend_seen", seen) != seen
+    st.session_state.backend_seen = seen
+    if changed:
+        st.rerun()
 
 # Sidebar
 with st.sidebar:
@@ -57,30 +119,72 @@ with st.sidebar:
     - **Dependencies**: "What does X depend on?"
     - **Blast Radius**: "What breaks if X fails?"
     - **Pathfinding**: "Path from A to B?"
+    - **Criticality**: "What are our most critical services?"
     """)
     st.markdown("---")
     
     # Status Indicator
-    storage, query_engine = get_graph_components()
-    if storage:
-        st.success("Actively connected to Neo4j")
-        st.session_state.graph_ready = True
-        if st.button("Re-Ingest Data"):
-            with st.spinner("Ingesting..."):
-                ingest()
-                st.success("Done!")
-    else:
-        st.error("Neo4j Disconnected")
-        st.info("Ensure `docker-compose up` is running.")
+    backend = get_backend()
+    in_progress = backend.status == "connecting" or backend.ingesting
+    st.fragment(render_status, run_every=1.0 if in_progress else None)()
+    storage = backend.storage
+    query_engine = backend.query_engine if backend.queryable() else None
+    graph_ready = query_engine is not None
+    if graph_ready:
+        try:
+            refresh_entities(query_engine)
+        except Exception as e:
+            st.error(f"Error checking graph state: {e}")
+
+    stats = st.session_state.router.stats
+    if stats["rules"] + stats["llm"]:
+        st.caption(f"Fast-path hit rate: {st.session_state.router.hit_rate():.0%} "
+                   f"({stats['rules']} local / {stats['llm']} LLM)")
+    answers = st.session_state.router.answer_stats
+    if answers["templates"] + answers["llm"]:
+        st.caption(f"Answers: {answers['templates']} templated / {answers['llm']} LLM-summarized")
+    if query_engine:
+        cache_stats = query_engine.cache.stats()
+        st.caption(f"Query cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+                   f"({cache_stats['size']}/{cache_stats['max_size']} entries)")
+    layouts = layout_stats()
+    if layouts["hits"] + layouts["misses"]:
+        st.caption(f"Graph layouts: {layouts['hits']} cached / {layouts['misses']} drawn")
+    if getattr(storage, "profiler", None) is not None:
+        # NEO4J_PROFILE=1: every statement ran under PROFILE
+        with st.expander("Query profile (db hits per method)"):
+            st.code("\n".join(format_report(storage.profiler.report())))
+    if finished_spans():
+        st.download_button("Export spans (JSONL)", to_jsonl(), file_name="ekg_spans.jsonl",
+                           mime="application/jsonl")
 
 # Main Interface
 st.title("Engineering Knowledge Graph")
 st.caption("Ask questions about your infrastructure, teams, and dependencies.")
 
+# Next page of the last blast radius, fetched only when asked for
+more = st.session_state.get("blast_radius_more")
+if more and graph_ready and st.button(f"Load more of the blast radius for {more['node']}"):
+    page = query_engine.blast_radius(more['node'], max_depth=more.get('max_depth'),
+                                     limit=BLAST_RADIUS_PAGE_SIZE, cursor=more['next_cursor'])
+    st.session_state.messages.append({
+        "role": "assistant",
+        "content": f"Next {len(page['downstream_impact'])} affected nodes for {more['node']}.",
+        "graph": answer_graph(query_engine, "blast_radius", page),
+        "data": page
+    })
+    st.session_state.blast_radius_more = page if page.get('next_cursor') else None
+
 # Display Chat History
 for message in st.session_state.messages:
     with st.chat_message(message["role"]):
         st.markdown(message["content"])
+        if "timing" in message:
+            st.caption(message["timing"])
+        if "trace" in message:
+            render_breakdown(message["trace"])
+        if message.get("graph"):
+            render_graph(message["graph"])
         if "data" in message:
              with st.expander("View Graph Data"):
                  st.json(message["data"])
@@ -96,9 +200,14 @@ if prompt := st.chat_input("Ask a question..."):
     with st.chat_message("assistant"):
         message_placeholder = st.empty()
         
-        if not st.session_state.graph_ready:
-             message_placeholder.error("Graph Database is not available.")
+        if not graph_ready:
+            if backend.status == "failed":
+                message_placeholder.error("Graph Database is not available.")
+            else:
+                message_placeholder.info("The graph is still loading; please ask again in a moment.")
         else:
+            # Root of this answer's spans: route, graph queries, summary
+            trace = span("chat.answer").start()
             with st.spinner("Analyzing intent..."):
                 router_response = st.session_state.router.route(
                     prompt, 
@@ -110,102 +219,115 @@ if prompt := st.chat_input("Ask a question..."):
             explanation = router_response.get("explanation", "")
             
             # Show intent (debug/transparency)
-            intent = router_response.get("intent")
-            params = router_response.get("parameters", {})
-            explanation = router_response.get("explanation", "")
-            
             if "error" in router_response:
                 st.error(f"Router Error: {router_response['error']}")
                 st.caption(f"Raw Response: {router_response}")
             else:
-                st.caption(f"Intent: `{intent}` | Params: `{params}`")
+                st.caption(f"Intent: `{intent}` | Params: `{params}` | Routed by: `{router_response.get('source')}`")
             
             # 3. Execute Graph Query
             result = None
+            candidates = router_response.get("candidates")
             try:
-                if intent == "get_owner":
+                if candidates:
+                    # The resolver couldn't pick a node; ask instead of querying a guess
+                    result = {"candidates": candidates}
+                elif intent == "get_owner":
                     result = query_engine.get_owner(params.get("node_id"))
                 elif intent == "blast_radius":
-                    result = query_engine.blast_radius(params.get("node_id"))
+                    result = query_engine.blast_radius(params.get("node_id"),
+                                                       max_depth=params.get("max_depth"),
+                                                       limit=BLAST_RADIUS_PAGE_SIZE)
                 elif intent == "upstream":
-                    # Blast radius actually covers upstream/downstream context usually, 
-                    # but let's just use get_nodes w/ pattern or mapped function
-                    # We mapped upstream in router prompt to `upstream` intent often, 
-                    # but query engine has blast_radius returning both.
-                    # Or we can make a specific upstream method. 
-                    # Let's map to blast_radius for now or custom logic.
-                    # Actually I implemented `blast_radius` which returns upstream/downstream dict.
-                    result = query_engine.blast_radius(params.get("node_id"))
+                    # Answered by the blast radius, which lists upstream dependencies as well
+                    result = query_engine.blast_radius(params.get("node_id"), limit=BLAST_RADIUS_PAGE_SIZE)
                 elif intent == "shortest_path":
                     result = query_engine.shortest_path(params.get("from_id"), params.get("to_id"))
                 elif intent == "get_node":
                     result = query_engine.get_node(params.get("node_id"))
                 elif intent == "get_nodes":
                     result = query_engine.get_nodes(params.get("type"))
+                elif intent == "criticality":
+                    result = query_engine.criticality(params.get("type"), limit=CRITICALITY_LIMIT)
                 elif intent == "pager":
-                    # Safety net: Ensure ID is lowercase to match graph conventions
-                    node_id = params.get("node_id", "").lower()
-                    
-                    # Fetch Node for direct oncall (if any)
-                    node_info = query_engine.get_node(node_id)
-                    # Fetch Owner for team oncall
-                    owners = query_engine.get_owner(node_id)
-                    
-                    if not node_info and not owners:
-                        result = f"Could not find resource or owners for {node_id}."
-                    else:
-                        # Note: Neo4j .data() returns flattened properties, so we access them directly.
-                        if owners:
-                            owner_node = owners[0]
-                            team_name = owner_node.get('name', 'Unknown Team')
-                            team_pager = owner_node.get('pagerduty', 'N/A')
-                            team_lead = owner_node.get('lead', 'N/A')
-                        else:
-                            team_name = "Unknown Team"
-                            team_pager = "N/A"
-                            team_lead = "N/A"
-                        
-                        # Service-level oncall override
-                        service_oncall = "N/A"
-                        if node_info:
-                            service_oncall = node_info.get('oncall', 'N/A')
-                        
-                        # Fallback logic: Service oncall > Team Lead
-                        primary_oncall = service_oncall if service_oncall != "N/A" else team_lead
-                        
-                        result = f"{node_id} is owned by the {team_name}. Primary on-call: {primary_oncall} (PagerDuty: {team_pager})."
+                    # Node and owners on one session; the answer template picks the on-call
+                    result = query_engine.pager(params.get("node_id"))
                 else:
                     result = "Unknown intent or generic query."
 
             except Exception as e:
                 result = f"Error Querying Graph: {str(e)}"
 
-            # 4. Summarize with LLM
-            with st.spinner("Synthesizing answer..."):
-                final_answer = st.session_state.router.summarize_response(prompt, result)
+            # 4. Answer from a local template, or summarize with the LLM rendering tokens as they arrive
+            final_answer = ""
+            ttft_ms = None
+            start = time.perf_counter()
+            if candidates:
+                final_answer = "I couldn't tell which node you meant. Did you mean:\n" + "\n".join(
+                    f"- `{params.get(name)}`: " + ", ".join(f"`{c}`" for c in ids)
+                    for name, ids in candidates.items())
+            else:
+                # Structured results are templated locally; only free-form ones wait on the LLM
+                for chunk in st.session_state.router.answer(prompt, intent, params, result):
+                    if ttft_ms is None:
+                        ttft_ms = (time.perf_counter() - start) * 1000
+                    final_answer += chunk
+                    message_placeholder.markdown(final_answer + "▌")
+            total_ms = (time.perf_counter() - start) * 1000
             
             message_placeholder.markdown(final_answer)
+            trace.set(intent=intent)
+            trace.end()
+            timing = f"First token: {ttft_ms or 0:.0f} ms | Full answer: {total_ms:.0f} ms"
+            st.caption(timing)
+            stages = breakdown(finished_spans(trace.trace_id))
+            render_breakdown(stages)
+            try:
+                graph = answer_graph(query_engine, intent, result)
+            except Exception as e:
+                graph = None
+                st.caption(f"Could not draw the graph: {e}")
+            if intent != "blast_radius":
+                # The blast radius card below draws it next to the hop lists
+                render_graph(graph)
             
             # 5. Append to History
             st.session_state.messages.append({
                 "role": "assistant", 
                 "content": final_answer,
+                "timing": timing,
+                "trace": stages,
+                "graph": graph,
                 "data": result # Store raw data for expander
             })
             
+            if intent == "criticality" and isinstance(result, list):
+                st.dataframe(
+                    [{"Rank": r["rank"], "Node": r["id"], "Breaks if it fails": r["downstream_count"],
+                      "Teams affected": r["team_count"]} for r in result],
+                    hide_index=True
+                )
+
             # Optional: Show structured card for Blast Radius
             if intent == "blast_radius" and isinstance(result, dict):
                 st.warning(f"Blast Radius Analysis for {result.get('node')}")
+                render_graph(graph)
                 col1, col2 = st.columns(2)
                 with col1:
                     st.markdown("**Downstream (Breaks if this fails):**")
-                    for item in result.get('downstream_impact', []):
-                        st.code(item.get('id', 'Unknown'))
+                    for group in result.get('downstream_by_hop', []):
+                        st.caption(f"Hop {group['hop']}")
+                        st.markdown(", ".join(f"`{item.get('id', 'Unknown')}`" for item in group['nodes']))
                 with col2:
                     st.markdown("**UpstreamDependencies (Root causes):**")
-                    for item in result.get('upstream_dependencies', []):
-                        st.code(item.get('id', 'Unknown'))
+                    for group in result.get('upstream_by_hop', []):
+                        st.caption(f"Hop {group['hop']}")
+                        st.markdown(", ".join(f"`{item.get('id', 'Unknown')}`" for item in group['nodes']))
+                if result.get('next_cursor'):
+                    total = result.get('count_affected')
+                    shown = f"Showing the first {len(result['downstream_impact'])}"
+                    st.info(f"{shown} of {total} affected nodes." if total else f"{shown} affected nodes; more remain.")
+                # Offered above the chat input on the next run
+                st.session_state.blast_radius_more = result if result.get('next_cursor') else None
 
-# Initial check
-if st.session_state.graph_ready:
-    check_and_ingest(query_engine)
+rerun_span.end()